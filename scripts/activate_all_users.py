@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 
@@ -35,21 +34,14 @@ if __name__ == "__main__":
     identities_to_activate = []
 
     # get all ids for people to activate
-    for entry in ledger:
-        action = entry.get("action", {})
-
-        if (
-            sc.is_action_discord_alias(action)
-            and ALREADY_ACTIVATED.get(action.get("alias").get("description")) == None
-        ):
-            ledger_identity_id = action.get("identityId")
-            identities_to_activate.append(ledger_identity_id)
+    for alias in ledger.discord_aliases:
+        if ALREADY_ACTIVATED.get(alias.description) == None:
+            identities_to_activate.append(alias.identity_id)
 
     # create activation items and append to ledger
     for identity_id in identities_to_activate:
         ledger.append(sc.create_activation_action(identity_id))
 
-    # write ledger.json to file
-    with open("ledger.json", "w") as f:
-        actions = [json.dumps(action) for action in ledger]
-        f.write("\n".join(actions))
+    # write ledger.json to file, existing lines are written back unchanged
+    with open("ledger.json", "wb") as f:
+        f.write(ledger.to_bytes())
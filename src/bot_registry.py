@@ -0,0 +1,105 @@
+import json
+import os
+
+from digg_bot import DiggBot
+from price_bot import PriceBot
+from sett_bot import SettBot
+
+BOT_CLASSES = {"PriceBot": PriceBot, "SettBot": SettBot, "DiggBot": DiggBot}
+PRICE_BOTS_CONFIG_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../config/price_bots.json")
+)
+# config key suffixes resolved when the registry is loaded
+ENV_SUFFIX = "_env"
+ABI_PATH_SUFFIX = "_abi_path"
+
+
+def load_bot_registry(path: str = PRICE_BOTS_CONFIG_PATH) -> list:
+    """
+    Loads the declarative price bot registry. Every entry is a dict of bot constructor kwargs
+    plus a bot_class name. Keys ending in _env are read from that environment variable and keys
+    ending in _abi_path are loaded as json abi files relative to the registry file, EG
+
+    {
+        "bot_class": "SettBot",
+        "coingecko_token_id": "badger-sett-badger",
+        "token_display": "bBADGER",
+        "token_address_env": "BBADGER_ADDRESS",
+        "token_abi_path": "../contracts/abi/sett.json",
+        "discord_id_env": "BOT_ID_BBADGER",
+        "bot_token_env": "BOT_TOKEN_BBADGER",
+        "underlying_decimals": 18
+    }
+
+    Args:
+        path (str): json registry file, yaml is also supported if PyYAML is installed
+
+    Raises:
+        ValueError: if an entry has an unknown bot_class
+
+    Returns:
+        list: resolved bot configs, EG {"bot_class": "SettBot", "token_abi": [...], ...}
+    """
+    with open(path) as registry_file:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            entries = yaml.safe_load(registry_file)
+        else:
+            entries = json.load(registry_file)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    # bots sharing an abi file share the loaded abi
+    abi_files = {}
+    return [resolve_bot_config(entry, base_dir, abi_files) for entry in entries]
+
+
+def resolve_bot_config(entry: dict, base_dir: str, abi_files: dict = None) -> dict:
+    """
+    Resolves the _env and _abi_path keys of a registry entry
+
+    Args:
+        entry (dict): raw registry entry
+        base_dir (str): directory abi paths are relative to
+        abi_files (dict, optional): cache of already loaded abi files by path
+
+    Returns:
+        dict: bot config with resolved values
+    """
+    if entry.get("bot_class") not in BOT_CLASSES:
+        raise ValueError(
+            f"Unknown bot_class {entry.get('bot_class')} for {entry.get('token_display')}"
+        )
+
+    config = {}
+    abi_files = {} if abi_files == None else abi_files
+    for key, value in entry.items():
+        if key.endswith(ABI_PATH_SUFFIX):
+            abi_key = key[: -len(ABI_PATH_SUFFIX)] + "_abi"
+            abi_path = os.path.normpath(os.path.join(base_dir, value))
+            if abi_path not in abi_files:
+                with open(abi_path) as abi_file:
+                    abi_files[abi_path] = json.load(abi_file)
+            config[abi_key] = abi_files[abi_path]
+        elif key.endswith(ENV_SUFFIX):
+            config[key[: -len(ENV_SUFFIX)]] = os.getenv(value)
+        else:
+            config[key] = value
+
+    return config
+
+
+def create_bot(config: dict):
+    """
+    Args:
+        config (dict): resolved bot config from load_bot_registry
+
+    Returns:
+        PriceBot: bot instance of the configured class
+    """
+    kwargs = {
+        key: value
+        for key, value in config.items()
+        if key not in ["bot_class", "bot_token"]
+    }
+    return BOT_CLASSES[config.get("bot_class")](**kwargs)
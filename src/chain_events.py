@@ -0,0 +1,163 @@
+import aiohttp
+import asyncio
+import json
+import logging
+import time
+
+# keccak of the event signatures, used as the first log topic
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+ANSWER_UPDATED_TOPIC = (
+    "0x0559884fd3a460db3073b7fc896cc77986f16e378210ded43186175bf646fc5f"
+)
+LOG_REBASE_TOPIC = "0x72725a3b1e5bd622d6bcd1339bb31279c351abe8f541ac7fd320f24e1b1641f2"
+FULL_PRICE_PER_SHARE_UPDATED_TOPIC = (
+    "0xfd60e70298d1c5272d3164dec70c527f1c64556cf7ca2dc10bdc753143ffc45b"
+)
+# indexed zero address, the from of a mint and the to of a burn
+ZERO_ADDRESS_TOPIC = "0x" + "0" * 64
+
+RECONNECT_BACKOFF_SECONDS = 5
+MAX_RECONNECT_BACKOFF_SECONDS = 300
+HEARTBEAT_SECONDS = 30
+
+
+class LogSubscription:
+    """
+    A log filter watched over the websocket. active_since is the time the node confirmed the
+    subscription, None while it is not active, EG during a reconnect.
+    """
+
+    def __init__(self, address: str, topics: list, callback):
+        self.address = address
+        self.topics = topics
+        self.callback = callback
+        self.active_since = None
+
+    def is_active(self) -> bool:
+        return self.active_since != None
+
+
+class ChainEventWatcher:
+    """
+    Shared eth_subscribe("logs") websocket for every bot in the process. Bots register the logs
+    their displayed data depends on and get a callback for each matching log, so on-chain data
+    is only re-read when it actually changed. Subscriptions are re-created after a reconnect,
+    while the socket is down they are inactive and bots fall back to polling.
+    """
+
+    def __init__(self, ws_url: str):
+        self.logger = logging.getLogger("chain-events")
+        self.ws_url = ws_url
+        self.subscriptions = []
+        # json rpc request id -> subscription waiting for its subscription id
+        self.pending = {}
+        # subscription id from the node -> subscription
+        self.active = {}
+        self.ws = None
+        self._request_id = 0
+        self._task = None
+
+    def watch_logs(self, address: str, topics: list, callback) -> LogSubscription:
+        """
+        Args:
+            address (str): contract emitting the logs
+            topics (list): eth_subscribe topic filter, EG [TRANSFER_TOPIC, ZERO_ADDRESS_TOPIC]
+            callback (callable): called with every matching log
+
+        Returns:
+            LogSubscription: subscription, check is_active() to know if logs are being received
+        """
+        subscription = LogSubscription(address, topics, callback)
+        self.subscriptions.append(subscription)
+        if self.ws != None and not self.ws.closed:
+            asyncio.ensure_future(self._subscribe(subscription))
+        return subscription
+
+    def start(self) -> None:
+        """
+        Starts the websocket task on the running event loop, later calls are no-ops
+        """
+        if self._task == None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        backoff = RECONNECT_BACKOFF_SECONDS
+        while True:
+            connected_at = time.monotonic()
+            try:
+                await self._listen()
+            except Exception as e:
+                self.logger.error("Chain event websocket failed")
+                self.logger.error(e)
+            self._deactivate()
+
+            if time.monotonic() - connected_at > MAX_RECONNECT_BACKOFF_SECONDS:
+                backoff = RECONNECT_BACKOFF_SECONDS
+            self.logger.warning(f"Reconnecting chain event websocket in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_RECONNECT_BACKOFF_SECONDS)
+
+    async def _listen(self) -> None:
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(
+                self.ws_url, heartbeat=HEARTBEAT_SECONDS
+            ) as ws:
+                self.ws = ws
+                for subscription in list(self.subscriptions):
+                    await self._subscribe(subscription)
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        self.handle_message(json.loads(message.data))
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        break
+
+    async def _subscribe(self, subscription: LogSubscription) -> None:
+        self._request_id += 1
+        self.pending[self._request_id] = subscription
+        log_filter = {"address": subscription.address}
+        if subscription.topics:
+            log_filter["topics"] = subscription.topics
+        await self.ws.send_json(
+            {
+                "jsonrpc": "2.0",
+                "id": self._request_id,
+                "method": "eth_subscribe",
+                "params": ["logs", log_filter],
+            }
+        )
+
+    def handle_message(self, message: dict) -> None:
+        """
+        Handles a json rpc message from the node, either the answer to an eth_subscribe request
+        or a log notification
+        """
+        if message.get("method") == "eth_subscription":
+            params = message.get("params", {})
+            subscription = self.active.get(params.get("subscription"))
+            if subscription == None:
+                return
+            try:
+                subscription.callback(params.get("result"))
+            except Exception as e:
+                self.logger.error(f"Error handling log from {subscription.address}")
+                self.logger.error(e)
+            return
+
+        subscription = self.pending.pop(message.get("id"), None)
+        if subscription == None:
+            return
+        if message.get("error") != None:
+            self.logger.error(
+                f"Subscription to {subscription.address} failed: {message.get('error')}"
+            )
+            return
+        self.active[message.get("result")] = subscription
+        subscription.active_since = time.time()
+        self.logger.info(f"Subscribed to logs of {subscription.address}")
+
+    def _deactivate(self) -> None:
+        self.ws = None
+        self.pending = {}
+        self.active = {}
+        for subscription in self.subscriptions:
+            subscription.active_since = None
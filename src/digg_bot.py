@@ -1,13 +1,13 @@
+import asyncio
 from decimal import Decimal
-import discord
-from discord.ext import tasks
 from dotenv import load_dotenv
-from price_bot import PriceBot
-import os
+from chain_events import ANSWER_UPDATED_TOPIC, LOG_REBASE_TOPIC
+from oracle import ChainlinkOracleReader
+from price_bot import get_shared_web3, PriceBot
 import requests
 import json
+import time
 from time import sleep
-from web3 import Web3
 
 load_dotenv()
 
@@ -15,11 +15,60 @@ UPDATE_INTERVAL_SECONDS = 45
 
 BTC_USD_ORACLE_ADDRESS = "0xF4030086522a5bEEa4988F8cA5B36dbC97BeE88c"
 DIGG_BTC_ORACLE_ADDRESS = "0x418a6C98CD5B8275955f08F0b8C1c6838c8b1685"
+# chainlink feed settings, a new round is posted on heartbeat or when price moves past deviation
+BTC_USD_ORACLE_HEARTBEAT_SECONDS = 3600
+BTC_USD_ORACLE_DEVIATION = 0.005
+DIGG_BTC_ORACLE_HEARTBEAT_SECONDS = 86400
+DIGG_BTC_ORACLE_DEVIATION = 0.02
+# coingecko ids used as off chain references to detect deviation triggered rounds
+COINGECKO_BTC_TOKEN_ID = "bitcoin"
+# DIGG can only rebase in this daily window, seconds after 00:00 UTC and window length
+DIGG_REBASE_WINDOW_OFFSET_SECONDS = 20 * 60 * 60
+DIGG_REBASE_WINDOW_LENGTH_SECONDS = 20 * 60
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def is_rebase_due(
+    read_at: float,
+    now: float,
+    window_offset: int = DIGG_REBASE_WINDOW_OFFSET_SECONDS,
+    window_length: int = DIGG_REBASE_WINDOW_LENGTH_SECONDS,
+) -> bool:
+    """
+    Args:
+        read_at (float): unix time the supply was last read
+        now (float): current unix time
+        window_offset (int): start of the daily rebase window in seconds after 00:00 UTC
+        window_length (int): length of the rebase window in seconds
+
+    Returns:
+        bool: True if a rebase window started before the end of which the supply was read,
+        meaning the supply may have changed
+    """
+    window_start = now - now % SECONDS_PER_DAY + window_offset
+    if window_start > now:
+        window_start -= SECONDS_PER_DAY
+    return read_at < window_start + window_length
 
 
 class DiggBot(PriceBot):
+    # DIGG is priced from on-chain oracles instead of coingecko
+    use_price_feed = False
+
     def __init__(self, *args, **kwargs):
-        self.web3 = Web3(Web3.HTTPProvider(os.getenv("INFURA_URL")))
+        # raw totalSupply(), only changes on rebase
+        self.total_supply = None
+        # time and supply change in percent of the last rebase seen
+        self.last_rebase = None
+        self.rebase_logged = False
+        self.rebase_window_offset = kwargs.get(
+            "rebase_window_offset", DIGG_REBASE_WINDOW_OFFSET_SECONDS
+        )
+        self.rebase_window_length = kwargs.get(
+            "rebase_window_length", DIGG_REBASE_WINDOW_LENGTH_SECONDS
+        )
+        self.oracles_watched = False
+        self.web3 = get_shared_web3()
         self.digg_oracle_abi = kwargs.get("digg_oracle_abi")
         self.btc_oracle_abi = kwargs.get("btc_oracle_abi")
         self.btc_oracle_contract = self.web3.eth.contract(
@@ -32,76 +81,232 @@ class DiggBot(PriceBot):
         )
         super().__init__(*args, **kwargs)
 
-    @tasks.loop(seconds=UPDATE_INTERVAL_SECONDS)
-    async def update_price(self):
-        """
-        Asynchronous function that runs every UPDATE_INTERVAL_SECONDS to get the current price and market of the
-        token and update the bot's name and activity in the guild.
-        """
-        # first get latest token data
-        self._get_token_data()
+        # oracle decimals are filled in by _load_metadata after login
+        self.digg_oracle = ChainlinkOracleReader(
+            self.digg_oracle_contract,
+            self.multicall,
+            None,
+            kwargs.get("digg_oracle_heartbeat", DIGG_BTC_ORACLE_HEARTBEAT_SECONDS),
+            kwargs.get("digg_oracle_deviation", DIGG_BTC_ORACLE_DEVIATION),
+        )
+        self.btc_oracle = ChainlinkOracleReader(
+            self.btc_oracle_contract,
+            self.multicall,
+            None,
+            kwargs.get("btc_oracle_heartbeat", BTC_USD_ORACLE_HEARTBEAT_SECONDS),
+            kwargs.get("btc_oracle_deviation", BTC_USD_ORACLE_DEVIATION),
+        )
+        # reference prices ride along in the shared feed's batched coingecko call
+        self.price_feed.add_token(COINGECKO_BTC_TOKEN_ID)
+        self.price_feed.add_token(self.coingecko_token_id)
+        self._watch_logs("supply", self.token_contract.address, [LOG_REBASE_TOPIC])
 
-        activity_string = (
+    def _get_activity_string(self) -> str:
+        stale_seconds = self._get_oracle_stale_seconds()
+        if stale_seconds != None:
+            # don't show a price the oracles stopped updating
+            return f"oracle stale {round(stale_seconds / 60)}m"
+
+        return (
             "mcap=$"
             + self._get_number_label(self.token_data.get("market_cap"))
             + " btc="
             + str(round(self.token_data.get("token_price_btc"), 2))
+            + self._get_change_label()
+            + self._get_rebase_label()
         )
-        activity = discord.Activity(
-            name=activity_string,
-            type=discord.ActivityType.playing,
-        )
-        await self.change_presence(activity=activity)
-        for guild in self.guilds:
-            self.logger.info(guild.members)
-            for member in guild.members:
-                if str(member.id) == self.discord_id:
-                    try:
-                        await member.edit(
-                            nick=f"{self.token_display} $"
-                            + str(round(self.token_data.get("token_price_usd")))
-                        )
-                    except Exception as e:
-                        self.logger.error("Error updated nickname")
-                        self.logger.error(e)
-
-    @update_price.before_loop
-    async def before_update_price(self):
-        await self.wait_until_ready()  # wait until the bot logs in
-
-    def _get_token_data(self):
+
+    def _get_rebase_label(self) -> str:
         """
-        Private function to make call to thegraph to retrieve price and market cap for the token and update
-        token data property.
+        Returns:
+            str: change and age of the last rebase, EG " rebase=+1.25% 3h ago"
         """
+        if self.last_rebase == None:
+            return ""
+        hours = int((time.time() - self.last_rebase.get("at")) // 3600)
+        return f" rebase={self.last_rebase.get('percent'):+.2f}% {hours}h ago"
 
-        token_price_btc = self._get_digg_btc_price()
-        token_price_usd = token_price_btc * self._get_btc_usd_price()
-        market_cap = token_price_usd * Decimal(self._get_supply())
-
-        self.token_data = {
-            "token_price_usd": token_price_usd,
-            "token_price_btc": token_price_btc,
-            "market_cap": market_cap,
+    def _get_snapshot(self) -> dict:
+        return {
+            **super()._get_snapshot(),
+            "total_supply": self.total_supply,
+            "supply_read_at": self.source_read_at.get("supply"),
+            "last_rebase": self.last_rebase,
         }
 
-    def _get_digg_btc_price(self) -> Decimal:
+    def _restore_snapshot(self, snapshot: dict) -> None:
+        super()._restore_snapshot(snapshot)
+        # the supply read before the restart is reused until the next rebase window
+        self.total_supply = snapshot.get("total_supply")
+        if self.total_supply != None and snapshot.get("supply_read_at") != None:
+            self.source_read_at["supply"] = snapshot.get("supply_read_at")
+        self.last_rebase = snapshot.get("last_rebase")
+
+    def _on_chain_event(self, source: str, log: dict) -> None:
+        if source == "supply":
+            # rebases that leave the supply unchanged still count as a rebase
+            self.rebase_logged = True
+        super()._on_chain_event(source, log)
+
+    def _is_read_due(self, source: str, read_at: float, now: float) -> bool:
+        # the supply only changes on rebase, which can only happen in the daily window
+        if source == "supply":
+            return is_rebase_due(
+                read_at, now, self.rebase_window_offset, self.rebase_window_length
+            )
+        return super()._is_read_due(source, read_at, now)
 
-        return Decimal(
-            self.digg_oracle_contract.functions.latestRoundData().call()[1] 
-            / 10 ** 8
+    def _update_supply(self, total_supply: int, at: float, rebased: bool = False):
+        """
+        Stores a read or logged total supply, a changed supply means a rebase happened
+
+        Args:
+            total_supply (int): raw total supply
+            at (float): unix time the supply was seen
+            rebased (bool): True if a rebase log was seen, rebases can leave the supply as is
+        """
+        if self.total_supply != None and (rebased or total_supply != self.total_supply):
+            percent = (total_supply / self.total_supply - 1) * 100
+            self.last_rebase = {"at": at, "percent": percent}
+            self.logger.info(f"DIGG rebased by {percent:+.2f}%")
+        self.total_supply = total_supply
+
+    def _get_nickname(self) -> str:
+        if self._get_oracle_stale_seconds() != None:
+            return f"{self.token_display} stale"
+
+        return f"{self.token_display} $" + str(
+            round(self.token_data.get("token_price_usd"))
         )
 
-    def _get_btc_usd_price(self) -> Decimal:
+    async def _load_metadata(self):
+        await super()._load_metadata()
+        for oracle in [self.digg_oracle, self.btc_oracle]:
+            if oracle.decimals == None:
+                metadata = await self.loop.run_in_executor(
+                    None, self.metadata_cache.get, oracle.contract
+                )
+                oracle.decimals = metadata.get("decimals")
+        if self.chain_events != None and not self.oracles_watched:
+            await self._watch_oracles()
 
-        return Decimal(
-            self.btc_oracle_contract.functions.latestRoundData().call()[1] 
-            / 10 ** 8
+    async def _watch_oracles(self):
+        """
+        Subscribes to new oracle rounds. AnswerUpdated is emitted by the aggregator behind the
+        oracle proxy, so its address is read from the proxy first. If the lookup fails the
+        oracles keep being polled and the lookup is retried on the next update.
+        """
+        oracles = {"digg_oracle": self.digg_oracle, "btc_oracle": self.btc_oracle}
+        aggregators = {}
+        try:
+            for source, oracle in oracles.items():
+                aggregators[source] = await self.loop.run_in_executor(
+                    None, oracle.contract.functions.aggregator().call
+                )
+        except Exception as e:
+            self.logger.error("Error reading oracle aggregators, polling oracles")
+            self.logger.error(e)
+            return
+        for source, aggregator in aggregators.items():
+            self._watch_logs(source, aggregator, [ANSWER_UPDATED_TOPIC])
+        self.oracles_watched = True
+
+    async def _update_token_data(self):
+        """
+        Reads the DIGG supply and any oracle that may have posted a new round in a single
+        multicall batch and updates token data property. With log subscriptions the oracles
+        are only read after AnswerUpdated and the supply after LogRebase.
+        """
+        if self._is_watched("digg_oracle") and self._is_watched("btc_oracle"):
+            reference_prices = {}
+        else:
+            reference_prices = await self._get_reference_prices()
+
+        digg_price_btc, btc_price_usd, total_supply = await asyncio.gather(
+            self._read_oracle(
+                "digg_oracle", self.digg_oracle, reference_prices.get("digg_btc")
+            ),
+            self._read_oracle(
+                "btc_oracle", self.btc_oracle, reference_prices.get("btc_usd")
+            ),
+            self._read_if_changed(
+                "supply",
+                lambda: self.multicall.call(
+                    self.token_contract.functions.totalSupply()
+                ),
+                self.total_supply,
+            ),
         )
+        self._update_supply(total_supply, time.time(), rebased=self.rebase_logged)
+        self.rebase_logged = False
 
-    def _get_supply(self):
-        supply = (
-            self.token_contract.functions.totalSupply().call()
-            / 10 ** self.token_contract.functions.decimals().call()
+        self.token_data = self._compute_token_data(
+            digg_price_btc,
+            btc_price_usd,
+            self.total_supply / 10 ** self.token_metadata.get("decimals"),
         )
-        return supply
+
+    async def _read_oracle(
+        self, source: str, oracle: ChainlinkOracleReader, reference_price: float
+    ) -> Decimal:
+        """
+        Returns:
+            Decimal: oracle price, re-read after AnswerUpdated if the oracle is watched, otherwise
+            when heartbeat or deviation say a new round may exist
+        """
+        if self._is_watched(source):
+            return await self._read_if_changed(
+                source, lambda: self._refresh_oracle(oracle), oracle.price
+            )
+        return await oracle.get_price(reference_price)
+
+    async def _refresh_oracle(self, oracle: ChainlinkOracleReader) -> Decimal:
+        await oracle.refresh()
+        return oracle.price
+
+    async def _get_reference_prices(self) -> dict:
+        """
+        Gets off chain prices from the shared price feed for oracle deviation checks. Oracle
+        reads fall back to heartbeat and max poll interval if coingecko is unavailable.
+
+        Returns:
+            dict: digg_btc and btc_usd reference prices, values are None if unavailable
+        """
+        try:
+            btc_data = await self.price_feed.get_token_data_async(
+                COINGECKO_BTC_TOKEN_ID
+            )
+            digg_data = self.price_feed.snapshot.get(self.coingecko_token_id)
+        except Exception as e:
+            self.logger.error("Error getting reference prices")
+            self.logger.error(e)
+            return {}
+
+        return {
+            "btc_usd": btc_data.get("token_price_usd") if btc_data else None,
+            "digg_btc": digg_data.get("token_price_btc") if digg_data else None,
+        }
+
+    def _get_oracle_stale_seconds(self) -> float:
+        """
+        Returns:
+            float: staleness of the most out of date stale oracle, None if no oracle is stale
+        """
+        stale = [
+            oracle.get_staleness_seconds()
+            for oracle in [self.digg_oracle, self.btc_oracle]
+            if oracle.is_stale()
+        ]
+        return max(stale) if len(stale) > 0 else None
+
+    def _compute_token_data(
+        self, token_price_btc: Decimal, btc_price_usd: Decimal, supply: float
+    ) -> dict:
+        token_price_usd = token_price_btc * btc_price_usd
+        market_cap = token_price_usd * Decimal(supply)
+
+        return {
+            "token_price_usd": token_price_usd,
+            "token_price_btc": token_price_btc,
+            "market_cap": market_cap,
+        }
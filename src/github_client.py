@@ -0,0 +1,152 @@
+from github import Github
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+import time
+
+GITHUB_API_URL = "https://api.github.com"
+# a warning is logged once fewer requests than this are left in the rate limit window
+RATE_LIMIT_WARNING_REMAINING = 100
+
+
+class GitHubClient:
+    """
+    Single GitHub access layer for a repo. Requests go through one authenticated, pooled
+    session and are conditional on the etag of the last response to the same url, which
+    GitHub answers with a 304 that doesn't count against the rate limit. Blob shas of files
+    are cached per commit and the rate limit headers are tracked as metrics. Writes use one
+    shared PyGithub client.
+    """
+
+    def __init__(self, token: str, repo: str, session: requests.Session = None):
+        """
+        Args:
+            token (str): github personal access token, None for anonymous requests
+            repo (str): repo full name, EG "Badger-Finance/SourceCred"
+            session (requests.Session, optional): session to send requests with
+        """
+        self.logger = logging.getLogger("github-client")
+        self.token = token
+        self.repo = repo
+        self.session = session if session != None else requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+        self.session.headers.update({"Accept": "application/vnd.github.v3+json"})
+        if token:
+            self.session.headers.update({"Authorization": f"token {token}"})
+        # url -> (etag, json body) of the last successful response
+        self.responses = {}
+        # path -> (commit sha, blob sha) of the latest commit the path was resolved at
+        self.blob_shas = {}
+        self.rate_limit = {}
+        self.requests_sent = 0
+        self.not_modified = 0
+        self._github = None
+        self._repo = None
+
+    def get_repo(self):
+        """
+        Returns:
+            Repository: PyGithub repo of the shared client, loaded lazily
+        """
+        if self._github == None:
+            self._github = Github(self.token)
+        if self._repo == None:
+            self._repo = self._github.get_repo(self.repo, lazy=True)
+        return self._repo
+
+    def get_json(self, path: str) -> dict:
+        """
+        Args:
+            path (str): api path relative to the repo, EG "git/ref/heads/master"
+
+        Raises:
+            requests.HTTPError: if github answers with an error
+
+        Returns:
+            dict: json body, the cached one if github answered 304 Not Modified
+        """
+        url = f"{GITHUB_API_URL}/repos/{self.repo}/{path}"
+        cached = self.responses.get(url)
+        headers = {"If-None-Match": cached[0]} if cached != None else {}
+
+        response = self.session.get(url, headers=headers)
+        self.requests_sent += 1
+        self._update_rate_limit(response.headers)
+        if response.status_code == 304 and cached != None:
+            self.not_modified += 1
+            return cached[1]
+        response.raise_for_status()
+
+        body = response.json()
+        if response.headers.get("ETag"):
+            self.responses[url] = (response.headers.get("ETag"), body)
+        return body
+
+    def get_ref_sha(self, branch: str = "master") -> str:
+        return self.get_json(f"git/ref/heads/{branch}").get("object").get("sha")
+
+    def get_tree_sha(self, commit_sha: str) -> str:
+        return self.get_json(f"git/commits/{commit_sha}").get("tree").get("sha")
+
+    def get_blob_sha(self, path: str, commit_sha: str) -> str:
+        """
+        Resolves path one directory at a time from the commit's tree, unless it was already
+        resolved or written at that commit
+
+        Raises:
+            ValueError: if the commit has no file at path
+
+        Returns:
+            str: blob sha of the file at path
+        """
+        cached = self.blob_shas.get(path)
+        if cached != None and cached[0] == commit_sha:
+            return cached[1]
+
+        sha = self.get_tree_sha(commit_sha)
+        for name in path.split("/"):
+            tree = self.get_json(f"git/trees/{sha}").get("tree")
+            entry = next((entry for entry in tree if entry.get("path") == name), None)
+            if entry == None:
+                raise ValueError(f"Commit {commit_sha} did not contain {path}")
+            sha = entry.get("sha")
+
+        self.set_blob_sha(path, commit_sha, sha)
+        return sha
+
+    def set_blob_sha(self, path: str, commit_sha: str, blob_sha: str) -> None:
+        """
+        Caches the blob sha of a file written at a commit, EG by our own update
+        """
+        self.blob_shas[path] = (commit_sha, blob_sha)
+
+    def get_metrics(self) -> dict:
+        """
+        Returns:
+            dict: rate limit budget from the latest response headers and request counts
+        """
+        return {
+            "rate_limit": self.rate_limit.get("limit"),
+            "rate_limit_remaining": self.rate_limit.get("remaining"),
+            "rate_limit_used": self.rate_limit.get("used"),
+            "rate_limit_reset_seconds": (
+                max(self.rate_limit.get("reset") - time.time(), 0)
+                if self.rate_limit.get("reset") != None
+                else None
+            ),
+            "requests": self.requests_sent,
+            "not_modified": self.not_modified,
+        }
+
+    def _update_rate_limit(self, headers: dict) -> None:
+        for name in ["limit", "remaining", "used", "reset"]:
+            value = headers.get(f"X-RateLimit-{name.capitalize()}")
+            if value != None:
+                self.rate_limit[name] = int(value)
+
+        remaining = self.rate_limit.get("remaining")
+        if remaining != None and remaining < RATE_LIMIT_WARNING_REMAINING:
+            self.logger.warning(
+                f"Only {remaining} of {self.rate_limit.get('limit')} github requests "
+                "left in the rate limit window"
+            )
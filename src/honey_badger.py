@@ -7,6 +7,7 @@ import logging
 import math
 import os
 import requests
+from price_store import downsample, PriceStore, render_sparkline
 from sourcecred import SourceCredManager
 
 load_dotenv()
@@ -24,6 +25,9 @@ SC_REGISTRATION_QUEUE_NAME = os.getenv("SC_REGISTRATION_QUEUE_NAME")
 PAYOUT_CHANNEL_ID = os.getenv("PAYOUT_CHANNEL_ID")
 PAYOUT_ADMIN_ROLE_NAME = os.getenv("PAYOUT_ADMIN_ROLE_NAME")
 REGISTER_POLL_INTERVAL_HOURS = 1
+CHART_WINDOW_UNITS = {"h": 60 * 60, "d": 24 * 60 * 60}
+DEFAULT_CHART_WINDOW = "24h"
+CHART_POINTS = 48
 
 
 class BadgerBot(discord.Client):
@@ -53,6 +57,9 @@ class BadgerBot(discord.Client):
             SC_REGISTRATION_TABLE_NAME
         )
 
+        # written by the price bots, charts are served from it without coingecko calls
+        self.price_store = PriceStore()
+
         self.process_outstanding_registration_requests.start()
 
     async def on_ready(self):
@@ -66,6 +73,8 @@ class BadgerBot(discord.Client):
                 await self.submit_sourcecred_user_registration(message)
             elif message.content.startswith("!kudos"):
                 await self.send_kudos_eli5(message)
+            elif message.content.startswith("!chart"):
+                await self.send_price_chart(message)
             elif (
                 message.content.startswith("!payout") 
                 and message.channel.id == int(PAYOUT_CHANNEL_ID)
@@ -94,7 +103,7 @@ class BadgerBot(discord.Client):
         discord_ids = [discord_id for discord_id in unique_registrations.keys()]
         self.logger.info(f"submitting discord_ids {discord_ids}")
 
-        activated_users = self.sc.activate_discord_users(discord_ids)
+        activated_users = self._activate_users(discord_ids)
 
         # after successful registration, add entry to db for user marking them registered
         if len(activated_users) > 0:
@@ -110,6 +119,7 @@ class BadgerBot(discord.Client):
         the users to the ledger.json
         """
         self.logger.info("Checking for outstanding registration requests.")
+        self._refresh_ledger()
         # poll queue to get messages
         registration_messages = self._get_outstanding_registration_messages()
 
@@ -122,7 +132,7 @@ class BadgerBot(discord.Client):
         discord_ids = [discord_id for discord_id in unique_registrations.keys()]
         self.logger.info(f"submitting discord_ids {discord_ids}")
 
-        activated_users = self.sc.activate_discord_users(discord_ids)
+        activated_users = self._activate_users(discord_ids)
 
         # after successful registration, add entry to db for user marking them registered
         if len(activated_users) > 0:
@@ -130,6 +140,24 @@ class BadgerBot(discord.Client):
             self.logger.info("Successfully activated following users")
             self.logger.info(activated_users)
 
+    def _activate_users(self, discord_ids: list) -> list:
+        # a ledger that can't be brought in line with master skips this batch instead of
+        # stopping the loop, the users are not marked registered and can register again
+        try:
+            return self.sc.activate_discord_users(discord_ids)
+        except ValueError as e:
+            self.logger.error("Error updating SourceCred ledger, skipping registrations")
+            self.logger.error(e)
+            return []
+
+    def _refresh_ledger(self):
+        # picks up aliases added since the bot started, an unchanged ledger costs a 304
+        try:
+            self.sc.refresh_ledger()
+        except Exception as e:
+            self.logger.error("Error refreshing SourceCred ledger, using the loaded one")
+            self.logger.error(e)
+
     @process_outstanding_registration_requests.before_loop
     async def before_update_price(self):
         await self.wait_until_ready()  # wait until the bot logs in
@@ -217,6 +245,65 @@ class BadgerBot(discord.Client):
 
         return msg
 
+    async def send_price_chart(self, message: discord.Message):
+        """
+        Replies to `!chart <token> [window]`, EG `!chart badger 7d`, with a sparkline of the
+        token's price from the local price store
+        """
+        try:
+            chart = self._get_price_chart(message.content)
+        except Exception as e:
+            self.logger.error(f"Error rendering chart for {message.content}")
+            self.logger.error(e)
+            chart = "Price chart is not available right now, try again later."
+        await message.channel.send(chart)
+
+    def _get_price_chart(self, content: str, now: float = None) -> str:
+        """
+        Args:
+            content (str): chart command, EG "!chart badger 7d"
+
+        Returns:
+            str: chart message, or usage help if the command can't be charted
+        """
+        args = content.split()[1:]
+        window = args[1].lower() if len(args) > 1 else DEFAULT_CHART_WINDOW
+        seconds = self._get_chart_window_seconds(window)
+        if len(args) == 0 or seconds == None:
+            tokens = ", ".join(self.price_store.get_tokens()) or "none yet"
+            return (
+                "Usage: `!chart <token> [window]`, EG `!chart badger 7d`. "
+                f"Tokens: {tokens}"
+            )
+
+        token = args[0]
+        series = self.price_store.get_series(token, seconds, now)
+        prices = [price for _, price in series]
+        if len(prices) < 2:
+            return f"No {window} price history for {token.upper()} yet."
+
+        sparkline = render_sparkline(downsample(prices, CHART_POINTS))
+        change = (prices[-1] / prices[0] - 1) * 100 if prices[0] != 0 else 0
+        return (
+            f"{token.upper()} {window} `{sparkline}`\n"
+            f"{self._get_price_label(prices[-1])} ({change:+.1f}%) "
+            f"low {self._get_price_label(min(prices))} "
+            f"high {self._get_price_label(max(prices))}"
+        )
+
+    def _get_price_label(self, price: float) -> str:
+        return f"${price:,.2f}" if price >= 1 else f"${price:.4g}"
+
+    def _get_chart_window_seconds(self, window: str) -> int:
+        """
+        Returns:
+            int: length of a window like "24h" or "7d" in seconds, None if it's not valid
+        """
+        unit_seconds = CHART_WINDOW_UNITS.get(window[-1:])
+        if unit_seconds == None or not window[:-1].isdigit() or int(window[:-1]) == 0:
+            return None
+        return int(window[:-1]) * unit_seconds
+
     async def send_user_dm(self, user_id: int, message: str):
         try:
             # dm user letting them know registration failed
@@ -0,0 +1,88 @@
+import aiohttp
+import asyncio
+import logging
+
+DEFAULT_CONNECTION_LIMIT = 20
+DEFAULT_TIMEOUT_SECONDS = 10
+DNS_CACHE_TTL_SECONDS = 300
+
+
+class AsyncHttpClient:
+    """
+    asyncio native http client shared by the price bots. Connections are pooled in a single
+    aiohttp session and every request has a timeout so one slow upstream can't stall the
+    event loop the discord clients run on.
+    """
+
+    def __init__(
+        self,
+        connection_limit: int = DEFAULT_CONNECTION_LIMIT,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+    ):
+        self.logger = logging.getLogger("http-client")
+        self.connection_limit = connection_limit
+        self.timeout_seconds = timeout_seconds
+        self.session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Lazily creates the aiohttp session, it has to be created inside the running event loop.
+        """
+        if self.session == None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connection_limit, ttl_dns_cache=DNS_CACHE_TTL_SECONDS
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+            )
+        return self.session
+
+    async def get_json(self, url: str, params: dict = None, timeout: float = None):
+        """
+        Makes GET request and returns the decoded json body
+
+        Args:
+            url (str): url to request
+            params (dict, optional): query params
+            timeout (float, optional): overrides the default timeout for this request
+
+        Raises:
+            aiohttp.ClientError: on connection errors or non 2xx responses
+            asyncio.TimeoutError: if the request takes longer than the timeout
+
+        Returns:
+            dict or list: decoded json response
+        """
+        # passing timeout=None would turn off the session's default timeout
+        request_options = {"params": params}
+        if timeout != None:
+            request_options["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        try:
+            async with self._get_session().get(url, **request_options) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+        except aiohttp.ClientOSError as e:
+            # on python 3.11+ timeouts are OSErrors, which aiohttp 3.7 wraps
+            if isinstance(e.__cause__, asyncio.TimeoutError):
+                raise asyncio.TimeoutError() from e
+            raise
+
+    async def get_json_many(self, requests: list) -> list:
+        """
+        Runs several GET requests concurrently
+
+        Args:
+            requests (list): list of (url, params) tuples
+
+        Returns:
+            list: decoded json bodies in the same order as requests, failed requests are
+            returned as the raised exception
+        """
+        return await asyncio.gather(
+            *[self.get_json(url, params) for url, params in requests],
+            return_exceptions=True,
+        )
+
+    async def close(self) -> None:
+        if self.session != None and not self.session.closed:
+            await self.session.close()
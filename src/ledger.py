@@ -0,0 +1,218 @@
+from array import array
+import hashlib
+import json
+import sys
+
+# bytes at the end of the downloaded ledger.json an incremental sync checks again
+SOURCE_TAIL_BYTES = 1024
+
+
+def get_discord_alias_id(action: dict) -> str:
+    """
+    Args:
+        action (dict): sourcecred action object
+
+    Returns:
+        str: discord id of a discord ADD_ALIAS action, None for any other action
+    """
+    alias = action.get("alias")
+    address = alias.get("address").split("\0") if alias else []
+    return address[5] if len(address) >= 6 and address[2] == "discord" else None
+
+
+def serialize_action(action: dict) -> bytes:
+    """
+    Returns:
+        bytes: ledger line of the action in sourcecred's own compact, key sorted json
+    """
+    return json.dumps(action, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+class DiscordAlias:
+    """
+    The fields of a discord ADD_ALIAS ledger action the bot uses
+    """
+
+    __slots__ = ("discord_id", "identity_id", "description")
+
+    def __init__(self, discord_id: str, identity_id: str, description: str):
+        self.discord_id = discord_id
+        self.identity_id = identity_id
+        self.description = description
+
+
+class Ledger:
+    """
+    Compact in memory copy of the sourcecred ledger.json. Lines are parsed one at a time as
+    they stream in and only the discord aliases are kept as objects, the file is stored as
+    raw bytes in one buffer, newlines and blank lines included, so it can be written back
+    byte for byte. Iterating still yields action dicts, decoded on demand. The size, last
+    bytes and etag of the downloaded file are tracked so new lines can later be fetched on
+    their own.
+    """
+
+    def __init__(self):
+        # ledger.json bytes, with the offsets each line starts and ends at without its newline
+        self.data = bytearray()
+        self.line_starts = array("Q")
+        self.line_ends = array("Q")
+        self.discord_aliases = []
+        # discord id -> identityId of the first discord alias with that id
+        self.discord_identity_ids = {}
+        # ledger.json as last downloaded or uploaded
+        self.source_size = 0
+        self.source_tail = b""
+        self.source_etag = None
+        # offset of the first byte not yet split into lines
+        self._parsed_size = 0
+
+    @classmethod
+    def from_lines(cls, lines) -> "Ledger":
+        """
+        Args:
+            lines (iterable): raw ledger lines, EG a streamed response's iter_lines()
+        """
+        ledger = cls()
+        for line in lines:
+            if line.strip():
+                ledger.append_line(line)
+        return ledger
+
+    @classmethod
+    def from_chunks(cls, chunks, etag: str = None) -> "Ledger":
+        """
+        Args:
+            chunks (iterable): ledger.json bytes, EG a streamed response's iter_content()
+            etag (str, optional): etag of the downloaded file
+        """
+        ledger = cls()
+        for chunk in chunks:
+            ledger.feed(chunk)
+        ledger.finish()
+        ledger.source_etag = etag
+        return ledger
+
+    def __len__(self) -> int:
+        return len(self.line_ends)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield json.loads(self.get_line(i))
+
+    def get_line(self, index: int) -> bytes:
+        return bytes(self.data[self.line_starts[index] : self.line_ends[index]])
+
+    def append_line(self, line: bytes) -> None:
+        """
+        Adds a serialized ledger line as is and indexes it if it's a discord alias
+        """
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        line = line.rstrip(b"\r\n")
+        self._index(json.loads(line))
+        if len(self.data) > 0 and not self.data.endswith(b"\n"):
+            self.data += b"\n"
+        self.line_starts.append(len(self.data))
+        self.data += line
+        self.line_ends.append(len(self.data))
+        self._parsed_size = len(self.data)
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Appends a chunk of ledger.json and indexes its complete lines, the rest waits for the
+        next chunk or finish()
+        """
+        self.source_size += len(chunk)
+        self.source_tail = (self.source_tail + chunk)[-SOURCE_TAIL_BYTES:]
+        self.data += chunk
+        newline = self.data.find(b"\n", self._parsed_size)
+        while newline != -1:
+            self._add_parsed_line(newline)
+            newline = self.data.find(b"\n", self._parsed_size)
+
+    def finish(self) -> None:
+        """
+        Indexes the last line of the fed bytes, which has no trailing newline
+        """
+        if self._parsed_size < len(self.data):
+            self._add_parsed_line(len(self.data))
+
+    def is_source_tail(self, data: bytes) -> bool:
+        """
+        Returns:
+            bool: True if data are the last len(data) bytes of the tracked ledger.json
+        """
+        return len(data) <= len(self.source_tail) and self.source_tail.endswith(data)
+
+    def set_source(self, content: bytes, etag: str = None) -> None:
+        """
+        Tracks content as the current ledger.json, EG after uploading to_bytes()
+        """
+        self.source_size = len(content)
+        self.source_tail = content[-SOURCE_TAIL_BYTES:]
+        self.source_etag = etag
+
+    def append(self, action: dict) -> None:
+        self.append_line(serialize_action(action))
+
+    def extend(self, actions: list) -> None:
+        for action in actions:
+            self.append(action)
+
+    def get_discord_identity_id(self, discord_id: str) -> str:
+        return self.discord_identity_ids.get(discord_id)
+
+    def to_bytes(self, appended_lines: list = None) -> bytes:
+        """
+        Args:
+            appended_lines (list, optional): serialized lines written after the ledger's own
+
+        Returns:
+            bytes: ledger.json contents, the appended lines are joined by newlines
+        """
+        if not appended_lines:
+            return bytes(self.data)
+        separator = (
+            b"\n" if len(self.data) > 0 and not self.data.endswith(b"\n") else b""
+        )
+        return bytes(self.data) + separator + b"\n".join(appended_lines)
+
+    def get_blob_sha(self) -> str:
+        """
+        Returns:
+            str: git blob sha of to_bytes(), equal to the blob sha of ledger.json on github if
+            the local ledger is up to date
+        """
+        blob = hashlib.sha1(b"blob %d\0" % len(self.data))
+        # hashed in place, the ledger can be megabytes
+        blob.update(self.data)
+        return blob.hexdigest()
+
+    def _add_parsed_line(self, end: int) -> None:
+        """
+        Indexes the bytes from the last parsed offset up to end, blank lines are only kept
+        in data
+        """
+        start = self._parsed_size
+        # past the newline, finish() indexes up to the end of data which has none
+        self._parsed_size = min(end + 1, len(self.data))
+        line = bytes(self.data[start:end]).rstrip(b"\r")
+        if not line.strip():
+            return
+        self._index(json.loads(line))
+        self.line_starts.append(start)
+        self.line_ends.append(start + len(line))
+
+    def _index(self, entry: dict) -> None:
+        action = entry.get("action", {})
+        discord_id = get_discord_alias_id(action)
+        if discord_id == None:
+            return
+
+        alias = DiscordAlias(
+            sys.intern(discord_id),
+            sys.intern(action.get("identityId")),
+            action.get("alias").get("description"),
+        )
+        self.discord_aliases.append(alias)
+        self.discord_identity_ids.setdefault(alias.discord_id, alias.identity_id)
@@ -0,0 +1,234 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+# blocks per eth_getLogs request, well under common node limits on busy contracts
+CHUNK_SIZE_BLOCKS = 2000
+# logs this close to the head can still be reorged, they are never cached
+CONFIRMATION_BLOCKS = 12
+# oldest scanned blocks are dropped from the cache past this range
+MAX_CACHED_BLOCKS = 50000
+MAX_CACHED_RECEIPTS = 5000
+MAX_WORKERS = 8
+# node errors for ranges that are too big, only these are retried as smaller ranges.
+# -32005 is the json rpc code for a limit exceeded, EG more than 10000 results on infura
+SPLITTABLE_ERROR_CODES = {-32005}
+SPLITTABLE_ERROR_MESSAGES = [
+    "query returned more than",
+    "response size exceeded",
+    "block range",
+    "range too large",
+    "range is too large",
+    "too many",
+]
+# a chunk is halved at most this many times, 2000 blocks down to ranges of about 8 blocks
+MAX_SPLIT_DEPTH = 8
+
+
+class LogScanner:
+    """
+    Reads contract logs with plain eth_getLogs requests over bounded block ranges instead of
+    stateful filters. Logs of confirmed blocks are cached per address and topics, so scanning the
+    same range again only requests blocks that weren't scanned yet. Receipts are fetched
+    concurrently and cached as well.
+    """
+
+    def __init__(
+        self,
+        web3,
+        chunk_size: int = CHUNK_SIZE_BLOCKS,
+        confirmations: int = CONFIRMATION_BLOCKS,
+        max_workers: int = MAX_WORKERS,
+    ):
+        self.logger = logging.getLogger("log-scanner")
+        self.web3 = web3
+        self.chunk_size = chunk_size
+        self.confirmations = confirmations
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.max_workers = max_workers
+        # (address, topics) -> {"from_block": int, "to_block": int, "logs": list}
+        self.scanned = {}
+        self.receipts = {}
+        self.requests = 0
+
+    def get_logs(
+        self,
+        address: str,
+        topics: list,
+        from_block: int,
+        to_block: int,
+        latest_block: int,
+    ) -> list:
+        """
+        Args:
+            address (str): contract address
+            topics (list): topic filter, EG [TRANSFER_TOPIC]
+            from_block (int): first block, inclusive
+            to_block (int): last block, inclusive
+            latest_block (int): chain head, blocks within confirmations of it are not cached
+
+        Returns:
+            list: logs in the range ordered by block and log index
+        """
+        key = (address, tuple(topics))
+        safe_block = latest_block - self.confirmations
+        scanned = self.scanned.get(key)
+
+        if scanned == None or to_block < scanned.get("from_block") - 1:
+            scanned = self._new_range(key, from_block, min(to_block, safe_block))
+        else:
+            if from_block < scanned.get("from_block"):
+                older = self._get_logs_chunked(
+                    address, topics, from_block, scanned.get("from_block") - 1
+                )
+                scanned["logs"] = older + scanned.get("logs")
+                scanned["from_block"] = from_block
+            if min(to_block, safe_block) > scanned.get("to_block"):
+                newer = self._get_logs_chunked(
+                    address,
+                    topics,
+                    scanned.get("to_block") + 1,
+                    min(to_block, safe_block),
+                )
+                scanned["logs"] = scanned.get("logs") + newer
+                scanned["to_block"] = min(to_block, safe_block)
+            self._trim(scanned)
+
+        logs = [
+            log
+            for log in scanned.get("logs")
+            if from_block <= log.get("blockNumber") <= to_block
+        ]
+        # unconfirmed blocks are always read from the node
+        unconfirmed_from = max(scanned.get("to_block") + 1, from_block)
+        if to_block >= unconfirmed_from:
+            logs += self._get_logs_chunked(address, topics, unconfirmed_from, to_block)
+        return logs
+
+    def get_receipts(self, tx_hashes: list) -> list:
+        """
+        Args:
+            tx_hashes (list): transaction hashes
+
+        Returns:
+            list: receipts in the same order, fetched concurrently if not cached
+        """
+        missing = [tx_hash for tx_hash in tx_hashes if tx_hash not in self.receipts]
+        fetched = self.executor.map(self._get_receipt, missing)
+        for tx_hash, receipt in zip(missing, fetched):
+            self.receipts[tx_hash] = receipt
+        receipts = [self.receipts.get(tx_hash) for tx_hash in tx_hashes]
+
+        while len(self.receipts) > MAX_CACHED_RECEIPTS:
+            self.receipts.pop(next(iter(self.receipts)))
+        return receipts
+
+    def iter_ranges_backwards(self, latest_block: int, max_blocks: int):
+        """
+        Yields (from_block, to_block) ranges of chunk_size blocks from the head backwards, for
+        searches that stop at the most recent match
+        """
+        to_block = latest_block
+        while to_block > latest_block - max_blocks:
+            from_block = max(
+                to_block - self.chunk_size + 1, latest_block - max_blocks + 1
+            )
+            yield from_block, to_block
+            to_block = from_block - 1
+
+    def _new_range(self, key: tuple, from_block: int, to_block: int) -> dict:
+        scanned = {
+            "from_block": from_block,
+            "to_block": to_block,
+            "logs": (
+                self._get_logs_chunked(key[0], list(key[1]), from_block, to_block)
+                if to_block >= from_block
+                else []
+            ),
+        }
+        # an empty range keeps to_block below from_block so it is extended later
+        scanned["to_block"] = max(to_block, from_block - 1)
+        self.scanned[key] = scanned
+        return scanned
+
+    def _trim(self, scanned: dict) -> None:
+        oldest_block = scanned.get("to_block") - MAX_CACHED_BLOCKS + 1
+        if scanned.get("from_block") < oldest_block:
+            scanned["from_block"] = oldest_block
+            scanned["logs"] = [
+                log
+                for log in scanned.get("logs")
+                if log.get("blockNumber") >= oldest_block
+            ]
+
+    def _get_logs_chunked(
+        self, address: str, topics: list, from_block: int, to_block: int
+    ) -> list:
+        """
+        Requests the range in chunks of chunk_size blocks, concurrently
+        """
+        ranges = [
+            (start, min(start + self.chunk_size - 1, to_block))
+            for start in range(from_block, to_block + 1, self.chunk_size)
+        ]
+        logs = []
+        for chunk in self.executor.map(
+            lambda block_range: self._get_logs(address, topics, *block_range), ranges
+        ):
+            logs += chunk
+        return logs
+
+    def _get_logs(
+        self, address: str, topics: list, from_block: int, to_block: int, depth: int = 0
+    ) -> list:
+        """
+        Single eth_getLogs request. Ranges the node refuses because they have too many results
+        or span too many blocks are split in half and retried, up to MAX_SPLIT_DEPTH times.
+
+        Raises:
+            ValueError: for other node errors, or if the range can't be split any further
+        """
+        self.requests += 1
+        try:
+            return list(
+                self.web3.eth.get_logs(
+                    {
+                        "address": address,
+                        "topics": topics,
+                        "fromBlock": from_block,
+                        "toBlock": to_block,
+                    }
+                )
+            )
+        except ValueError as e:
+            if (
+                not self._is_splittable(e)
+                or from_block == to_block
+                or depth >= MAX_SPLIT_DEPTH
+            ):
+                raise
+            self.logger.warning(
+                f"eth_getLogs {from_block}-{to_block} failed, splitting range: {e}"
+            )
+            middle = (from_block + to_block) // 2
+            return self._get_logs(
+                address, topics, from_block, middle, depth + 1
+            ) + self._get_logs(address, topics, middle + 1, to_block, depth + 1)
+
+    def _is_splittable(self, error: ValueError) -> bool:
+        """
+        Returns:
+            bool: True if the node refused the range for its size, web3 raises json rpc errors
+            as a ValueError of the error dict
+        """
+        details = error.args[0] if len(error.args) > 0 else None
+        if isinstance(details, dict):
+            if details.get("code") in SPLITTABLE_ERROR_CODES:
+                return True
+            message = str(details.get("message"))
+        else:
+            message = str(error)
+        return any(marker in message.lower() for marker in SPLITTABLE_ERROR_MESSAGES)
+
+    def _get_receipt(self, tx_hash):
+        self.requests += 1
+        return self.web3.eth.get_transaction_receipt(tx_hash)
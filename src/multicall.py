@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+import os
+
+from resilience import CircuitBreaker
+
+MULTICALL2_ADDRESS = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696"
+MULTICALL2_ABI_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../contracts/abi/multicall2.json")
+)
+# how long queued reads wait for reads from other bots before the batch is sent
+BATCH_WINDOW_SECONDS = 0.5
+# keep a single eth_call well under node gas / response size limits
+MAX_CALLS_PER_BATCH = 200
+
+
+class MulticallBatcher:
+    """
+    Collects contract reads from every bot in the process and sends them to the chain as a
+    single Multicall2 tryAggregate eth_call. Reads queued within BATCH_WINDOW_SECONDS of each
+    other end up in the same batch, so bots ticking on the same cadence share one RPC call.
+    """
+
+    def __init__(
+        self,
+        web3,
+        batch_window: float = BATCH_WINDOW_SECONDS,
+        address: str = MULTICALL2_ADDRESS,
+    ):
+        self.logger = logging.getLogger("multicall")
+        self.web3 = web3
+        self.batch_window = batch_window
+        with open(MULTICALL2_ABI_PATH) as multicall_abi_file:
+            multicall_abi = json.load(multicall_abi_file)
+        self.multicall_contract = self.web3.eth.contract(
+            address=self.web3.toChecksumAddress(address), abi=multicall_abi
+        )
+        self.pending = []
+        self._flush_handle = None
+        # opened when the rpc node keeps failing so bots stop queueing reads against it
+        self.breaker = CircuitBreaker("rpc")
+
+    async def call(self, contract_function):
+        """
+        Queues a contract read and waits for the batch it ends up in to be executed
+
+        Args:
+            contract_function (ContractFunction): bound contract function, EG
+            contract.functions.totalSupply()
+
+        Raises:
+            ValueError: if the call reverted inside the multicall
+            CircuitOpenError: if the rpc node is failing and the circuit is open
+
+        Returns:
+            decoded return value, same shape as contract_function.call()
+        """
+        self.breaker.check()
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.pending.append((contract_function, future))
+
+        if len(self.pending) >= MAX_CALLS_PER_BATCH:
+            self._schedule_flush()
+        elif self._flush_handle == None:
+            self._flush_handle = loop.call_later(
+                self.batch_window, self._schedule_flush
+            )
+
+        return await future
+
+    async def call_many(self, contract_functions: list) -> list:
+        """
+        Queues several reads at once, they are always sent in the same batch
+
+        Args:
+            contract_functions (list): list of bound contract functions
+
+        Returns:
+            list: decoded return values in the same order
+        """
+        return await asyncio.gather(*[self.call(fn) for fn in contract_functions])
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle != None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self.pending = self.pending, []
+        if len(batch) > 0:
+            asyncio.ensure_future(self._execute(batch))
+
+    async def _execute(self, batch: list) -> None:
+        """
+        Sends batch as one tryAggregate call off the event loop and resolves each queued future
+        """
+        calls = [(fn.address, fn._encode_transaction_data()) for fn, _ in batch]
+        loop = asyncio.get_event_loop()
+        try:
+            results = await loop.run_in_executor(
+                None, self.multicall_contract.functions.tryAggregate(False, calls).call
+            )
+        except Exception as e:
+            self.logger.error(f"Multicall of {len(batch)} calls failed")
+            self.logger.error(e)
+            self.breaker.record_failure(e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.breaker.record_success()
+        self.logger.info(f"Executed multicall with {len(batch)} calls")
+        for (fn, future), (success, return_data) in zip(batch, results):
+            if future.done():
+                continue
+            if not success:
+                future.set_exception(
+                    ValueError(f"Multicall read {fn.fn_name} on {fn.address} reverted")
+                )
+                continue
+            try:
+                future.set_result(self._decode(fn, return_data))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _decode(self, contract_function, return_data: bytes):
+        """
+        Decodes raw return data the same way ContractFunction.call() does, single outputs are
+        unwrapped and multiple outputs are returned as a list.
+        """
+        output_types = [output["type"] for output in contract_function.abi["outputs"]]
+        decoded = self.web3.codec.decode_abi(output_types, return_data)
+        return decoded[0] if len(decoded) == 1 else list(decoded)
@@ -0,0 +1,138 @@
+from decimal import Decimal
+import logging
+import time
+
+# re-read at least this often even if neither heartbeat nor deviation say a round is due
+MAX_POLL_SECONDS = 600
+# don't re-read an overdue heartbeat round more often than this
+MIN_POLL_SECONDS = 30
+# extra time past the heartbeat before an answer is reported as stale
+STALE_GRACE_SECONDS = 600
+
+
+class ChainlinkOracleReader:
+    """
+    Round aware reader for a chainlink style price feed. Remembers the last roundId and
+    updatedAt read from latestRoundData() and only re-reads the oracle when a new round is
+    likely to have been posted, either because the heartbeat elapsed or because a reference
+    price moved more than the feed's deviation threshold since the last answer.
+    """
+
+    def __init__(
+        self,
+        contract,
+        multicall,
+        decimals: int,
+        heartbeat_seconds: int,
+        deviation_threshold: float,
+        max_poll_seconds: int = MAX_POLL_SECONDS,
+        min_poll_seconds: int = MIN_POLL_SECONDS,
+    ):
+        """
+        Args:
+            contract (Contract): oracle contract with latestRoundData()
+            multicall (MulticallBatcher): batcher reads are queued on
+            decimals (int): decimals of the oracle answer, can be set after construction
+            heartbeat_seconds (int): max time between rounds posted by the feed
+            deviation_threshold (float): fractional price move that triggers a new round, EG 0.005
+        """
+        self.logger = logging.getLogger("oracle")
+        self.contract = contract
+        self.multicall = multicall
+        self.decimals = decimals
+        self.heartbeat_seconds = heartbeat_seconds
+        self.deviation_threshold = deviation_threshold
+        self.max_poll_seconds = max_poll_seconds
+        self.min_poll_seconds = min_poll_seconds
+
+        self.round_id = None
+        self.price = None
+        self.updated_at = None
+        self.last_read = 0
+
+    def needs_refresh(self, reference_price: float = None, now: float = None) -> bool:
+        """
+        Decides if reading the oracle again could return a new round
+
+        Args:
+            reference_price (float, optional): off chain price in the same units as the oracle
+            answer, used to detect deviation triggered rounds
+            now (float, optional): unix time, defaults to current time
+
+        Returns:
+            bool: True if the oracle should be read
+        """
+        now = time.time() if now == None else now
+        if self.round_id == None:
+            return True
+
+        since_last_read = now - self.last_read
+        if since_last_read >= self.max_poll_seconds:
+            return True
+        if since_last_read < self.min_poll_seconds:
+            return False
+        if now >= self.updated_at + self.heartbeat_seconds:
+            return True
+        if reference_price and self.price:
+            deviation = abs(Decimal(reference_price) / self.price - 1)
+            if deviation >= Decimal(self.deviation_threshold):
+                return True
+
+        return False
+
+    async def get_price(self, reference_price: float = None) -> Decimal:
+        """
+        Returns the oracle price, reading latestRoundData() only if a new round may exist
+
+        Args:
+            reference_price (float, optional): off chain price used for deviation checks
+
+        Returns:
+            Decimal: oracle answer scaled by the oracle decimals
+        """
+        if self.needs_refresh(reference_price):
+            await self.refresh()
+        return self.price
+
+    async def refresh(self) -> None:
+        round_data = await self.multicall.call(
+            self.contract.functions.latestRoundData()
+        )
+        self.update_round(round_data)
+
+    def update_round(self, round_data: list, now: float = None) -> None:
+        """
+        Args:
+            round_data (list): latestRoundData() response
+            (roundId, answer, startedAt, updatedAt, answeredInRound)
+        """
+        self.last_read = time.time() if now == None else now
+        round_id, answer, _, updated_at, _ = round_data
+        if round_id != self.round_id:
+            self.logger.info(
+                f"New round {round_id} for oracle {self.contract.address} updated at {updated_at}"
+            )
+        self.round_id = round_id
+        self.price = Decimal(answer) / Decimal(10 ** self.decimals)
+        self.updated_at = updated_at
+
+    def get_staleness_seconds(self, now: float = None) -> float:
+        """
+        Returns:
+            float: seconds since the current answer was posted, None if never read
+        """
+        if self.updated_at == None:
+            return None
+        now = time.time() if now == None else now
+        return max(now - self.updated_at, 0)
+
+    def is_stale(self, now: float = None) -> bool:
+        """
+        Returns:
+            bool: True if the feed missed its heartbeat by more than STALE_GRACE_SECONDS
+        """
+        staleness = self.get_staleness_seconds(now)
+        return (
+            staleness != None
+            and staleness > self.heartbeat_seconds + STALE_GRACE_SECONDS
+        )
@@ -1,11 +1,22 @@
+import asyncio
 import discord
 from discord.ext import commands, tasks
-import json
 import logging
 import math
 import os
-import requests
+import time
 from web3 import Web3
+from chain_events import ChainEventWatcher
+from http_client import AsyncHttpClient
+from multicall import MulticallBatcher
+from price_feed import PriceFeed
+from price_history import PriceHistory
+from price_snapshot import PriceSnapshotStore
+from price_store import PriceStore
+from resilience import StaleWhileRevalidate
+from rpc_pool import RPCProviderPool
+from token_metadata import TokenMetadataCache
+from update_scheduler import DiscordUpdateScheduler
 
 logging.basicConfig(
     # filename="price_bots_log.txt",
@@ -15,90 +26,499 @@ logging.basicConfig(
     level=logging.INFO
 )
 UPDATE_INTERVAL_SECONDS = 45
+# shown until the first price is fetched, sent with the gateway identify so it costs no api call
+PLACEHOLDER_ACTIVITY = "loading price..."
+# price bots only edit their own nickname, so by default they skip member caching and chunking
+LEAN_MODE = (os.getenv("PRICE_BOT_LEAN_MODE") or "true").lower() == "true"
+# last good data is shown for this long while upstream refreshes fail
+STALENESS_BUDGET_SECONDS = int(os.getenv("PRICE_STALENESS_BUDGET_SECONDS") or 600)
+# watched on-chain data is still re-read this often in case a log was missed
+EVENT_FALLBACK_POLL_SECONDS = 600
+# logs arriving within this window, EG from the same block, trigger a single update
+EVENT_DEBOUNCE_SECONDS = 2
 cache = {}
 
 
+def get_shared_web3() -> Web3:
+    """
+    Returns:
+        Web3: web3 instance shared by every bot in the process, backed by the rpc provider pool
+    """
+    if cache.get("web3") == None:
+        cache["web3"] = Web3(RPCProviderPool.from_env())
+    return cache.get("web3")
+
+
+def get_shared_multicall() -> MulticallBatcher:
+    """
+    Returns:
+        MulticallBatcher: batcher of contract reads shared by every bot in the process
+    """
+    if cache.get("multicall") == None:
+        cache["multicall"] = MulticallBatcher(get_shared_web3())
+    return cache.get("multicall")
+
+
+def get_lean_client_options() -> dict:
+    """
+    Discord client options for a low memory price bot. Only the guilds intent is requested,
+    guild.me is still cached from GUILD_CREATE so nickname updates keep working.
+
+    Returns:
+        dict: kwargs for discord.Client
+    """
+    intents = discord.Intents.none()
+    intents.guilds = True
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+        "max_messages": None,
+    }
+
+
 class PriceBot(discord.Client):
+    # bots that price their token from coingecko subscribe to the shared price feed
+    use_price_feed = True
+
     def __init__(self, *args, **kwargs):
+        self.init_started_at = time.perf_counter()
+        if kwargs.get("lean_mode", LEAN_MODE):
+            # explicitly passed client options win over the lean defaults
+            kwargs = {**get_lean_client_options(), **kwargs}
+        kwargs.setdefault(
+            "activity",
+            discord.Activity(
+                name=PLACEHOLDER_ACTIVITY, type=discord.ActivityType.playing
+            ),
+        )
         super().__init__(*args, **kwargs)
         self.logger = logging.getLogger("price-bot")
-        if cache.get("session") == None:
-            cache["session"] = requests.Session()
-        if cache.get("web3") == None:
-            cache["web3"] = Web3(Web3.HTTPProvider(os.getenv("INFURA_URL")))
-        self.session = cache.get("session")
+        if cache.get("token_metadata") == None:
+            cache["token_metadata"] = TokenMetadataCache()
+        if cache.get("snapshot_store") == None:
+            cache["snapshot_store"] = PriceSnapshotStore()
+        if cache.get("price_store") == None:
+            cache["price_store"] = PriceStore()
+        if cache.get("scheduler") == None:
+            cache["scheduler"] = DiscordUpdateScheduler()
+        if cache.get("http_client") == None:
+            cache["http_client"] = AsyncHttpClient()
+        if cache.get("chain_events") == None and os.getenv("ETH_WS_URL"):
+            cache["chain_events"] = ChainEventWatcher(os.getenv("ETH_WS_URL"))
+        if cache.get("price_feed") == None:
+            cache["price_feed"] = PriceFeed(
+                cache.get("http_client"), UPDATE_INTERVAL_SECONDS
+            )
+        self.metadata_cache = cache.get("token_metadata")
+        self.price_feed = cache.get("price_feed")
+        self.scheduler = cache.get("scheduler")
+        self.scheduler.register(self)
+        self.snapshot_store = cache.get("snapshot_store")
+        self.price_store = cache.get("price_store")
+        # None without ETH_WS_URL, on-chain data is then polled every interval
+        self.chain_events = cache.get("chain_events")
 
         self.coingecko_token_id = kwargs.get("coingecko_token_id")
         self.token_display = kwargs.get("token_display")
         self.token_address = kwargs.get("token_address")
         self.token_abi = kwargs.get("token_abi") if kwargs.get("token_abi") else None
+        self.token_contract = None
+        self.token_metadata = None
+        # the rpc pool is only created for bots reading the chain, so coingecko only bots run
+        # without an rpc url
+        self.web3 = None
+        self.multicall = None
         if self.token_address and self.token_abi:
-            self.web3 = cache.get("web3")
+            self.web3 = get_shared_web3()
+            self.multicall = get_shared_multicall()
             self.token_contract = self.web3.eth.contract(
                 address=self.web3.toChecksumAddress(self.token_address),
                 abi=self.token_abi,
             )
         self.discord_id = kwargs.get("discord_id")
-        self._get_token_data()
+        # data is loaded lazily by the first update after login, no network calls before it
+        self.token_data = None
+        self.token_data_fetched_at = None
+        # usd price samples of the last day, restored from the snapshot
+        self.price_history = PriceHistory()
+        self.startup_seconds = None
+        # last nickname per guild id and activity string sent to discord
+        self.applied_nicknames = {}
+        self.applied_activity = None
+        # on-chain sources, EG "sett", with their log subscriptions, time of the latest log
+        # and start time of the latest successful read
+        self.event_subscriptions = {}
+        self.source_changed_at = {}
+        self.source_read_at = {}
+        self._event_update_task = None
+        # data younger than half an interval counts as fresh so every tick refetches
+        self.data_source = StaleWhileRevalidate(
+            self._refresh_token_data,
+            max_age_seconds=UPDATE_INTERVAL_SECONDS / 2,
+            staleness_budget_seconds=STALENESS_BUDGET_SECONDS,
+            name=self.token_display,
+        )
+        if self.use_price_feed:
+            self.price_feed.subscribe(self)
+        self._load_snapshot()
 
         self.update_price.start()
 
     async def on_ready(self):
-        self.logger.info(f"Logged in as {self.user.name} {self.user.id}")
+        self.logger.info(
+            f"Logged in as {self.user.name} {self.user.id} "
+            f"{time.perf_counter() - self.init_started_at:.2f}s after start"
+        )
+        # a new gateway session starts without our presence, so everything has to be re-applied.
+        # nicknames persist in discord, start from what each guild currently shows
+        self.applied_activity = None
+        self.applied_nicknames = {
+            guild.id: guild.me.nick for guild in self.guilds if guild.me != None
+        }
 
     @tasks.loop(seconds=UPDATE_INTERVAL_SECONDS)
     async def update_price(self):
         """
         Asynchronous function that runs every UPDATE_INTERVAL_SECONDS to get the current price and market of the
-        token and update the bot's name and activity in the guild.
+        token and update the bot's name and activity in the guild. Errors are logged instead of
+        raised so a failing upstream never stops the loop.
+        """
+        try:
+            await self._load_metadata()
+
+            if self.startup_seconds == None:
+                await self._update_startup_display()
+                return
+
+            # first get latest token data, bots fetch together so their reads share one batch.
+            # last good data within the staleness budget is served if the refresh fails
+            try:
+                await self.data_source.get()
+            except Exception as e:
+                self.logger.error(
+                    f"No {self.token_display} data within staleness budget"
+                )
+                self.logger.error(e)
+
+            # then spread the discord updates of co-hosted bots over the interval
+            await asyncio.sleep(self.scheduler.get_display_delay(self))
+            if self._has_display_data():
+                await self._update_display(
+                    self._get_nickname(), self._get_display_activity()
+                )
+        except Exception as e:
+            self.logger.error(f"Error updating {self.token_display} price")
+            self.logger.error(e)
+
+    async def _update_startup_display(self):
+        """
+        First update after login. The last known snapshot is shown right away and the first
+        fetch is skipped if that snapshot is still fresh, so restarting every bot at once
+        doesn't hit the upstreams all at the same moment.
+        """
+        if self._has_display_data():
+            await self._update_display(
+                self._get_nickname(), self._get_display_activity()
+            )
+
+        if not self.data_source.is_fresh():
+            await self.data_source.get()
+            # first price is shown right away instead of waiting for the bot's slot
+            await self._update_display(
+                self._get_nickname(), self._get_display_activity()
+            )
+
+        self.startup_seconds = time.perf_counter() - self.init_started_at
+        self.logger.info(
+            f"{self.token_display} price displayed {self.startup_seconds:.2f}s after start"
+        )
+
+    async def _refresh_token_data(self) -> dict:
+        """
+        Fetches new token data, records the price in the price store and saves the snapshot.
+        Used as the fetch of the bot's data source.
+
+        Returns:
+            dict: saved snapshot
+        """
+        await self._update_token_data()
+        self.token_data_fetched_at = time.time()
+        if self.token_data.get("token_price_usd") != None:
+            price = float(self.token_data.get("token_price_usd"))
+            self.price_history.append(self.token_data_fetched_at, price)
+            await self._record_price(price)
+        snapshot = self._get_snapshot()
+        self.snapshot_store.save(self.token_display, snapshot)
+        return snapshot
+
+    async def _record_price(self, price: float) -> None:
+        # the time series only feeds charts, so a failed write never fails the refresh.
+        # sqlite commits block, so the write runs off the event loop
+        try:
+            await self.loop.run_in_executor(
+                None,
+                self.price_store.record,
+                self.token_display,
+                self.token_data_fetched_at,
+                price,
+            )
+        except Exception as e:
+            self.logger.error(f"Error recording {self.token_display} price")
+            self.logger.error(e)
+
+    def _get_snapshot(self) -> dict:
+        """
+        Returns:
+            dict: json serializable state saved to disk after every fetch
+        """
+        return {
+            "token_data": self.token_data,
+            "fetched_at": self.token_data_fetched_at,
+            "price_history": self.price_history.to_dict(),
+        }
+
+    def _load_snapshot(self) -> None:
+        snapshot = self.snapshot_store.load(self.token_display)
+        if snapshot == None:
+            return
+        self._restore_snapshot(snapshot)
+        if self._has_display_data() and self.token_data_fetched_at != None:
+            self.data_source.seed(snapshot, self.token_data_fetched_at)
+        self.logger.info(
+            f"Loaded {self.token_display} snapshot fetched at {self.token_data_fetched_at}"
+        )
+
+    def _restore_snapshot(self, snapshot: dict) -> None:
+        self.token_data = snapshot.get("token_data")
+        self.token_data_fetched_at = snapshot.get("fetched_at")
+        self.price_history.load_dict(snapshot.get("price_history") or {})
+        if self.use_price_feed and self.token_data != None:
+            self.price_feed.seed(
+                self.coingecko_token_id, self.token_data, self.token_data_fetched_at
+            )
+
+    def _has_display_data(self) -> bool:
+        return self.token_data != None
+
+    def _watch_logs(self, source: str, address: str, topics: list) -> None:
+        """
+        Subscribes to logs that change an on-chain source, the source is then only re-read
+        after a matching log instead of on every tick. Without a chain event watcher the
+        source keeps being polled.
+
+        Args:
+            source (str): name of the on-chain data, EG "supply"
+            address (str): contract emitting the logs
+            topics (list): eth_subscribe topic filter
+        """
+        if self.chain_events == None:
+            return
+        subscription = self.chain_events.watch_logs(
+            address, topics, lambda log: self._on_chain_event(source, log)
+        )
+        self.event_subscriptions.setdefault(source, []).append(subscription)
+
+    def _on_chain_event(self, source: str, log: dict) -> None:
+        self.logger.info(
+            f"{self.token_display} {source} changed in block {log.get('blockNumber')}"
+        )
+        self.source_changed_at[source] = time.time()
+        self._schedule_event_update()
+
+    def _schedule_event_update(self) -> None:
+        if self._event_update_task == None or self._event_update_task.done():
+            self._event_update_task = asyncio.ensure_future(self._update_on_event())
+
+    async def _update_on_event(self):
+        """
+        Recomputes and displays the bot's data right after a watched log instead of waiting
+        for the next tick
         """
-        # first get latest token data
-        self._get_token_data()
+        await asyncio.sleep(EVENT_DEBOUNCE_SECONDS)
+        if self.startup_seconds == None:
+            return
+        try:
+            await self.data_source.refresh()
+            await self._update_display(
+                self._get_nickname(), self._get_display_activity()
+            )
+        except Exception as e:
+            self.logger.error(f"Error updating {self.token_display} after chain event")
+            self.logger.error(e)
 
-        activity_string = "mcap=$" + self._get_number_label(
-            self.token_data.get("market_cap")
+    def _is_watched(self, source: str) -> bool:
+        """
+        Returns:
+            bool: True if every log subscription of the source is active
+        """
+        subscriptions = self.event_subscriptions.get(source, [])
+        return len(subscriptions) > 0 and all(
+            subscription.is_active() for subscription in subscriptions
+        )
+
+    def _needs_read(self, source: str, now: float = None) -> bool:
+        """
+        Returns:
+            bool: True if the on-chain source may have changed since it was last read
+        """
+        now = time.time() if now == None else now
+        read_at = self.source_read_at.get(source)
+        if read_at == None:
+            return True
+        if not self._is_watched(source):
+            return self._is_read_due(source, read_at, now)
+        # logs emitted before the subscription became active were missed
+        subscribed_at = max(
+            subscription.active_since
+            for subscription in self.event_subscriptions.get(source)
         )
-        activity = discord.Activity(
-            name=activity_string,
-            type=discord.ActivityType.playing,
+        return (
+            read_at < subscribed_at
+            or self.source_changed_at.get(source, 0) >= read_at
+            or now - read_at >= EVENT_FALLBACK_POLL_SECONDS
         )
-        await self.change_presence(activity=activity)
+
+    def _is_read_due(self, source: str, read_at: float, now: float) -> bool:
+        """
+        Decides if a source without log subscription is re-read, by default on every tick.
+        Subclasses can skip reads of data known not to have changed.
+        """
+        return True
+
+    async def _read_if_changed(self, source: str, read, current):
+        """
+        Args:
+            source (str): name of the on-chain data
+            read (callable): returns the coroutine reading the source
+            current: last read value, returned as is if the source didn't change
+
+        Returns:
+            current or newly read value
+        """
+        if current != None and not self._needs_read(source):
+            return current
+        read_started_at = time.time()
+        value = await read()
+        self.source_read_at[source] = read_started_at
+        return value
+
+    def get_health(self) -> dict:
+        """
+        Returns:
+            dict: age of the shown data, last refresh error, state of the upstream circuits and
+            rpc endpoint stats
+        """
+        circuits = [self.price_feed.breaker.get_health()]
+        if self.multicall != None:
+            circuits.append(self.multicall.breaker.get_health())
+        return {
+            "data_age_seconds": self.data_source.get_age_seconds(),
+            "within_budget": self.data_source.is_within_budget(),
+            "last_error": str(self.data_source.last_error)
+            if self.data_source.last_error != None
+            else None,
+            "circuits": circuits,
+            "rpc_endpoints": self.web3.provider.get_health()
+            if self.web3 != None
+            else [],
+        }
+
+    def _get_display_activity(self) -> str:
+        """
+        Activity string with a stale marker while the last refresh failed and old data is shown
+        """
+        activity_string = self._get_activity_string()
+        age = self.data_source.get_age_seconds()
+        if self.data_source.last_error == None or age == None:
+            return activity_string
+        return activity_string + f" | stale {int(age // 60)}m"
+
+    def _get_activity_string(self) -> str:
+        return (
+            "mcap=$"
+            + self._get_number_label(self.token_data.get("market_cap"))
+            + self._get_change_label()
+        )
+
+    def _get_change_label(self) -> str:
+        """
+        Returns:
+            str: 24h price change from the local history, EG " 24h=+2.5%", empty until the
+            history covers a day
+        """
+        change = self.price_history.get_change()
+        return f" 24h={change:+.1f}%" if change != None else ""
+
+    def _get_nickname(self) -> str:
+        return f"{self.token_display} $" + str(self.token_data.get("token_price_usd"))
+
+    async def _update_display(self, nickname: str, activity_string: str):
+        """
+        Applies the rendered nickname and activity, only calling discord for values that
+        changed since they were last applied so unchanged ticks cost no api calls.
+
+        Args:
+            nickname (str): target nickname in every guild
+            activity_string (str): target activity name
+        """
+        if activity_string != self.applied_activity:
+            self.logger.info("activity string: " + activity_string)
+            activity = discord.Activity(
+                name=activity_string, type=discord.ActivityType.playing
+            )
+            if await self.scheduler.run(
+                (self.user.id, "presence"),
+                lambda: self.change_presence(activity=activity),
+            ):
+                self.applied_activity = activity_string
+
         for guild in self.guilds:
-            self.logger.info(guild.members)
-            for member in guild.members:
-                if str(member.id) == self.discord_id:
-                    try:
-                        await member.edit(
-                            nick=f"{self.token_display} $"
-                            + str(self.token_data.get("token_price_usd"))
-                        )
-                    except Exception as e:
-                        self.logger.error("Error updated nickname")
-                        self.logger.error(e)
+            if self.applied_nicknames.get(guild.id) == nickname:
+                continue
+            # guild.me is an indexed lookup of our own member, no need to scan guild.members
+            member = guild.me
+            if member == None:
+                self.logger.error(f"Own member not found in guild {guild.id}")
+                continue
+            try:
+                # deferred updates stay unapplied and are retried on the next tick
+                if await self.scheduler.run(
+                    (self.user.id, "nick", guild.id), lambda: member.edit(nick=nickname)
+                ):
+                    self.applied_nicknames[guild.id] = nickname
+            except Exception as e:
+                self.logger.error("Error updated nickname")
+                self.logger.error(e)
 
     @update_price.before_loop
     async def before_update_price(self):
         await self.wait_until_ready()  # wait until the bot logs in
+        if self.chain_events != None:
+            self.chain_events.start()
+
+    async def _load_metadata(self):
+        """
+        Loads immutable token metadata like decimals off the event loop on the first update,
+        later calls are no-ops.
+        """
+        if self.token_contract != None and self.token_metadata == None:
+            self.token_metadata = await self.loop.run_in_executor(
+                None, self.metadata_cache.get, self.token_contract
+            )
 
-    def _get_token_data(self):
+    async def _update_token_data(self):
         """
-        Private function to make call to coingecko to retrieve price and market cap for the token and update
-        token data property.
+        Gets price and market cap for the token from the shared price feed and updates the
+        token data property. The feed makes one batched coingecko call per interval for every
+        bot without blocking the event loop shared with the other bots.
         """
-        response = self.session.get(
-            f"https://api.coingecko.com/api/v3/coins/{self.coingecko_token_id}"
-        ).content
-        token_data = json.loads(response)
+        token_data = await self.price_feed.get_token_data_async(self.coingecko_token_id)
 
-        token_price_usd = token_data.get("market_data").get("current_price").get("usd")
-        token_price_btc = token_data.get("market_data").get("current_price").get("btc")
-        market_cap = token_data.get("market_data").get("market_cap").get("usd")
+        if token_data == None:
+            raise ValueError(f"No price data returned for {self.coingecko_token_id}")
 
-        self.token_data = {
-            "token_price_usd": token_price_usd,
-            "token_price_btc": token_price_btc,
-            "market_cap": market_cap,
-        }
+        self.token_data = token_data
 
     def _get_number_label(self, value: str) -> str:
         """
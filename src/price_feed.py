@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+
+from resilience import CircuitBreaker
+
+COINGECKO_SIMPLE_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+UPDATE_INTERVAL_SECONDS = 45
+# keep request urls well under coingecko's length limit when many tokens are subscribed
+MAX_IDS_PER_REQUEST = 50
+
+
+class PriceFeed:
+    """
+    Shared CoinGecko price feed for all price bots running in the same process. Bots subscribe
+    with their coingecko token id and the feed pulls every subscribed token in one batched
+    /simple/price request per interval, then fans the snapshot out to every subscriber.
+    """
+
+    def __init__(self, http_client, update_interval: int = UPDATE_INTERVAL_SECONDS):
+        """
+        Args:
+            http_client (AsyncHttpClient): pooled client the prices are fetched with
+            update_interval (int): seconds a snapshot is served before it's refreshed
+        """
+        self.logger = logging.getLogger("price-feed")
+        self.http_client = http_client
+        self.update_interval = update_interval
+        self.subscribers = []
+        self.extra_token_ids = set()
+        self.snapshot = {}
+        self.last_refresh = 0
+        self._refresh_task = None
+        # opened when coingecko keeps failing so bots stop hammering it
+        self.breaker = CircuitBreaker("coingecko")
+
+    def subscribe(self, bot) -> None:
+        """
+        Registers a bot with the feed. The bot's token_data is set on every refresh.
+
+        Args:
+            bot (PriceBot): bot with a coingecko_token_id attribute
+        """
+        if bot not in self.subscribers:
+            self.subscribers.append(bot)
+
+    def seed(self, token_id: str, token_data: dict, fetched_at: float) -> None:
+        """
+        Seeds the snapshot with data saved by a previous run. The next refresh happens when the
+        oldest seeded data expires, tokens without seeded data are refreshed on first read.
+
+        Args:
+            token_id (str): coingecko token id
+            token_data (dict): token data saved by the previous run
+            fetched_at (float): unix time the data was fetched
+        """
+        if len(self.snapshot) == 0:
+            self.last_refresh = fetched_at
+        else:
+            self.last_refresh = min(self.last_refresh, fetched_at)
+        self.snapshot[token_id] = token_data
+
+    def add_token(self, token_id: str) -> None:
+        """
+        Adds a token to the batched request without a subscribed bot, EG reference prices
+
+        Args:
+            token_id (str): coingecko token id
+        """
+        self.extra_token_ids.add(token_id)
+
+    def get_token_ids(self) -> list:
+        """
+        Returns:
+            list: sorted unique coingecko token ids of all subscribed bots and added tokens
+        """
+        return sorted(
+            {
+                bot.coingecko_token_id
+                for bot in self.subscribers
+                if bot.coingecko_token_id
+            }
+            | self.extra_token_ids
+        )
+
+    async def get_token_data_async(self, token_id: str) -> dict:
+        """
+        Returns the latest token data for the token, refreshing the whole snapshot first if
+        it is older than the update interval. Bots that tick at the same time share the same
+        in flight refresh instead of each making a request.
+
+        Args:
+            token_id (str): coingecko token id
+
+        Raises:
+            CircuitOpenError: if coingecko is failing and the circuit is open
+
+        Returns:
+            dict: token data with token_price_usd, token_price_btc and market_cap keys
+        """
+        if self._is_expired() or token_id not in self.snapshot:
+            if self._refresh_task == None or self._refresh_task.done():
+                self._refresh_task = asyncio.ensure_future(
+                    self.breaker.call(self.refresh_async)
+                )
+            await asyncio.shield(self._refresh_task)
+
+        return self.snapshot.get(token_id)
+
+    def _is_expired(self) -> bool:
+        return time.time() - self.last_refresh >= self.update_interval
+
+    async def refresh_async(self) -> None:
+        """
+        Makes batched calls to coingecko for every subscribed token and pushes the new token
+        data to each subscriber. Token ids are split into chunks of MAX_IDS_PER_REQUEST which
+        are fetched concurrently with the pooled http client.
+
+        Raises:
+            Exception: first error raised by a chunk request, the snapshot is left untouched
+        """
+        token_ids = self.get_token_ids()
+        if len(token_ids) == 0:
+            return
+
+        chunks = [
+            token_ids[i : i + MAX_IDS_PER_REQUEST]
+            for i in range(0, len(token_ids), MAX_IDS_PER_REQUEST)
+        ]
+        responses = await self.http_client.get_json_many(
+            [
+                (
+                    COINGECKO_SIMPLE_PRICE_URL,
+                    {
+                        "ids": ",".join(chunk),
+                        "vs_currencies": "usd,btc",
+                        "include_market_cap": "true",
+                    },
+                )
+                for chunk in chunks
+            ]
+        )
+
+        prices = {}
+        for response in responses:
+            if isinstance(response, Exception):
+                raise response
+            prices.update(response)
+
+        self._apply_snapshot(self._parse_simple_price(prices))
+
+    def _apply_snapshot(self, snapshot: dict) -> None:
+        """
+        Stores new snapshot and pushes the token data to every subscribed bot
+        """
+        self.snapshot = snapshot
+        self.last_refresh = time.time()
+        self.logger.info(f"Refreshed prices for {list(snapshot.keys())}")
+
+        for bot in self.subscribers:
+            token_data = self.snapshot.get(bot.coingecko_token_id)
+            if token_data:
+                bot.token_data = token_data
+
+    def _parse_simple_price(self, prices: dict) -> dict:
+        """
+        Converts coingecko /simple/price response into the token data format used by the bots
+
+        Args:
+            prices (dict): response body, EG {"badger-dao": {"usd": 1, "btc": 1, "usd_market_cap": 1}}
+
+        Returns:
+            dict: token id to token data dict
+        """
+        snapshot = {}
+        for token_id, price in prices.items():
+            snapshot[token_id] = {
+                "token_price_usd": price.get("usd"),
+                "token_price_btc": price.get("btc"),
+                "market_cap": price.get("usd_market_cap"),
+            }
+        return snapshot
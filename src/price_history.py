@@ -0,0 +1,178 @@
+from array import array
+from itertools import chain
+import math
+import time
+
+DAY_SECONDS = 24 * 60 * 60
+# a day of 45 second ticks with some headroom
+HISTORY_CAPACITY = 2048
+# samples closer together than this replace the previous one, EG event triggered refreshes
+MIN_SAMPLE_SPACING_SECONDS = 40
+
+
+class PriceHistory:
+    """
+    Fixed size ring buffer of (timestamp, price) samples stored in two flat float arrays, so
+    memory stays the same however long the bot runs. Statistics run over a time window ending
+    now: change, time weighted average price and volatility of returns. They are plain python
+    loops over memoryviews of the ring, so computing them never copies the window.
+    """
+
+    def __init__(
+        self,
+        capacity: int = HISTORY_CAPACITY,
+        min_spacing_seconds: float = MIN_SAMPLE_SPACING_SECONDS,
+    ):
+        self.capacity = capacity
+        self.min_spacing_seconds = min_spacing_seconds
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        # index the next sample is written to and number of stored samples
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, timestamp: float, price: float) -> None:
+        last = (self.head - 1) % self.capacity
+        if (
+            self.size > 0
+            and timestamp - self.timestamps[last] < self.min_spacing_seconds
+        ):
+            self.prices[last] = price
+            return
+
+        self.timestamps[self.head] = timestamp
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def get_window(self, seconds: float, now: float = None) -> tuple:
+        """
+        Copies the samples in the window, the statistics below read the ring in place instead
+
+        Args:
+            seconds (float): length of the window ending now
+
+        Returns:
+            tuple: (timestamps, prices) arrays of the samples in the window, oldest first
+        """
+        now = time.time() if now == None else now
+        first, count = self._get_window_bounds(seconds, now)
+        return (
+            array("d", self._iter_window(self.timestamps, first, count)),
+            array("d", self._iter_window(self.prices, first, count)),
+        )
+
+    def get_change(self, seconds: float = DAY_SECONDS, now: float = None) -> float:
+        """
+        Returns:
+            float: change in percent from the oldest sample in the window to the latest one,
+            None unless the history covers at least 90% of the window
+        """
+        now = time.time() if now == None else now
+        first, count = self._get_window_bounds(seconds, now)
+        last = (first + count - 1) % self.capacity
+        if (
+            count < 2
+            or self.timestamps[first] > now - seconds * 0.9
+            or self.prices[first] == 0
+        ):
+            return None
+        return (self.prices[last] / self.prices[first] - 1) * 100
+
+    def get_twap(self, seconds: float, now: float = None) -> float:
+        """
+        Returns:
+            float: time weighted average price over the window, every sample is weighted by
+            how long it was the latest price. None if the window has no samples
+        """
+        now = time.time() if now == None else now
+        first, count = self._get_window_bounds(seconds, now)
+        if count == 0:
+            return None
+        # each sample is the latest price until the next one, the last one until now
+        ends = self._iter_window(
+            self.timestamps, (first + 1) % self.capacity, count - 1
+        )
+        total = 0
+        weighted_sum = 0
+        for start, end, price in zip(
+            self._iter_window(self.timestamps, first, count),
+            chain(ends, [now]),
+            self._iter_window(self.prices, first, count),
+        ):
+            total += end - start
+            weighted_sum += price * (end - start)
+        if total <= 0:
+            return price
+        return weighted_sum / total
+
+    def get_volatility(self, seconds: float = DAY_SECONDS, now: float = None) -> float:
+        """
+        Returns:
+            float: standard deviation of log returns between samples in percent, None with
+            fewer than three samples in the window
+        """
+        now = time.time() if now == None else now
+        first, count = self._get_window_bounds(seconds, now)
+        returns = []
+        previous = None
+        for price in self._iter_window(self.prices, first, count):
+            if previous != None and previous > 0 and price > 0:
+                returns.append(math.log(price / previous))
+            previous = price
+        if len(returns) < 2:
+            return None
+        mean = sum(returns) / len(returns)
+        variance = sum((value - mean) ** 2 for value in returns) / (len(returns) - 1)
+        return math.sqrt(variance) * 100
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: json serializable samples, oldest first
+        """
+        timestamps, prices = self.get_window(math.inf)
+        return {"timestamps": timestamps.tolist(), "prices": prices.tolist()}
+
+    def load_dict(self, history: dict) -> None:
+        """
+        Appends samples saved by to_dict, EG from the last snapshot
+        """
+        for timestamp, price in zip(
+            history.get("timestamps", []), history.get("prices", [])
+        ):
+            self.append(timestamp, price)
+
+    def _get_window_bounds(self, seconds: float, now: float) -> tuple:
+        """
+        Binary searches the ring for the first sample in the window, samples are in time order
+
+        Returns:
+            tuple: (first, count) ring index of the first sample in the window and number of
+            samples in the window
+        """
+        start = (self.head - self.size) % self.capacity
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[(start + middle) % self.capacity] < now - seconds:
+                low = middle + 1
+            else:
+                high = middle
+        return (start + low) % self.capacity, self.size - low
+
+    def _iter_window(self, values: array, first: int, count: int):
+        """
+        Yields count values of the ring starting at index first. The ring is read through
+        memoryview slices, so no samples are copied.
+        """
+        view = memoryview(values)
+        end = first + count
+        if end <= self.capacity:
+            yield from view[first:end]
+        else:
+            yield from view[first:]
+            yield from view[: end - self.capacity]
@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+
+PRICE_SNAPSHOT_DIR = os.getenv("PRICE_SNAPSHOT_DIR") or "cache/snapshots"
+
+
+class PriceSnapshotStore:
+    """
+    Keeps a small json snapshot of each bot's last known data on disk so a restarted bot can
+    show its last price immediately and skip its first fetch if the snapshot is still fresh.
+    """
+
+    def __init__(self, directory: str = PRICE_SNAPSHOT_DIR):
+        self.logger = logging.getLogger("price-snapshot")
+        self.directory = directory
+
+    def load(self, name: str) -> dict:
+        """
+        Args:
+            name (str): snapshot name, EG the bot's token display
+
+        Returns:
+            dict: saved snapshot, EG {"token_data": {...}, "fetched_at": 1620000000.0},
+            None if there is no readable snapshot
+        """
+        try:
+            with open(self._get_path(name)) as snapshot_file:
+                return json.load(snapshot_file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.error(f"Error loading snapshot {name}")
+            self.logger.error(e)
+            return None
+
+    def save(self, name: str, snapshot: dict) -> None:
+        """
+        Writes snapshot atomically so a crash mid write never leaves a corrupt file
+
+        Args:
+            name (str): snapshot name, EG the bot's token display
+            snapshot (dict): json serializable data, Decimals are stored as floats
+        """
+        path = self._get_path(name)
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w") as snapshot_file:
+                json.dump(snapshot, snapshot_file, default=float)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Error saving snapshot {name}")
+            self.logger.error(e)
+
+    def _get_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
@@ -0,0 +1,201 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+PRICE_STORE_PATH = os.getenv("PRICE_STORE_PATH") or "cache/prices/price_store.db"
+# expired rows are deleted at most this often
+PRUNE_INTERVAL_SECONDS = 60 * 60
+SPARKLINE_BLOCKS = "▁▂▃▄▅▆▇█"
+
+RAW = "raw"
+FIVE_MINUTES = "5m"
+ONE_HOUR = "1h"
+# tier, bucket length in seconds (0 keeps every sample) and retention in seconds, finest first
+TIERS = [
+    (RAW, 0, 2 * 24 * 60 * 60),
+    (FIVE_MINUTES, 5 * 60, 30 * 24 * 60 * 60),
+    (ONE_HOUR, 60 * 60, 2 * 365 * 24 * 60 * 60),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices_raw (
+    token TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (token, timestamp)
+);
+CREATE TABLE IF NOT EXISTS prices_5m (
+    token TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (token, timestamp)
+);
+CREATE TABLE IF NOT EXISTS prices_1h (
+    token TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (token, timestamp)
+);
+"""
+
+# rolls a sample into its bucket, the first sample of a bucket opens it
+ROLLUP = """
+INSERT INTO prices_{tier} VALUES (?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (token, timestamp) DO UPDATE SET
+    high = MAX(high, excluded.high),
+    low = MIN(low, excluded.low),
+    close = excluded.close,
+    samples = samples + 1
+"""
+
+
+def downsample(prices: list, points: int) -> list:
+    """
+    Args:
+        prices (list): prices oldest first
+        points (int): max number of prices returned
+
+    Returns:
+        list: average of each of points equal slices of prices, prices if there are fewer
+    """
+    if len(prices) <= points:
+        return list(prices)
+    return [
+        sum(prices[len(prices) * i // points : len(prices) * (i + 1) // points])
+        / (len(prices) * (i + 1) // points - len(prices) * i // points)
+        for i in range(points)
+    ]
+
+
+def render_sparkline(prices: list) -> str:
+    """
+    Args:
+        prices (list): prices oldest first
+
+    Returns:
+        str: one block character per price scaled between the lowest and highest price
+    """
+    if len(prices) == 0:
+        return ""
+    low = min(prices)
+    spread = max(prices) - low
+    if spread == 0:
+        return SPARKLINE_BLOCKS[len(SPARKLINE_BLOCKS) // 2] * len(prices)
+    top = len(SPARKLINE_BLOCKS) - 1
+    return "".join(
+        SPARKLINE_BLOCKS[round((price - low) / spread * top)] for price in prices
+    )
+
+
+class PriceStore:
+    """
+    Persistent price time series in a local sqlite database with three tiers. Raw samples are
+    kept for two days, 5 minute and 1 hour candles are rolled up as every sample is recorded
+    and kept for 30 days and two years. A series query reads the finest tier that covers its
+    window, EG about 1920 raw rows for a day at 45 second ticks, 2016 candles for 7 days and
+    8640 for 30 days, rows are not downsampled before they are returned. The price bots write
+    it and any process with the same PRICE_STORE_PATH can read it.
+    """
+
+    def __init__(self, path: str = PRICE_STORE_PATH, tiers: list = TIERS):
+        """
+        Args:
+            path (str): sqlite database file, ":memory:" for a throwaway store
+            tiers (list): (tier, bucket seconds, retention seconds) tuples, finest first
+        """
+        self.logger = logging.getLogger("price-store")
+        self.tiers = tiers
+        self.pruned_at = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            # lets the chart command read while a price bot process writes
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def record(self, token: str, timestamp: float, price: float) -> None:
+        """
+        Stores a raw sample and rolls it into its candle of every other tier
+        """
+        token = token.lower()
+        with self._lock, self.connection:
+            for tier, bucket_seconds, _ in self.tiers:
+                if bucket_seconds == 0:
+                    self.connection.execute(
+                        f"INSERT OR REPLACE INTO prices_{tier} VALUES (?, ?, ?)",
+                        (token, timestamp, price),
+                    )
+                else:
+                    bucket = int(timestamp // bucket_seconds * bucket_seconds)
+                    self.connection.execute(
+                        ROLLUP.format(tier=tier),
+                        (token, bucket, price, price, price, price),
+                    )
+        if timestamp - self.pruned_at >= PRUNE_INTERVAL_SECONDS:
+            self.prune(timestamp)
+
+    def prune(self, now: float = None) -> None:
+        """
+        Deletes the rows of every tier that are older than its retention
+        """
+        now = time.time() if now == None else now
+        with self._lock, self.connection:
+            for tier, _, retention_seconds in self.tiers:
+                self.connection.execute(
+                    f"DELETE FROM prices_{tier} WHERE timestamp < ?",
+                    (now - retention_seconds,),
+                )
+        self.pruned_at = now
+
+    def get_series(self, token: str, seconds: float, now: float = None) -> list:
+        """
+        Args:
+            token (str): token the samples were recorded for, case insensitive
+            seconds (float): length of the window ending now
+            now (float, optional): end of the window, defaults to the current time
+
+        Returns:
+            list: (timestamp, price) tuples oldest first from the finest tier whose retention
+            covers the window, candles are represented by their close
+        """
+        now = time.time() if now == None else now
+        tier = self._get_tier(seconds)
+        column = "price" if tier == RAW else "close"
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT timestamp, {column} AS price FROM prices_{tier} "
+                "WHERE token = ? AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp",
+                (token.lower(), now - seconds, now),
+            ).fetchall()
+        return [(row["timestamp"], row["price"]) for row in rows]
+
+    def get_tokens(self) -> list:
+        """
+        Returns:
+            list: tokens with recorded samples in the coarsest tier
+        """
+        tier = self.tiers[-1][0]
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT DISTINCT token FROM prices_{tier} ORDER BY token"
+            ).fetchall()
+        return [row["token"] for row in rows]
+
+    def _get_tier(self, seconds: float) -> str:
+        for tier, _, retention_seconds in self.tiers:
+            if seconds <= retention_seconds:
+                return tier
+        return self.tiers[-1][0]
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF_SECONDS = 15
+MAX_BACKOFF_SECONDS = 600
+# how long a caller waits for a refresh before being served the last good value
+REFRESH_WAIT_SECONDS = 10
+# longest a caller without a usable value waits for a refresh before it fails
+REFRESH_TIMEOUT_SECONDS = 60
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing upstream. After FAILURE_THRESHOLD consecutive failures the circuit
+    opens and calls fail fast until the backoff expires, then a single trial call is let through
+    while every other call keeps failing fast until the trial succeeded or failed. Every time the
+    trial fails the backoff doubles up to MAX_BACKOFF_SECONDS.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        base_backoff_seconds: float = BASE_BACKOFF_SECONDS,
+        max_backoff_seconds: float = MAX_BACKOFF_SECONDS,
+    ):
+        self.logger = logging.getLogger("circuit-breaker")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self.state = CLOSED
+        self.failures = 0
+        self.times_opened = 0
+        self.trial_in_flight = False
+        self.open_until = 0
+        self.last_error = None
+        self.trial_in_flight = False
+
+    def allow_request(self, now: float = None) -> bool:
+        """
+        Returns:
+            bool: True if the upstream may be called, the first caller once the backoff expired
+            is the trial and has to report its result with record_success or record_failure
+        """
+        now = time.monotonic() if now == None else now
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+        return self.state != OPEN
+
+    def check(self, now: float = None) -> None:
+        """
+        Raises:
+            CircuitOpenError: if the circuit is open
+        """
+        if not self.allow_request(now):
+            raise CircuitOpenError(
+                f"Circuit {self.name} is open, last error: {self.last_error}"
+            )
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            self.logger.info(f"Circuit {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.times_opened = 0
+
+    def record_failure(self, error: Exception = None, now: float = None) -> None:
+        now = time.monotonic() if now == None else now
+        self.failures += 1
+        self.last_error = error
+        self.trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            backoff = min(
+                self.base_backoff_seconds * 2 ** self.times_opened,
+                self.max_backoff_seconds,
+            )
+            self.state = OPEN
+            self.open_until = now + backoff
+            self.times_opened += 1
+            self.logger.warning(
+                f"Circuit {self.name} opened for {backoff} seconds after {self.failures} failures"
+            )
+
+    async def call(self, fetch):
+        """
+        Runs fetch through the breaker
+
+        Args:
+            fetch (callable): returns the coroutine calling the upstream
+
+        Raises:
+            CircuitOpenError: if the circuit is open, fetch is not called
+        """
+        self.check()
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            # a cancelled trial says nothing about the upstream, the next caller runs a new one
+            self.trial_in_flight = False
+            raise
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def get_health(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": max(self.open_until - time.monotonic(), 0)
+            if self.state == OPEN
+            else 0,
+        }
+
+
+class StaleWhileRevalidate:
+    """
+    Serves the last good value of a source while it is refreshed. Callers get fresh data if the
+    refresh finishes within REFRESH_WAIT_SECONDS, otherwise the last good value is returned as
+    long as it is within the staleness budget and a slow refresh keeps running in the background.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        max_age_seconds: float,
+        staleness_budget_seconds: float,
+        refresh_wait_seconds: float = REFRESH_WAIT_SECONDS,
+        name: str = None,
+        refresh_timeout_seconds: float = REFRESH_TIMEOUT_SECONDS,
+    ):
+        """
+        Args:
+            fetch (callable): returns the coroutine fetching a new value
+            max_age_seconds (float): values younger than this are served without a refresh
+            staleness_budget_seconds (float): oldest value served when refreshes fail
+            refresh_timeout_seconds (float): longest wait for a refresh when there is no value
+            within the staleness budget
+        """
+        self.logger = logging.getLogger("stale-while-revalidate")
+        self.fetch = fetch
+        self.max_age_seconds = max_age_seconds
+        self.staleness_budget_seconds = staleness_budget_seconds
+        self.refresh_wait_seconds = refresh_wait_seconds
+        self.refresh_timeout_seconds = refresh_timeout_seconds
+        self.name = name
+
+        self.value = None
+        self.fetched_at = None
+        self.last_error = None
+        self._refresh_task = None
+
+    def seed(self, value, fetched_at: float) -> None:
+        self.value = value
+        self.fetched_at = fetched_at
+
+    def get_age_seconds(self, now: float = None) -> float:
+        if self.fetched_at == None:
+            return None
+        now = time.time() if now == None else now
+        return now - self.fetched_at
+
+    def is_fresh(self) -> bool:
+        age = self.get_age_seconds()
+        return age != None and age < self.max_age_seconds
+
+    def is_within_budget(self) -> bool:
+        age = self.get_age_seconds()
+        return age != None and age < self.staleness_budget_seconds
+
+    async def get(self):
+        """
+        Raises:
+            Exception: refresh error if there is no value within the staleness budget
+            asyncio.TimeoutError: if there is no value within the staleness budget and the
+            refresh takes longer than refresh_timeout_seconds, it keeps running in the background
+
+        Returns:
+            value from the last successful fetch
+        """
+        if self.is_fresh():
+            return self.value
+
+        self._start_refresh()
+        if not self.is_within_budget():
+            await asyncio.wait_for(
+                asyncio.shield(self._refresh_task), self.refresh_timeout_seconds
+            )
+            return self.value
+
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(self._refresh_task), self.refresh_wait_seconds
+            )
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"Refresh of {self.name} is slow, serving value from {self.get_age_seconds():.0f}s ago"
+            )
+        except Exception:
+            self.logger.warning(
+                f"Refresh of {self.name} failed, serving value from {self.get_age_seconds():.0f}s ago"
+            )
+        return self.value
+
+    async def refresh(self):
+        """
+        Refreshes now even if the value is fresh, EG when the source is known to have changed
+
+        Raises:
+            Exception: refresh error, the last good value is kept
+
+        Returns:
+            value from the refresh
+        """
+        self._start_refresh()
+        await asyncio.shield(self._refresh_task)
+        return self.value
+
+    def _start_refresh(self) -> None:
+        # callers share a refresh that is already in flight
+        if self._refresh_task == None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh())
+            self._refresh_task.add_done_callback(self._retrieve_error)
+
+    def _retrieve_error(self, task) -> None:
+        # the error is logged by _refresh, nobody may be awaiting a background refresh
+        if not task.cancelled():
+            task.exception()
+
+    async def _refresh(self) -> None:
+        try:
+            value = await self.fetch()
+        except Exception as e:
+            self.last_error = e
+            self.logger.error(f"Error refreshing {self.name}")
+            self.logger.error(e)
+            raise
+        self.value = value
+        self.fetched_at = time.time()
+        self.last_error = None
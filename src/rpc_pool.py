@@ -0,0 +1,269 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+REQUEST_TIMEOUT_SECONDS = 10
+# weight of the newest sample in the latency and error rate moving averages
+EWMA_ALPHA = 0.2
+# an endpoint failing every call ranks like one this many times slower
+ERROR_PENALTY = 10
+# lower ranked endpoints are tried first once they haven't been used for this long, so an
+# endpoint that recovered gets a chance to win its rank back
+PROBE_INTERVAL_SECONDS = 60
+# only reads are hedged, sending a transaction twice is never safe
+HEDGEABLE_METHODS = {
+    "eth_blockNumber",
+    "eth_call",
+    "eth_chainId",
+    "eth_getBalance",
+    "eth_getBlockByNumber",
+    "eth_getCode",
+    "eth_getLogs",
+    "eth_getTransactionReceipt",
+}
+
+
+def get_rpc_urls(urls: str = None) -> list:
+    """
+    Args:
+        urls (str, optional): comma separated rpc urls, defaults to the ETH_RPC_URLS env
+        variable and falls back to INFURA_URL
+
+    Returns:
+        list: non empty urls
+    """
+    if urls == None:
+        urls = os.getenv("ETH_RPC_URLS") or os.getenv("INFURA_URL") or ""
+    return [url.strip() for url in urls.split(",") if url.strip()]
+
+
+class RPCEndpoint:
+    """
+    One provider of the pool with its moving average latency and error rate
+    """
+
+    def __init__(
+        self, name: str, provider, error_latency: float = REQUEST_TIMEOUT_SECONDS
+    ):
+        """
+        Args:
+            error_latency (float): latency sample recorded for a failed request, failures
+            usually cost a timeout
+        """
+        self.name = name
+        self.provider = provider
+        self.error_latency = error_latency
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.last_request_at = time.monotonic()
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self._update_latency(latency)
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate
+
+    def record_error(self) -> None:
+        self.requests += 1
+        self.errors += 1
+        self._update_latency(self.error_latency)
+        self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+
+    def get_score(self) -> float:
+        """
+        Returns:
+            float: expected seconds per request scaled up by the error rate, lower is better.
+            Endpoints that were never tried score 0 and are tried first
+        """
+        latency = self.latency if self.latency != None else 0
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def _update_latency(self, latency: float) -> None:
+        self.latency = (
+            latency
+            if self.latency == None
+            else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+        )
+
+    def get_health(self) -> dict:
+        return {
+            "name": self.name,
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+class RPCProviderPool(BaseProvider):
+    """
+    Web3 provider spreading requests over several rpc endpoints. Every request goes to the
+    endpoint with the best latency and error rate moving averages and falls through to the next
+    one on failure. Optionally a read that is slower than hedge_after_seconds is also sent to the
+    second best endpoint and whichever answers first wins. An endpoint that hasn't been used
+    for probe_interval_seconds is tried first once, so recovered endpoints are noticed.
+    """
+
+    def __init__(
+        self,
+        urls: list = None,
+        hedge_after_seconds: float = None,
+        request_timeout: float = REQUEST_TIMEOUT_SECONDS,
+        providers: list = None,
+        probe_interval_seconds: float = PROBE_INTERVAL_SECONDS,
+    ):
+        """
+        Args:
+            urls (list, optional): rpc urls, defaults to get_rpc_urls()
+            hedge_after_seconds (float, optional): enables hedging of slow reads
+            request_timeout (float): timeout of a single http request
+            providers (list, optional): (name, provider) tuples used instead of urls
+            probe_interval_seconds (float): how long a lower ranked endpoint goes unused
+            before it is probed
+        """
+        self.logger = logging.getLogger("rpc-pool")
+        if providers == None:
+            urls = get_rpc_urls() if urls == None else urls
+            # names are only hosts so api keys in the url path never end up in logs
+            providers = [
+                (
+                    urlparse(url).netloc,
+                    Web3.HTTPProvider(url, request_kwargs={"timeout": request_timeout}),
+                )
+                for url in urls
+            ]
+        if len(providers) == 0:
+            raise ValueError("RPCProviderPool needs at least one rpc url")
+
+        self.endpoints = [
+            RPCEndpoint(name, provider, request_timeout) for name, provider in providers
+        ]
+        self.probe_interval_seconds = probe_interval_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.executor = (
+            ThreadPoolExecutor(max_workers=len(self.endpoints) * 4)
+            if hedge_after_seconds != None and len(self.endpoints) > 1
+            else None
+        )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Pool of the ETH_RPC_URLS endpoints. Slow reads are hedged after RPC_HEDGE_AFTER_SECONDS
+        if it is set.
+        """
+        hedge_after_seconds = os.getenv("RPC_HEDGE_AFTER_SECONDS")
+        return cls(
+            hedge_after_seconds=(
+                float(hedge_after_seconds) if hedge_after_seconds else None
+            )
+        )
+
+    def make_request(self, method, params):
+        """
+        Raises:
+            Exception: error of the last endpoint tried if every endpoint failed
+
+        Returns:
+            dict: json rpc response of the first endpoint that answered
+        """
+        endpoints = self._get_request_order()
+        if self.executor != None and method in HEDGEABLE_METHODS:
+            return self._make_hedged_request(endpoints, method, params)
+
+        last_error = None
+        for endpoint in endpoints:
+            try:
+                return self._request(endpoint, method, params)
+            except Exception as e:
+                last_error = e
+                self.logger.warning(f"{method} on {endpoint.name} failed: {e}")
+        raise last_error
+
+    def isConnected(self) -> bool:
+        return any(endpoint.provider.isConnected() for endpoint in self.endpoints)
+
+    def get_health(self) -> list:
+        """
+        Returns:
+            list: latency and error stats of every endpoint, best first
+        """
+        return [endpoint.get_health() for endpoint in self._get_ranked_endpoints()]
+
+    def _get_ranked_endpoints(self) -> list:
+        with self._lock:
+            return sorted(self.endpoints, key=lambda endpoint: endpoint.get_score())
+
+    def _get_request_order(self) -> list:
+        """
+        Returns:
+            list: ranked endpoints, with the longest unused lower ranked endpoint moved to the
+            front if it is due for a probe
+        """
+        endpoints = self._get_ranked_endpoints()
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                endpoint
+                for endpoint in endpoints[1:]
+                if now - endpoint.last_request_at >= self.probe_interval_seconds
+            ]
+            if len(due) == 0:
+                return endpoints
+            probe = min(due, key=lambda endpoint: endpoint.last_request_at)
+            # claimed right away so concurrent requests don't all probe the same endpoint
+            probe.last_request_at = now
+        self.logger.info(f"Probing rpc endpoint {probe.name}")
+        endpoints.remove(probe)
+        return [probe] + endpoints
+
+    def _request(self, endpoint: RPCEndpoint, method, params):
+        started_at = time.perf_counter()
+        with self._lock:
+            endpoint.last_request_at = time.monotonic()
+        try:
+            response = endpoint.provider.make_request(method, params)
+        except Exception:
+            with self._lock:
+                endpoint.record_error()
+            raise
+        # json rpc errors like reverts are valid answers, only transport errors count
+        with self._lock:
+            endpoint.record_success(time.perf_counter() - started_at)
+        return response
+
+    def _make_hedged_request(self, endpoints: list, method, params):
+        """
+        Sends the read to the best endpoint and, if it hasn't answered after
+        hedge_after_seconds or it failed, to the next one. The first answer wins, the slower
+        request still finishes in the background and updates its endpoint's stats.
+        """
+        futures = {}
+        remaining = list(endpoints)
+        last_error = None
+        while len(remaining) > 0 or len(futures) > 0:
+            if len(remaining) > 0:
+                endpoint = remaining.pop(0)
+                future = self.executor.submit(self._request, endpoint, method, params)
+                futures[future] = endpoint
+
+            done, _ = wait(
+                futures,
+                timeout=self.hedge_after_seconds if len(remaining) > 0 else None,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                endpoint = futures.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+                    self.logger.warning(f"{method} on {endpoint.name} failed: {e}")
+        raise last_error
@@ -1,113 +1,265 @@
-import discord
+import asyncio
 from discord.ext import tasks
 import os
-from price_bot import PriceBot
+from chain_events import (
+    FULL_PRICE_PER_SHARE_UPDATED_TOPIC,
+    TRANSFER_TOPIC,
+    ZERO_ADDRESS_TOPIC,
+)
+from log_scanner import LogScanner
+from price_bot import cache, PriceBot
+from sett_indexer import INDEX_CONFIRMATION_BLOCKS, SettIndexer
 import requests
 import json
 from web3 import Web3
 
 UPDATE_INTERVAL_SECONDS = 45
+# how far back _get_latest_transfer_log looks for a deposit or withdrawal
+MAX_TRANSFER_LOOKBACK_BLOCKS = 10000
+SETT_INDEX_SYNC_SECONDS = 60
+# transfers older than this when they are indexed are history, not news, EG while a sync is
+# still backfilling from index_start_block
+WHALE_ALERT_MAX_AGE_BLOCKS = 100
+
+
+def get_alert_start_block(
+    checkpoint: int, latest_block: int, max_age_blocks: int = WHALE_ALERT_MAX_AGE_BLOCKS
+) -> int:
+    """
+    Args:
+        checkpoint (int): last indexed block before the sync, None if it is the first sync
+        latest_block (int): chain head the sync ran against
+
+    Returns:
+        int: first block whose whale transfers are alerted, above the synced blocks while a
+        backfill is still catching up. None for the first sync, which is always a backfill
+    """
+    if checkpoint == None:
+        return None
+    return max(
+        checkpoint + 1, latest_block - INDEX_CONFIRMATION_BLOCKS - max_age_blocks
+    )
 
 
 class SettBot(PriceBot):
     def __init__(self, *args, **kwargs):
+        # set before PriceBot init, which restores it from the last snapshot
+        self.sett_data = None
         super().__init__(*args, **kwargs)
 
         # number of decimals for non interest bearing token (BADGER decimals for the bBADGER example)
         self.underlying_decimals = kwargs.get("underlying_decimals")
+        if cache.get("log_scanner") == None:
+            cache["log_scanner"] = LogScanner(self.web3)
+        self.log_scanner = cache.get("log_scanner")
+
+        # supply changes on mints and burns, the ratio when the price per share is tracked.
+        # harvests that aren't tracked are picked up by the fallback poll
+        if self.token_contract != None:
+            self._watch_logs(
+                "sett",
+                self.token_contract.address,
+                [TRANSFER_TOPIC, ZERO_ADDRESS_TOPIC],
+            )
+            self._watch_logs(
+                "sett",
+                self.token_contract.address,
+                [TRANSFER_TOPIC, None, ZERO_ADDRESS_TOPIC],
+            )
+            self._watch_logs(
+                "sett",
+                self.token_contract.address,
+                [FULL_PRICE_PER_SHARE_UPDATED_TOPIC],
+            )
+
+        # optional local index of the sett's transfers, used for whale alerts
+        self.indexer = None
+        if kwargs.get("index_transfers") and self.token_contract != None:
+            if cache.get("sett_indexer") == None:
+                cache["sett_indexer"] = SettIndexer(self.log_scanner)
+            self.indexer = cache.get("sett_indexer")
+            self.index_start_block = kwargs.get("index_start_block")
+            self.whale_alert_amount = kwargs.get("whale_alert_amount")
+            # channel ids from the environment are strings
+            self.alert_channel_id = (
+                int(kwargs.get("alert_channel_id"))
+                if kwargs.get("alert_channel_id")
+                else None
+            )
+            self.sync_index.start()
+
+    @tasks.loop(seconds=SETT_INDEX_SYNC_SECONDS)
+    async def sync_index(self):
+        """
+        Indexes new sett transfers and posts an alert for every deposit or withdrawal of at
+        least whale_alert_amount sett tokens. Errors are logged and retried on the next run.
+        """
+        try:
+            await self._load_metadata()
+            sett = self.token_contract.address
+            latest_block = await self.loop.run_in_executor(
+                None, lambda: self.web3.eth.get_block("latest").get("number")
+            )
+            checkpoint = self.indexer.get_checkpoint(sett)
+            start_block = (
+                self.index_start_block
+                if self.index_start_block != None
+                else latest_block - MAX_TRANSFER_LOOKBACK_BLOCKS
+            )
+            indexed = await self.loop.run_in_executor(
+                None,
+                self.indexer.sync,
+                sett,
+                self.token_metadata.get("decimals"),
+                start_block,
+                latest_block,
+            )
+            # backfilled transfers are never alerted, only recent ones once caught up
+            alert_start_block = get_alert_start_block(checkpoint, latest_block)
+            if (
+                indexed > 0
+                and alert_start_block != None
+                and self.whale_alert_amount
+                and self.alert_channel_id != None
+            ):
+                for transfer in self.indexer.get_whale_transfers(
+                    sett, self.whale_alert_amount, alert_start_block
+                ):
+                    await self._send_whale_alert(transfer)
+        except Exception as e:
+            self.logger.error(f"Error indexing {self.token_display} transfers")
+            self.logger.error(e)
+
+    @sync_index.before_loop
+    async def before_sync_index(self):
+        await self.wait_until_ready()
 
-        self._get_token_data()
+    async def _send_whale_alert(self, transfer: dict):
+        channel = self.get_channel(self.alert_channel_id)
+        if channel == None:
+            self.logger.error(f"Alert channel {self.alert_channel_id} not found")
+            return
+        await channel.send(
+            f"Whale {transfer.get('kind')}: {transfer.get('amount'):,.2f} "
+            f"{self.token_display} https://etherscan.io/tx/{transfer.get('tx_hash')}"
+        )
 
-    @tasks.loop(seconds=UPDATE_INTERVAL_SECONDS)
-    async def update_price(self):
+    async def _update_token_data(self):
         """
-        Asynchronous function that runs every UPDATE_INTERVAL_SECONDS to get the current price and market of the
-        token and update the bot's name and activity in the guild.
+        Gets the coingecko price and the on chain sett data concurrently. With log subscriptions
+        the sett is only read after a deposit, withdrawal or price per share update.
         """
-        # first get latest token data
-        self._get_token_data()
+        _, self.sett_data = await asyncio.gather(
+            super()._update_token_data(),
+            self._read_if_changed("sett", self._get_sett_data, self.sett_data),
+        )
+
+    def _get_snapshot(self) -> dict:
+        return {**super()._get_snapshot(), "sett_data": self.sett_data}
+
+    def _restore_snapshot(self, snapshot: dict) -> None:
+        super()._restore_snapshot(snapshot)
+        self.sett_data = snapshot.get("sett_data")
 
+    def _has_display_data(self) -> bool:
+        return super()._has_display_data() and self.sett_data != None
+
+    def _get_activity_string(self) -> str:
         # for badger sett tokens, write different activity string for AUM
-        activity_string = (
+        aum = self.sett_data.get("supply") * self.token_data.get("token_price_usd")
+        return (
             "aum=$"
-            + self._get_number_label(self._get_aum())
+            + self._get_number_label(aum)
             + " ratio="
-            + str(self._get_underlying_ratio())
-        )
-        self.logger.info("activity string: " + activity_string)
-        activity = discord.Activity(
-            name=activity_string,
-            type=discord.ActivityType.playing,
+            + str(self.sett_data.get("ratio"))
         )
-        await self.change_presence(activity=activity)
-        for guild in self.guilds:
-            self.logger.info(guild.members)
-            for member in guild.members:
-                if str(member.id) == self.discord_id:
-                    try:
-                        await member.edit(
-                            nick=f"{self.token_display} $"
-                            + str(self.token_data.get("token_price_usd"))
-                        )
-                    except Exception as e:
-                        self.logger.error("Error updated nickname")
-                        self.logger.error(e)
-
-
-    @update_price.before_loop
-    async def before_update_price(self):
-        await self.wait_until_ready()  # wait until the bot logs in
-
-    def _get_aum(self):
-        return self._get_supply() * self.token_data.get("token_price_usd")
-
-    def _get_supply(self):
-        supply = (
-            self.token_contract.functions.totalSupply().call()
-            / 10 ** self.token_contract.functions.decimals().call()
+
+    async def _get_sett_data(self) -> dict:
+        """
+        Reads everything the bot needs from the sett contract in one multicall batch
+
+        Returns:
+            dict: supply of the sett token and ratio of underlying token per sett token
+        """
+        if self.token_display == "bDIGG":
+            ratio_read = self.token_contract.functions.balance()
+        else:
+            ratio_read = self.token_contract.functions.getPricePerFullShare()
+
+        total_supply, ratio_value = await self.multicall.call_many(
+            [self.token_contract.functions.totalSupply(), ratio_read]
         )
+        decimals = self.token_metadata.get("decimals")
+
+        supply = self._get_supply(total_supply, decimals)
+        ratio = self._get_underlying_ratio(ratio_value, total_supply, decimals)
+        return {"supply": supply, "ratio": ratio}
+
+    def _get_supply(self, total_supply: int, decimals: int) -> float:
+        supply = total_supply / 10 ** decimals
         self.logger.info(f"{self.token_display} supply: {supply}")
         return supply
 
-    def _get_underlying_ratio(self):
+    def _get_underlying_ratio(
+        self, ratio_value: int, total_supply: int, decimals: int
+    ) -> float:
+        """
+        Args:
+            ratio_value (int): balance() for bDIGG, getPricePerFullShare() for other setts
+            total_supply (int): raw totalSupply() of the sett
+            decimals (int): decimals() of the sett
 
+        Returns:
+            float: underlying tokens per sett token rounded to 3 decimals
+        """
         if self.token_display == "bDIGG":
-            ratio = (
-                self.token_contract.functions.balance().call()
-                / self.token_contract.functions.totalSupply().call()
-                * 10 ** (self.token_contract.functions.decimals().call() / 2)
-            )
+            ratio = ratio_value / total_supply * 10 ** (decimals / 2)
         else:
-            ratio = (
-                self.token_contract.functions.getPricePerFullShare().call()
-                / 10 ** self.token_contract.functions.decimals().call()
-            )
+            ratio = ratio_value / 10 ** decimals
 
-        print(f"ratio is {round(ratio, 3)}")
+        self.logger.debug(f"ratio is {round(ratio, 3)}")
         return round(ratio, 3)
 
     def _get_latest_transfer_log(self):
+        """
+        Finds the most recent sett transaction with exactly two Transfer logs of the sett token,
+        scanning backwards from the head in bounded chunks. Already scanned blocks and fetched
+        receipts are cached by the shared log scanner, so repeated calls only scan new blocks.
+
+        Raises:
+            ValueError: if no such transaction is found in the last MAX_TRANSFER_LOOKBACK_BLOCKS
+
+        Returns:
+            tuple: decoded Transfer events of the transaction
+        """
         latest_block = self.web3.eth.get_block("latest").get("number")
-        transfers = []
-        log = []
-        offset = 10
-
-        print(f"latest block: {latest_block}")
-        while len(log) != 2 and offset < 10001:
-            transfers = (
-                self.token_contract.events.Transfer()
-                .createFilter(fromBlock=latest_block - offset)
-                .get_all_entries()
+        transfer_event = self.token_contract.events.Transfer()
+
+        for from_block, to_block in self.log_scanner.iter_ranges_backwards(
+            latest_block, MAX_TRANSFER_LOOKBACK_BLOCKS
+        ):
+            transfers = self.log_scanner.get_logs(
+                self.token_contract.address,
+                [TRANSFER_TOPIC],
+                from_block,
+                to_block,
+                latest_block,
+            )
+            # unique transaction hashes, newest first
+            tx_hashes = list(
+                dict.fromkeys(
+                    transfer.get("transactionHash") for transfer in reversed(transfers)
+                )
             )
-            # loop over transfer txs and check the logs, return first valid transfer
-            for tx in reversed(transfers):
-                tx_hash = tx["transactionHash"].hex()
-                receipt = self.web3.eth.getTransactionReceipt(tx_hash)
-                tx_log = self.token_contract.events.Transfer().processReceipt(receipt)
-                if len(tx_log) == 2:
-                    return tx_log
-            offset = offset * 10
-
-        if transfers == []:
-            raise ValueError(f"Something wrong, no valid txs in last 10k blocks")
-            # TODO: send message to mod to let them know something wrong with bot
+            # receipts are fetched a batch at a time so the search stops early
+            batch_size = self.log_scanner.max_workers
+            for i in range(0, len(tx_hashes), batch_size):
+                batch = tx_hashes[i : i + batch_size]
+                for receipt in self.log_scanner.get_receipts(batch):
+                    tx_log = transfer_event.processReceipt(receipt)
+                    if len(tx_log) == 2:
+                        return tx_log
+
+        raise ValueError(
+            f"No valid transfer txs in last {MAX_TRANSFER_LOOKBACK_BLOCKS} blocks"
+        )
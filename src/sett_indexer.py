@@ -0,0 +1,224 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from chain_events import TRANSFER_TOPIC
+
+SETT_INDEX_PATH = os.getenv("SETT_INDEX_PATH") or "cache/sett_index.db"
+# only blocks this far behind the head are indexed, so reorgs never have to be undone
+INDEX_CONFIRMATION_BLOCKS = 12
+# bounds a catch up sync after a long downtime, the rest is indexed on the next syncs
+MAX_BLOCKS_PER_SYNC = 10000
+ZERO_ADDRESS = "0x" + "0" * 40
+
+DEPOSIT = "deposit"
+WITHDRAWAL = "withdrawal"
+TRANSFER = "transfer"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    sett TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    from_address TEXT NOT NULL,
+    to_address TEXT NOT NULL,
+    value TEXT NOT NULL,
+    amount REAL NOT NULL,
+    kind TEXT NOT NULL,
+    PRIMARY KEY (sett, tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS transfers_block ON transfers (sett, block_number);
+CREATE INDEX IF NOT EXISTS transfers_from ON transfers (sett, from_address);
+CREATE INDEX IF NOT EXISTS transfers_to ON transfers (sett, to_address);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    sett TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL
+);
+"""
+
+
+class SettIndexer:
+    """
+    Incrementally indexes Sett Transfer events into a local sqlite database. Every sync reads
+    the confirmed blocks after the sett's checkpoint and stores their transfers and the new
+    checkpoint in one transaction, so a restarted indexer resumes exactly where it stopped.
+    Mints are stored as deposits and burns as withdrawals.
+    """
+
+    def __init__(self, log_scanner, path: str = SETT_INDEX_PATH):
+        """
+        Args:
+            log_scanner (LogScanner): scanner the Transfer logs are read with
+            path (str): sqlite database file, ":memory:" for a throwaway index
+        """
+        self.logger = logging.getLogger("sett-indexer")
+        self.log_scanner = log_scanner
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # syncs run in executor threads while queries run on the event loop
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.connection.executescript(SCHEMA)
+
+    def get_checkpoint(self, sett: str) -> int:
+        """
+        Returns:
+            int: last indexed block of the sett, None if it was never synced
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT block_number FROM checkpoints WHERE sett = ?", (sett.lower(),)
+            ).fetchone()
+        return row["block_number"] if row != None else None
+
+    def sync(
+        self, sett: str, decimals: int, start_block: int, latest_block: int
+    ) -> int:
+        """
+        Indexes the sett's transfers from its checkpoint up to the last confirmed block
+
+        Args:
+            sett (str): sett address
+            decimals (int): sett decimals, used for the amount column
+            start_block (int): first block indexed if there is no checkpoint yet
+            latest_block (int): chain head
+
+        Returns:
+            int: number of indexed transfers
+        """
+        checkpoint = self.get_checkpoint(sett)
+        from_block = start_block if checkpoint == None else checkpoint + 1
+        to_block = min(
+            latest_block - INDEX_CONFIRMATION_BLOCKS,
+            from_block + MAX_BLOCKS_PER_SYNC - 1,
+        )
+        if to_block < from_block:
+            return 0
+
+        logs = self.log_scanner.get_logs(
+            sett, [TRANSFER_TOPIC], from_block, to_block, latest_block
+        )
+        rows = [self._to_row(sett, log, decimals) for log in logs]
+
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?)",
+                (sett.lower(), to_block),
+            )
+        self.logger.info(
+            f"Indexed {len(rows)} transfers of {sett} in blocks {from_block}-{to_block}"
+        )
+        return len(rows)
+
+    def get_transfers(
+        self, sett: str, kind: str = None, since_block: int = 0, limit: int = 20
+    ) -> list:
+        """
+        Args:
+            sett (str): sett address
+            kind (str, optional): DEPOSIT, WITHDRAWAL or TRANSFER, all kinds if None
+            since_block (int): first block included
+            limit (int): max number of transfers
+
+        Returns:
+            list: transfer dicts, newest first
+        """
+        query = "SELECT * FROM transfers WHERE sett = ? AND block_number >= ?"
+        params = [sett.lower(), since_block]
+        if kind != None:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY block_number DESC, log_index DESC LIMIT ?"
+        params.append(limit)
+        return self._fetch_all(query, params)
+
+    def get_whale_transfers(
+        self, sett: str, min_amount: float, since_block: int = 0
+    ) -> list:
+        """
+        Returns:
+            list: deposits and withdrawals of at least min_amount sett tokens, oldest first
+        """
+        return self._fetch_all(
+            "SELECT * FROM transfers WHERE sett = ? AND block_number >= ? "
+            "AND kind != ? AND amount >= ? ORDER BY block_number, log_index",
+            [sett.lower(), since_block, TRANSFER, min_amount],
+        )
+
+    def get_net_flow(self, sett: str, since_block: int = 0) -> dict:
+        """
+        Returns:
+            dict: deposited, withdrawn and net amounts of sett tokens since since_block
+        """
+        rows = self._fetch_all(
+            "SELECT kind, SUM(amount) AS total FROM transfers "
+            "WHERE sett = ? AND block_number >= ? GROUP BY kind",
+            [sett.lower(), since_block],
+        )
+        totals = {row.get("kind"): row.get("total") for row in rows}
+        deposits = totals.get(DEPOSIT, 0)
+        withdrawals = totals.get(WITHDRAWAL, 0)
+        return {
+            "deposits": deposits,
+            "withdrawals": withdrawals,
+            "net": deposits - withdrawals,
+        }
+
+    def get_address_transfers(self, sett: str, address: str, limit: int = 20) -> list:
+        """
+        Returns:
+            list: transfers from or to address, newest first
+        """
+        return self._fetch_all(
+            "SELECT * FROM transfers WHERE sett = ? AND from_address = ? "
+            "UNION SELECT * FROM transfers WHERE sett = ? AND to_address = ? "
+            "ORDER BY block_number DESC, log_index DESC LIMIT ?",
+            [sett.lower(), address.lower(), sett.lower(), address.lower(), limit],
+        )
+
+    def _fetch_all(self, query: str, params: list) -> list:
+        with self._lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def _to_row(self, sett: str, log: dict, decimals: int) -> tuple:
+        """
+        Decodes a raw Transfer log, from and to are the indexed topics and value is the data
+        """
+        topics = [self._to_hex(topic) for topic in log.get("topics")]
+        from_address = "0x" + topics[1][-40:]
+        to_address = "0x" + topics[2][-40:]
+        value = int(self._to_hex(log.get("data")), 16)
+
+        if from_address == ZERO_ADDRESS:
+            kind = DEPOSIT
+        elif to_address == ZERO_ADDRESS:
+            kind = WITHDRAWAL
+        else:
+            kind = TRANSFER
+
+        return (
+            sett.lower(),
+            log.get("blockNumber"),
+            self._to_hex(log.get("transactionHash")),
+            log.get("logIndex"),
+            from_address,
+            to_address,
+            # uint256 values don't fit sqlite integers, amount is used for aggregates
+            str(value),
+            value / 10 ** decimals,
+            kind,
+        )
+
+    def _to_hex(self, value) -> str:
+        if isinstance(value, (bytes, bytearray)):
+            return "0x" + bytes(value).hex()
+        return value.lower()
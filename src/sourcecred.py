@@ -1,12 +1,19 @@
 import base64
-from github import Github
-import json
+from github import InputGitTreeElement
+from github_client import GitHubClient
+from ledger import get_discord_alias_id, Ledger, serialize_action, SOURCE_TAIL_BYTES
 import logging
 import os
 import re
-import requests
 import time
 
+# ledger.json is downloaded in chunks of this many bytes
+LEDGER_CHUNK_BYTES = 64 * 1024
+LEDGER_PATH = "data/ledger.json"
+LEDGER_COMMIT_MESSAGE = "update ledger to activate users"
+# larger files are committed through the git data api instead of the contents api
+CONTENTS_API_MAX_BYTES = 1024 * 1024
+
 
 class SourceCredManager:
     """
@@ -14,31 +21,136 @@ class SourceCredManager:
     """
 
     def __init__(self, github_token: str, repo: str, queue_name: str, table_name: str):
+        self.logger = logging.getLogger("badger-bot")
         self.github_token = github_token
         self.repo = repo
-        self.ledger = self.get_current_ledger(
+        # shared by every github api and ledger download request
+        self.github = GitHubClient(github_token, repo)
+        self.ledger_url = (
             f"https://raw.githubusercontent.com/{repo}/master/data/ledger.json"
         )
+        self.ledger = self.get_current_ledger(self.ledger_url)
         self.queue_name = queue_name
         self.table_name = table_name
-        self.logger = logging.getLogger("badger-bot")
 
-    def get_current_ledger(self, ledger_url: str) -> list:
+    def get_current_ledger(self, ledger_url: str) -> Ledger:
         """
-        Downloads SourceCred ledger and stores it as a list of dicts
+        Streams the SourceCred ledger line by line into a compact Ledger
 
         Args:
             ledger_url (str): url for SourceCred ledger
 
         Returns:
-            list: list of dicts representing each action (or line) of the SourceCred ledger
+            Ledger: raw lines and discord aliases of the SourceCred ledger, iterating it
+            yields the dict of each action (or line)
+        """
+        with self.github.session.get(ledger_url, stream=True) as response:
+            response.raise_for_status()
+            return Ledger.from_chunks(
+                response.iter_content(LEDGER_CHUNK_BYTES),
+                etag=response.headers.get("ETag"),
+            )
+
+    def refresh_ledger(self) -> int:
+        """
+        Brings the ledger up to date with ledger.json. The ledger is append only, so only the
+        bytes after the known size are requested, along with the known last bytes which
+        must be unchanged. The request is conditional on the etag, so an unchanged ledger
+        costs a 304. An older copy of the ledger, EG served from cache right after a commit,
+        is ignored. If the file was rewritten or the server ignores the range, the whole
+        ledger is loaded again.
+
+        Returns:
+            int: number of new ledger lines
+        """
+        ledger = self.ledger
+        if ledger.source_size == 0:
+            return self._reload_ledger()
+
+        overlap = len(ledger.source_tail)
+        headers = {
+            "Range": f"bytes={ledger.source_size - overlap}-",
+            # ranges have to address the plain bytes, not a compressed encoding
+            "Accept-Encoding": "identity",
+        }
+        if ledger.source_etag:
+            headers["If-None-Match"] = ledger.source_etag
+
+        response = self.github.session.get(self.ledger_url, headers=headers)
+        if response.status_code == 304:
+            return 0
+        if self._is_stale_copy(response):
+            self.logger.info(
+                "ledger.json is an older copy of the committed ledger, keeping the local one"
+            )
+            return 0
+        if response.status_code != 206 or not ledger.is_source_tail(
+            response.content[:overlap]
+        ):
+            self.logger.info(
+                f"ledger.json was rewritten or can't be read by range "
+                f"(status {response.status_code}), reloading it"
+            )
+            return self._reload_ledger()
+
+        lines = len(ledger)
+        ledger.feed(response.content[overlap:])
+        ledger.finish()
+        ledger.source_etag = response.headers.get("ETag")
+        self.logger.info(
+            f"Synced {len(ledger) - lines} ledger lines "
+            f"from {len(response.content) - overlap} bytes"
+        )
+        return len(ledger) - lines
+
+    def _is_stale_copy(self, response) -> bool:
+        """
+        raw.githubusercontent.com can serve the previous ledger.json for a few minutes after
+        a commit. Reloading that copy would drop the lines the bot just committed, so a
+        remote file that is a prefix of the local ledger is recognized and skipped.
+
+        Args:
+            response (Response): answer to the range request for the appended bytes
+
+        Returns:
+            bool: True if the remote ledger.json is shorter than the local one and its last
+            bytes match the local ledger at the same offset
         """
-        response = requests.get(ledger_url)
-        ledger = []
+        match = re.match(
+            r"bytes (?:\*|(\d+)-\d+)/(\d+)", response.headers.get("Content-Range") or ""
+        )
+        if match == None:
+            return False
+        remote_size = int(match.group(2))
+        if remote_size == 0 or remote_size >= self.ledger.source_size:
+            return False
+
+        if response.status_code == 206 and int(match.group(1)) < remote_size:
+            tail_start = int(match.group(1))
+            remote_tail = response.content
+        else:
+            # the range started past the end of the remote file, check its last bytes
+            tail_start = max(remote_size - SOURCE_TAIL_BYTES, 0)
+            tail_response = self.github.session.get(
+                self.ledger_url,
+                headers={
+                    "Range": f"bytes={tail_start}-{remote_size - 1}",
+                    "Accept-Encoding": "identity",
+                },
+            )
+            if tail_response.status_code != 206:
+                return False
+            remote_tail = tail_response.content
+
+        return (
+            tail_start + len(remote_tail) == remote_size
+            and self.ledger.data[tail_start:remote_size] == remote_tail
+        )
 
-        for entry in response.iter_lines():
-            ledger.append(json.loads(entry))
-        return ledger
+    def _reload_ledger(self) -> int:
+        lines = len(self.ledger)
+        self.ledger = self.get_current_ledger(self.ledger_url)
+        return max(len(self.ledger) - lines, 0)
 
     def activate_discord_users(self, discord_ids: list) -> list:
         """
@@ -91,22 +203,12 @@ class SourceCredManager:
         if len(user_discord_id) != 18:
             return None
 
-        for entry in self.ledger:
-            action = entry.get("action", {})
-
-            if self.is_action_discord_alias(action):
-                address = action.get("alias").get("address").split("\0")
-                alias_discord_id = address[5]
-
-                if alias_discord_id == user_discord_id:
-                    ledger_identity_id = action.get("identityId")
-                    self.logger.info(
-                        f"discord id: {user_discord_id}\t"
-                        + f"identityId: {ledger_identity_id}"
-                    )
-                    return ledger_identity_id
-
-        return None
+        ledger_identity_id = self.ledger.get_discord_identity_id(user_discord_id)
+        if ledger_identity_id:
+            self.logger.info(
+                f"discord id: {user_discord_id}\t" + f"identityId: {ledger_identity_id}"
+            )
+        return ledger_identity_id
 
     def is_action_discord_alias(self, action: dict) -> bool:
         """
@@ -118,9 +220,7 @@ class SourceCredManager:
         Returns:
             bool: True if action is discord alias, otherwise False
         """
-        alias = action.get("alias")
-        address = alias.get("address").split("\0") if alias else []
-        return address[2] == "discord" if len(address) >= 6 else False
+        return get_discord_alias_id(action) != None
 
     def create_activation_action(self, identity_id: str) -> dict:
         """
@@ -163,66 +263,89 @@ class SourceCredManager:
         return False if re.search(_RE_UNCLEAN, uuid, flags=re.IGNORECASE) else True
 
     def update_ledger(self, activation_actions: list) -> None:
-        self.logger.info("Updating ledger with new users")
-        self.ledger.extend(activation_actions)
-        actions = [json.dumps(action) for action in self.ledger]
-
-        g = Github(self.github_token)
-        repo = g.get_repo(self.repo)
-
-        branch = json.loads(
-            requests.get(
-                f"https://api.github.com/repos/{self.repo}/git/ref/heads/master"
-            ).content
-        )
-        commit_sha = branch.get("object").get("sha")
-
-        commit = json.loads(
-            requests.get(
-                f"https://api.github.com/repos/{self.repo}/git/commits/{commit_sha}"
-            ).content
-        )
-        tree_sha = commit.get("sha")
-        self.logger.info(f"tree_sha {tree_sha} commit {commit}")
-
-        ledger_sha = self.get_ledger_sha(tree_sha)
+        """
+        Appends actions to ledger.json in one commit. Existing lines are uploaded as the
+        cached bytes and only the new actions are serialized. Ledgers over the contents api
+        limit are committed through the git data api.
 
-        self.logger.info(f"Updating ledger.json with following actions")
-        self.logger.info(actions)
+        Args:
+            activation_actions (list): sourcecred actions to append
 
-        response = repo.update_file(
-            "data/ledger.json",
-            "update ledger to activate users",
-            "\n".join(actions),
-            ledger_sha,
-            branch="master",
-        )
+        Raises:
+            ValueError: if the local ledger still differs from master after a refresh
+        """
+        self.logger.info("Updating ledger with new users")
+        new_lines = [serialize_action(action) for action in activation_actions]
+
+        repo = self.github.get_repo()
+        commit_sha = self.github.get_ref_sha("master")
+        self.logger.info(f"Updating ledger.json at commit {commit_sha}")
+        self._check_ledger_is_current(commit_sha)
+        content = self.ledger.to_bytes(new_lines)
+
+        self.logger.info(f"Appending following actions to ledger.json")
+        self.logger.info(activation_actions)
+
+        if len(content) > CONTENTS_API_MAX_BYTES:
+            response = self._commit_ledger_blob(repo, content, commit_sha)
+        else:
+            response = repo.update_file(
+                LEDGER_PATH,
+                LEDGER_COMMIT_MESSAGE,
+                content,
+                self.github.get_blob_sha(LEDGER_PATH, commit_sha),
+                branch="master",
+            )
+            self.github.set_blob_sha(
+                LEDGER_PATH, response.get("commit").sha, response.get("content").sha
+            )
+
+        # the local ledger only changes once the commit exists
+        for line in new_lines:
+            self.ledger.append_line(line)
+        # the next refresh only fetches what was appended after this commit
+        self.ledger.set_source(content)
 
         self.logger.info(f"Update response: {response}")
+        self.logger.info(f"GitHub metrics: {self.github.get_metrics()}")
 
-    def get_ledger_sha(self, tree_sha: str) -> str:
-        """[summary]
-
-        Args:
-            tree_sha (str): sha of tree returned by github data api
+    def _check_ledger_is_current(self, commit_sha: str) -> None:
+        """
+        Uploading a local ledger that is behind master would drop the lines committed since
+        it was loaded, so its git blob sha has to match ledger.json at the commit. A stale
+        ledger is refreshed once before the update is given up.
 
         Raises:
-            ValueError: if we can't find ledger.json, throws error
+            ValueError: if the local ledger doesn't match ledger.json at commit_sha
+        """
+        master_blob_sha = self.github.get_blob_sha(LEDGER_PATH, commit_sha)
+        if self.ledger.get_blob_sha() == master_blob_sha:
+            return
+
+        self.logger.info(f"Local ledger is behind {commit_sha}, refreshing it")
+        self.refresh_ledger()
+        if self.ledger.get_blob_sha() != master_blob_sha:
+            raise ValueError(
+                f"Local ledger doesn't match ledger.json at {commit_sha}, not updating it"
+            )
+
+    def _commit_ledger_blob(self, repo, content: bytes, commit_sha: str):
+        """
+        Commits ledger.json as a blob in a new tree on top of the master commit and moves
+        master to it. The ref update isn't forced, so it fails if master moved meanwhile.
 
         Returns:
-            str: [description]
+            GitRef: updated master ref
         """
-        tree = json.loads(
-            requests.get(
-                f"https://api.github.com/repos/{self.repo}/git/trees/{tree_sha}"
-            ).content
+        blob = repo.create_git_blob(base64.b64encode(content).decode("ascii"), "base64")
+        tree = repo.create_git_tree(
+            [InputGitTreeElement(LEDGER_PATH, "100644", "blob", sha=blob.sha)],
+            base_tree=repo.get_git_tree(self.github.get_tree_sha(commit_sha)),
         )
-        for subtree in tree.get("tree"):
-            if subtree.get("path") == "ledger.json":
-                return subtree.get("sha")
-            elif subtree.get("path") == "data":
-                return self.get_ledger_sha(subtree.get("sha"))
-
-        raise ValueError(
-            f"Tree with sha {tree_sha} did not contain the ledger.json file"
+        commit = repo.create_git_commit(
+            LEDGER_COMMIT_MESSAGE, tree, [repo.get_git_commit(commit_sha)]
         )
+        ref = repo.get_git_ref("heads/master")
+        ref.edit(commit.sha)
+        self.github.set_blob_sha(LEDGER_PATH, commit.sha, blob.sha)
+        return ref
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+from bot_registry import create_bot, load_bot_registry, PRICE_BOTS_CONFIG_PATH
+
+WATCHDOG_INTERVAL_SECONDS = 60
+RESTART_BACKOFF_SECONDS = 30
+MAX_RESTART_BACKOFF_SECONDS = 600
+
+
+class BotSupervisor:
+    """
+    Runs every bot from the price bot registry in one process. All clients are started
+    concurrently on the same event loop and a watchdog restarts update_price loops that
+    stopped because of an unhandled error.
+    """
+
+    def __init__(self, registry_path: str = PRICE_BOTS_CONFIG_PATH):
+        self.logger = logging.getLogger("bot-supervisor")
+        self.configs = load_bot_registry(registry_path)
+        # list of (bot, discord bot token) tuples
+        self.bots = []
+        self.loop_restarts = {}
+
+    def start(self, loop) -> None:
+        """
+        Creates every configured bot and schedules it on the event loop
+
+        Args:
+            loop (asyncio.AbstractEventLoop): loop the bots run on
+        """
+        for config in self.configs:
+            bot = create_bot(config)
+            self.bots.append((bot, config.get("bot_token")))
+            loop.create_task(self._run_bot(bot, config.get("bot_token")))
+            self.logger.info(f"Scheduled {config.get('bot_class')} {bot.token_display}")
+
+        loop.create_task(self._watch_update_loops())
+
+    async def _run_bot(self, bot, bot_token: str) -> None:
+        """
+        Runs the discord client. Errors of one bot are logged instead of stopping the others.
+        """
+        try:
+            await bot.start(bot_token)
+        except Exception as e:
+            self.logger.error(f"{bot.token_display} bot stopped")
+            self.logger.error(e)
+
+    async def _watch_update_loops(self) -> None:
+        while True:
+            await asyncio.sleep(WATCHDOG_INTERVAL_SECONDS)
+            for bot, _ in self.bots:
+                self._restart_update_loop_if_stopped(bot)
+
+    def _restart_update_loop_if_stopped(self, bot) -> bool:
+        """
+        Restarts the bot's update_price loop if it died. Repeated crashes back off
+        exponentially so a persistent error doesn't spin.
+
+        Returns:
+            bool: True if the loop was restarted
+        """
+        if bot.is_closed() or not bot.is_ready() or bot.update_price.is_running():
+            return False
+
+        now = bot.loop.time()
+        restarts = self.loop_restarts.get(bot.token_display, {"count": 0, "at": 0})
+        if now - restarts.get("at") > MAX_RESTART_BACKOFF_SECONDS * 2:
+            # loop has been healthy for a while, start backing off from scratch
+            restarts = {"count": 0, "at": 0}
+        backoff = min(
+            RESTART_BACKOFF_SECONDS * 2 ** restarts.get("count"),
+            MAX_RESTART_BACKOFF_SECONDS,
+        )
+        if now - restarts.get("at") < backoff:
+            return False
+
+        self.logger.warning(f"Restarting update loop of {bot.token_display} bot")
+        bot.update_price.start()
+        self.loop_restarts[bot.token_display] = {
+            "count": restarts.get("count") + 1,
+            "at": now,
+        }
+        return True
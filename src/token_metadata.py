@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import threading
+
+TOKEN_METADATA_PATH = os.getenv("TOKEN_METADATA_PATH") or "cache/token_metadata.json"
+# values that never change once a token is deployed
+IMMUTABLE_FIELDS = ["decimals", "symbol", "name"]
+
+
+class TokenMetadataCache:
+    """
+    Cache of immutable token metadata such as decimals, symbol and name. Values are read over
+    RPC the first time a contract is seen and persisted to a json file, so later ticks and
+    restarts never pay for them again.
+    """
+
+    def __init__(self, path: str = TOKEN_METADATA_PATH):
+        self.logger = logging.getLogger("token-metadata")
+        self.path = path
+        self.metadata = self._load()
+        # bots read metadata in executor threads, saves must not interleave
+        self._lock = threading.Lock()
+
+    def get(self, contract) -> dict:
+        """
+        Returns metadata for the contract, reading and persisting it on first use
+
+        Args:
+            contract (Contract): web3 contract, only fields present in its abi are read
+
+        Returns:
+            dict: EG {"decimals": 18, "symbol": "bBADGER", "name": "bBADGER"}
+        """
+        if contract.address not in self.metadata:
+            metadata = self._read_metadata(contract)
+            with self._lock:
+                self.metadata[contract.address] = metadata
+                self._save()
+
+        return self.metadata.get(contract.address)
+
+    def _read_metadata(self, contract) -> dict:
+        abi_functions = [
+            item.get("name") for item in contract.abi if item.get("type") == "function"
+        ]
+        metadata = {}
+        for field in IMMUTABLE_FIELDS:
+            if field in abi_functions:
+                metadata[field] = getattr(contract.functions, field)().call()
+
+        self.logger.info(f"Loaded metadata for {contract.address}: {metadata}")
+        return metadata
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as metadata_file:
+                return json.load(metadata_file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.error(f"Error loading token metadata from {self.path}")
+            self.logger.error(e)
+            return {}
+
+    def _save(self) -> None:
+        """
+        Writes the metadata atomically, callers hold the lock
+        """
+        tmp_path = self.path + ".tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as metadata_file:
+                json.dump(self.metadata, metadata_file)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            # the cache still works in memory if the file can't be written
+            self.logger.error(f"Error saving token metadata to {self.path}")
+            self.logger.error(e)
@@ -0,0 +1,150 @@
+import asyncio
+import discord
+import logging
+import random
+import time
+
+# discord updates of all bots are spread over this window after the shared data fetch
+DISPLAY_SPREAD_SECONDS = 30
+MAX_JITTER_SECONDS = 2
+# minimum gap between two discord updates of the same bot, every bot has its own rate limits
+MIN_SPACING_SECONDS = 0.25
+# used when a 429 response doesn't say how long to wait
+DEFAULT_BACKOFF_SECONDS = 60
+# discord.py sleeps through 429s and retries internally, an update still running after this
+# long is being throttled and is deferred instead of blocking the bot's tick
+UPDATE_TIMEOUT_SECONDS = 5
+
+
+class DiscordUpdateScheduler:
+    """
+    Schedules nickname and presence updates of every bot in the process. Each bot gets its own
+    slot in the display window plus jitter so co-hosted bots don't burst on the same cadence,
+    each bot's updates are paced, and buckets that got rate limited are deferred until discord
+    says they can be retried instead of failing.
+    """
+
+    def __init__(
+        self,
+        spread_seconds: float = DISPLAY_SPREAD_SECONDS,
+        max_jitter_seconds: float = MAX_JITTER_SECONDS,
+        min_spacing_seconds: float = MIN_SPACING_SECONDS,
+        update_timeout_seconds: float = UPDATE_TIMEOUT_SECONDS,
+    ):
+        self.logger = logging.getLogger("update-scheduler")
+        self.spread_seconds = spread_seconds
+        self.max_jitter_seconds = max_jitter_seconds
+        self.min_spacing_seconds = min_spacing_seconds
+        self.update_timeout_seconds = update_timeout_seconds
+        self.bots = []
+        # bucket -> monotonic time the bucket can be used again
+        self.blocked_until = {}
+        self.rate_limited_count = 0
+        # bot id -> monotonic time of its last update
+        self._last_sent = {}
+        self._send_locks = {}
+
+    def register(self, bot) -> None:
+        if bot not in self.bots:
+            self.bots.append(bot)
+
+    def get_display_delay(self, bot) -> float:
+        """
+        Returns:
+            float: seconds the bot should wait after fetching data before updating discord
+        """
+        slot = self.bots.index(bot) if bot in self.bots else 0
+        slot_offset = slot * self.spread_seconds / max(len(self.bots), 1)
+        return slot_offset + random.uniform(0, self.max_jitter_seconds)
+
+    def is_deferred(self, bucket: tuple) -> bool:
+        """
+        Args:
+            bucket (tuple): rate limit bucket, the first value is the bot id
+
+        Returns:
+            bool: True if the bucket or the whole bot is rate limited
+        """
+        now = time.monotonic()
+        return (
+            self.blocked_until.get(bucket, 0) > now
+            or self.blocked_until.get((bucket[0], "global"), 0) > now
+        )
+
+    async def run(self, bucket: tuple, update) -> bool:
+        """
+        Sends a discord update unless its bucket is rate limited
+
+        Args:
+            bucket (tuple): rate limit bucket, EG (bot_id, "nick", guild_id)
+            update (callable): returns the coroutine making the discord call
+
+        Raises:
+            discord.HTTPException: for errors other than rate limits
+
+        Returns:
+            bool: True if the update was sent, False if it was deferred
+        """
+        if self.is_deferred(bucket):
+            return False
+
+        await self._wait_for_spacing(bucket[0])
+        try:
+            await asyncio.wait_for(update(), self.update_timeout_seconds)
+        except asyncio.TimeoutError:
+            # cancelling stops discord.py's internal retry, the update is sent next tick
+            self._defer(bucket, None)
+            return False
+        except discord.HTTPException as e:
+            if e.status != 429:
+                raise
+            self._defer(bucket, e.response)
+            return False
+
+        return True
+
+    async def _wait_for_spacing(self, bot_id) -> None:
+        """
+        Waits until min_spacing_seconds passed since the bot's last update, other bots don't
+        share its rate limits and are never held up by it
+        """
+        if bot_id not in self._send_locks:
+            self._send_locks[bot_id] = asyncio.Lock()
+        async with self._send_locks[bot_id]:
+            wait = (
+                self._last_sent.get(bot_id, 0)
+                + self.min_spacing_seconds
+                - time.monotonic()
+            )
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_sent[bot_id] = time.monotonic()
+
+    def _defer(self, bucket: tuple, response) -> None:
+        """
+        Blocks bucket for as long as the rate limit headers say. Global rate limits block every
+        bucket of the bot.
+        """
+        self.rate_limited_count += 1
+        headers = response.headers if response != None else {}
+        retry_after = self._get_retry_after(headers)
+        blocked_until = time.monotonic() + retry_after
+
+        if headers.get("X-RateLimit-Global") == "true":
+            self.blocked_until[(bucket[0], "global")] = blocked_until
+        else:
+            self.blocked_until[bucket] = blocked_until
+
+        self.logger.warning(
+            f"Rate limited on {bucket}, deferring updates for {retry_after} seconds"
+        )
+
+    def _get_retry_after(self, headers) -> float:
+        for header in ["Retry-After", "X-RateLimit-Reset-After"]:
+            value = headers.get(header)
+            if value != None:
+                try:
+                    return float(value)
+                except ValueError:
+                    continue
+        return DEFAULT_BACKOFF_SECONDS
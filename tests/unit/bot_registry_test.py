@@ -0,0 +1,40 @@
+import json
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from bot_registry import load_bot_registry, resolve_bot_config
+
+
+def test_load_bot_registry(monkeypatch):
+    monkeypatch.setenv("BBADGER_ADDRESS", "0x19D97D8fA813EE2f51aD4B4e04EA08bAf4DFfC28")
+    monkeypatch.setenv("BOT_TOKEN_BBADGER", "test-token")
+
+    configs = load_bot_registry()
+    bbadger_config = [
+        config for config in configs if config.get("token_display") == "bBADGER"
+    ][0]
+    bdigg_config = [
+        config for config in configs if config.get("token_display") == "bDIGG"
+    ][0]
+
+    assert bbadger_config.get("bot_class") == "SettBot"
+    assert (
+        bbadger_config.get("token_address")
+        == "0x19D97D8fA813EE2f51aD4B4e04EA08bAf4DFfC28"
+    )
+    assert bbadger_config.get("bot_token") == "test-token"
+    assert bbadger_config.get("underlying_decimals") == 18
+    assert "token_abi_path" not in bbadger_config
+    assert isinstance(bbadger_config.get("token_abi"), list)
+    # setts share the same loaded abi
+    assert bbadger_config.get("token_abi") is bdigg_config.get("token_abi")
+
+
+def test_resolve_bot_config_unknown_class():
+    with pytest.raises(ValueError):
+        resolve_bot_config({"bot_class": "NotABot"}, ".")
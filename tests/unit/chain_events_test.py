@@ -0,0 +1,81 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from chain_events import ChainEventWatcher, LOG_REBASE_TOPIC
+
+DIGG_ADDRESS = "0x798D1bE841a82a273720CE31c822C61a67a601C3"
+
+
+class MockWebSocket:
+    def __init__(self):
+        self.closed = False
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+@pytest.mark.asyncio
+async def test_logs_are_routed_to_subscription_callback():
+    watcher = ChainEventWatcher("wss://node")
+    logs = []
+    subscription = watcher.watch_logs(DIGG_ADDRESS, [LOG_REBASE_TOPIC], logs.append)
+    watcher.ws = MockWebSocket()
+    await watcher._subscribe(subscription)
+
+    request = watcher.ws.sent[-1]
+    assert request.get("method") == "eth_subscribe"
+    assert request.get("params") == [
+        "logs",
+        {"address": DIGG_ADDRESS, "topics": [LOG_REBASE_TOPIC]},
+    ]
+    assert subscription.is_active() == False
+
+    watcher.handle_message(
+        {"jsonrpc": "2.0", "id": request.get("id"), "result": "0xab"}
+    )
+    assert subscription.is_active() == True
+
+    watcher.handle_message(
+        {
+            "jsonrpc": "2.0",
+            "method": "eth_subscription",
+            "params": {"subscription": "0xab", "result": {"blockNumber": "0x1"}},
+        }
+    )
+    # logs of unknown subscriptions are ignored
+    watcher.handle_message(
+        {
+            "jsonrpc": "2.0",
+            "method": "eth_subscription",
+            "params": {"subscription": "0xcd", "result": {"blockNumber": "0x2"}},
+        }
+    )
+    assert logs == [{"blockNumber": "0x1"}]
+
+
+def test_failed_subscription_stays_inactive():
+    watcher = ChainEventWatcher("wss://node")
+    subscription = watcher.watch_logs(DIGG_ADDRESS, [LOG_REBASE_TOPIC], print)
+    watcher.pending[1] = subscription
+
+    watcher.handle_message(
+        {"jsonrpc": "2.0", "id": 1, "error": {"code": -32601, "message": "no ws"}}
+    )
+    assert subscription.is_active() == False
+
+
+def test_disconnect_deactivates_subscriptions():
+    watcher = ChainEventWatcher("wss://node")
+    subscription = watcher.watch_logs(DIGG_ADDRESS, [LOG_REBASE_TOPIC], print)
+    watcher.pending[1] = subscription
+    watcher.handle_message({"jsonrpc": "2.0", "id": 1, "result": "0xab"})
+
+    watcher._deactivate()
+    assert subscription.is_active() == False
+    assert watcher.active == {}
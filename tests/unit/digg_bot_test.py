@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from digg_bot import DiggBot, is_rebase_due
+
+# 2021-05-01 00:00 UTC
+DAY_START = 1619827200
+HOUR = 60 * 60
+
+
+def test_supply_read_after_window_is_not_due():
+    # read at 21:00, window was 20:00 - 20:20
+    assert is_rebase_due(DAY_START + 21 * HOUR, DAY_START + 23 * HOUR) == False
+    # next morning, the last window is still yesterday's
+    assert is_rebase_due(DAY_START + 21 * HOUR, DAY_START + 33 * HOUR) == False
+
+
+def test_supply_read_before_window_is_due():
+    assert is_rebase_due(DAY_START + 19 * HOUR, DAY_START + 20 * HOUR + 60) == True
+    assert is_rebase_due(DAY_START + 19 * HOUR, DAY_START + 23 * HOUR) == True
+
+
+def test_supply_is_due_during_window():
+    now = DAY_START + 20 * HOUR + 10 * 60
+    assert is_rebase_due(now - 45, now) == True
+
+
+def test_custom_window():
+    # window at 08:00 - 08:10
+    assert (
+        is_rebase_due(DAY_START + 7 * HOUR, DAY_START + 9 * HOUR, 8 * HOUR, 600) == True
+    )
+    assert (
+        is_rebase_due(DAY_START + 9 * HOUR, DAY_START + 10 * HOUR, 8 * HOUR, 600)
+        == False
+    )
+
+
+class MockAggregatorCall:
+    def call(self):
+        raise ValueError("execution reverted")
+
+
+class MockOracleFunctions:
+    def aggregator(self):
+        return MockAggregatorCall()
+
+
+class MockOracleContract:
+    functions = MockOracleFunctions()
+
+
+class MockOracleReader:
+    contract = MockOracleContract()
+
+
+class MockDiggBot:
+    def __init__(self):
+        self.logger = logging.getLogger("price-bot")
+        self.loop = asyncio.get_event_loop()
+        self.digg_oracle = MockOracleReader()
+        self.btc_oracle = MockOracleReader()
+        self.oracles_watched = False
+        self.watched = []
+
+    def _watch_logs(self, source, address, topics):
+        self.watched.append(source)
+
+
+@pytest.mark.asyncio
+async def test_failed_aggregator_lookup_falls_back_to_polling():
+    bot = MockDiggBot()
+
+    await DiggBot._watch_oracles(bot)
+
+    assert bot.oracles_watched == False
+    assert bot.watched == []
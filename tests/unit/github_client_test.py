@@ -0,0 +1,101 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from github_client import GitHubClient
+
+REPO = "Badger-Finance/SourceCred"
+
+
+class MockResponse:
+    def __init__(self, status_code, body=None, etag=None, remaining=4999):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Used": str(5000 - remaining),
+        }
+        if etag != None:
+            self.headers["ETag"] = etag
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ValueError(self.status_code)
+
+
+class MockSession:
+    def __init__(self, objects):
+        # path -> (etag, body)
+        self.objects = objects
+        self.headers = {}
+        self.requests = []
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, headers):
+        path = url.split(f"/repos/{REPO}/")[1]
+        self.requests.append((path, headers.get("If-None-Match")))
+        etag, body = self.objects[path]
+        if headers.get("If-None-Match") == etag:
+            return MockResponse(304)
+        return MockResponse(200, body, etag)
+
+
+@pytest.fixture
+def session():
+    return MockSession(
+        {
+            "git/ref/heads/master": ('"ref"', {"object": {"sha": "commit1"}}),
+            "git/commits/commit1": ('"commit1"', {"tree": {"sha": "tree1"}}),
+            "git/trees/tree1": (
+                '"tree1"',
+                {"tree": [{"path": "data", "sha": "tree2"}]},
+            ),
+            "git/trees/tree2": (
+                '"tree2"',
+                {"tree": [{"path": "ledger.json", "sha": "blob1"}]},
+            ),
+        }
+    )
+
+
+def test_requests_are_authenticated_and_conditional(session):
+    client = GitHubClient("token", REPO, session=session)
+
+    assert client.get_ref_sha() == "commit1"
+    assert client.get_ref_sha() == "commit1"
+    assert session.headers.get("Authorization") == "token token"
+    assert session.requests == [
+        ("git/ref/heads/master", None),
+        ("git/ref/heads/master", '"ref"'),
+    ]
+
+    metrics = client.get_metrics()
+    assert metrics.get("rate_limit") == 5000
+    assert metrics.get("rate_limit_remaining") == 4999
+    assert metrics.get("requests") == 2
+    assert metrics.get("not_modified") == 1
+
+
+def test_blob_sha_is_cached_per_commit(session):
+    client = GitHubClient("token", REPO, session=session)
+
+    assert client.get_blob_sha("data/ledger.json", "commit1") == "blob1"
+    assert client.get_blob_sha("data/ledger.json", "commit1") == "blob1"
+    assert len(session.requests) == 3
+
+    client.set_blob_sha("data/ledger.json", "commit2", "blob2")
+    assert client.get_blob_sha("data/ledger.json", "commit2") == "blob2"
+    assert len(session.requests) == 3
+
+    with pytest.raises(ValueError):
+        client.get_blob_sha("data/missing.json", "commit1")
@@ -0,0 +1,54 @@
+from aiohttp import web
+import asyncio
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from http_client import AsyncHttpClient
+
+
+async def start_server(delay_seconds: float):
+    async def handler(request):
+        await asyncio.sleep(delay_seconds)
+        return web.json_response({"badger-dao": {"usd": 10}})
+
+    app = web.Application()
+    app.router.add_get("/price", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/price"
+
+
+@pytest.mark.asyncio
+async def test_get_json():
+    runner, url = await start_server(0)
+    client = AsyncHttpClient(timeout_seconds=1)
+    try:
+        assert await client.get_json(url) == {"badger-dao": {"usd": 10}}
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_slow_response_times_out_with_default_timeout():
+    runner, url = await start_server(5)
+    client = AsyncHttpClient(timeout_seconds=0.2)
+    slow_client = AsyncHttpClient(timeout_seconds=30)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await client.get_json(url)
+        # a per request override still wins over the default
+        with pytest.raises(asyncio.TimeoutError):
+            await slow_client.get_json(url, timeout=0.2)
+    finally:
+        await client.close()
+        await slow_client.close()
+        await runner.cleanup()
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from ledger import get_discord_alias_id, Ledger
+
+DISCORD_ID = "653638788026990593"
+
+
+def make_alias_line(discord_id: str, identity_id: str) -> bytes:
+    return (
+        '{"action":{"alias":{"address":"N\\u0000sourcecred\\u0000discord\\u0000MEMBER'
+        f'\\u0000user\\u0000{discord_id}\\u0000","description":"discord/test#0001"}},'
+        f'"identityId":"{identity_id}","type":"ADD_ALIAS"}},"ledgerTimestamp":1,'
+        '"uuid":"ZueUX45XoDqhwbkCKaql8A","version":"1"}'
+    ).encode("utf-8")
+
+
+IDENTITY_LINE = (
+    b'{"action":{"identity":{"address":"N\\u0000sourcecred\\u0000core\\u0000IDENTITY'
+    b'\\u0000FwDf9X8JzrvoCzMHYwYYLw\\u0000","aliases":[],"id":"FwDf9X8JzrvoCzMHYwYYLw",'
+    b'"name":"Tritium---VLK","subtype":"USER"},"type":"CREATE_IDENTITY"},'
+    b'"ledgerTimestamp":1,"uuid":"N7pyNa2bp8DIA0RQYNnrmw","version":"1"}'
+)
+
+
+def test_lines_are_kept_byte_for_byte():
+    lines = [IDENTITY_LINE, make_alias_line(DISCORD_ID, "N7pyNa2bp8DIA0RQYNnrmw"), b""]
+    ledger = Ledger.from_lines(lines)
+
+    assert len(ledger) == 2
+    assert ledger.get_line(1) == lines[1]
+    assert ledger.to_bytes() == b"\n".join(lines[:2])
+    assert list(ledger) == [json.loads(lines[0]), json.loads(lines[1])]
+
+
+def test_discord_aliases_keep_first_identity():
+    ledger = Ledger.from_lines(
+        [
+            make_alias_line(DISCORD_ID, "FirstIdentityId"),
+            IDENTITY_LINE,
+            make_alias_line(DISCORD_ID, "SecondIdentityId"),
+        ]
+    )
+
+    assert ledger.get_discord_identity_id(DISCORD_ID) == "FirstIdentityId"
+    assert ledger.get_discord_identity_id("111111111111111111") == None
+    assert [alias.identity_id for alias in ledger.discord_aliases] == [
+        "FirstIdentityId",
+        "SecondIdentityId",
+    ]
+    assert ledger.discord_aliases[0].description == "discord/test#0001"
+
+
+def test_appended_actions_are_serialized_compactly():
+    ledger = Ledger.from_lines([IDENTITY_LINE])
+    ledger.extend(
+        [
+            {
+                "version": "1",
+                "action": {"type": "TOGGLE_ACTIVATION", "identityId": "abc"},
+                "ledgerTimestamp": 2,
+                "uuid": "def",
+            },
+            json.loads(make_alias_line("111111111111111111", "NewIdentityId")),
+        ]
+    )
+
+    assert ledger.get_line(1) == (
+        b'{"action":{"identityId":"abc","type":"TOGGLE_ACTIVATION"},'
+        b'"ledgerTimestamp":2,"uuid":"def","version":"1"}'
+    )
+    assert ledger.get_line(2) == make_alias_line("111111111111111111", "NewIdentityId")
+    assert ledger.get_discord_identity_id("111111111111111111") == "NewIdentityId"
+
+
+def test_get_discord_alias_id():
+    alias = json.loads(make_alias_line(DISCORD_ID, "a"))
+    assert get_discord_alias_id(alias["action"]) == DISCORD_ID
+    assert get_discord_alias_id(json.loads(IDENTITY_LINE)["action"]) == None
+    assert get_discord_alias_id({}) == None
+
+
+def test_chunks_are_split_into_lines():
+    content = b"\n".join([IDENTITY_LINE, make_alias_line(DISCORD_ID, "a")])
+    ledger = Ledger.from_chunks(
+        [content[i : i + 100] for i in range(0, len(content), 100)], etag='"abc"'
+    )
+
+    assert len(ledger) == 2
+    assert ledger.to_bytes() == content
+    assert ledger.source_size == len(content)
+    assert ledger.source_etag == '"abc"'
+    assert ledger.is_source_tail(content[-50:]) == True
+    assert ledger.is_source_tail(IDENTITY_LINE[-50:]) == False
+
+    # appended bytes start with the newline the file didn't end with
+    ledger.feed(b"\n" + make_alias_line("111111111111111111", "b") + b"\n")
+    ledger.finish()
+    assert len(ledger) == 3
+    assert ledger.get_discord_identity_id("111111111111111111") == "b"
+
+
+def test_to_bytes_with_appended_lines():
+    ledger = Ledger.from_lines([IDENTITY_LINE])
+
+    assert ledger.to_bytes([b"{}", b"[]"]) == IDENTITY_LINE + b"\n{}\n[]"
+    assert Ledger().to_bytes([b"{}"]) == b"{}"
+    assert len(ledger) == 1
+
+
+def test_get_blob_sha():
+    content = IDENTITY_LINE + b"\r\n\n" + make_alias_line(DISCORD_ID, "a") + b"\n"
+    ledger = Ledger.from_chunks([content[:100], content[100:]])
+
+    # same as git hash-object
+    assert (
+        ledger.get_blob_sha()
+        == hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+    )
+    assert ledger.to_bytes() == content
+    assert len(ledger) == 2
+    assert Ledger().get_blob_sha() == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+    assert (
+        Ledger.from_chunks([b'{"a":1}\n{"b":2}\n']).get_blob_sha()
+        == "91872ba2e36d82bed27d573d2cb3c6eaf66820f1"
+    )
@@ -0,0 +1,138 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from log_scanner import LogScanner
+
+SETT_ADDRESS = "0x19D97D8fA813EE2f51aD4B4e04EA08bAf4DFfC28"
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+class MockEth:
+    def __init__(self, logs):
+        self.logs = logs
+        self.log_requests = []
+        self.receipt_requests = []
+
+    def get_logs(self, log_filter):
+        self.log_requests.append((log_filter["fromBlock"], log_filter["toBlock"]))
+        return [
+            log
+            for log in self.logs
+            if log_filter["fromBlock"] <= log["blockNumber"] <= log_filter["toBlock"]
+        ]
+
+    def get_transaction_receipt(self, tx_hash):
+        self.receipt_requests.append(tx_hash)
+        return {"transactionHash": tx_hash}
+
+
+class MockWeb3:
+    def __init__(self, logs):
+        self.eth = MockEth(logs)
+
+
+def make_log(block_number):
+    return {"blockNumber": block_number, "transactionHash": f"0x{block_number}"}
+
+
+def test_get_logs_is_chunked():
+    web3 = MockWeb3([make_log(block) for block in [5, 150, 250]])
+    scanner = LogScanner(web3, chunk_size=100, confirmations=0)
+
+    logs = scanner.get_logs(SETT_ADDRESS, [TRANSFER_TOPIC], 0, 299, 299)
+
+    assert [log["blockNumber"] for log in logs] == [5, 150, 250]
+    assert sorted(web3.eth.log_requests) == [(0, 99), (100, 199), (200, 299)]
+
+
+def test_scanned_blocks_are_not_requested_again():
+    web3 = MockWeb3([make_log(block) for block in [50, 120, 180]])
+    scanner = LogScanner(web3, chunk_size=1000, confirmations=10)
+
+    scanner.get_logs(SETT_ADDRESS, [TRANSFER_TOPIC], 0, 100, 100)
+    # blocks 0 - 90 are confirmed and cached, the head is read again
+    assert web3.eth.log_requests == [(0, 90), (91, 100)]
+
+    web3.eth.log_requests = []
+    logs = scanner.get_logs(SETT_ADDRESS, [TRANSFER_TOPIC], 0, 200, 200)
+    assert web3.eth.log_requests == [(91, 190), (191, 200)]
+    assert [log["blockNumber"] for log in logs] == [50, 120, 180]
+
+
+def test_refused_range_is_split():
+    web3 = MockWeb3([make_log(10)])
+    requests = []
+
+    def get_logs(log_filter):
+        requests.append((log_filter["fromBlock"], log_filter["toBlock"]))
+        if log_filter["toBlock"] - log_filter["fromBlock"] > 50:
+            raise ValueError("query returned more than 10000 results")
+        return MockEth.get_logs(web3.eth, log_filter)
+
+    web3.eth.get_logs = get_logs
+    scanner = LogScanner(web3, chunk_size=100, confirmations=0)
+
+    logs = scanner.get_logs(SETT_ADDRESS, [TRANSFER_TOPIC], 0, 99, 99)
+    assert logs == [make_log(10)]
+    assert requests == [(0, 99), (0, 49), (50, 99)]
+
+
+def test_other_errors_are_not_split():
+    web3 = MockWeb3([])
+    requests = []
+
+    def get_logs(log_filter):
+        requests.append((log_filter["fromBlock"], log_filter["toBlock"]))
+        raise ValueError({"code": -32000, "message": "header not found"})
+
+    web3.eth.get_logs = get_logs
+    scanner = LogScanner(web3, chunk_size=100, confirmations=0)
+
+    with pytest.raises(ValueError):
+        scanner.get_logs(SETT_ADDRESS, [TRANSFER_TOPIC], 0, 99, 99)
+    assert requests == [(0, 99)]
+
+
+def test_split_depth_is_capped():
+    web3 = MockWeb3([])
+    requests = []
+
+    def get_logs(log_filter):
+        requests.append((log_filter["fromBlock"], log_filter["toBlock"]))
+        raise ValueError({"code": -32005, "message": "limit exceeded"})
+
+    web3.eth.get_logs = get_logs
+    scanner = LogScanner(web3, chunk_size=2000, confirmations=0)
+
+    with pytest.raises(ValueError):
+        scanner.get_logs(SETT_ADDRESS, [TRANSFER_TOPIC], 0, 1999, 1999)
+    # the first half fails at every depth and stops the split
+    assert len(requests) == 9
+    assert requests[-1] == (0, 7)
+
+
+def test_receipts_are_cached():
+    web3 = MockWeb3([])
+    scanner = LogScanner(web3)
+
+    assert scanner.get_receipts(["0x1", "0x2"]) == [
+        {"transactionHash": "0x1"},
+        {"transactionHash": "0x2"},
+    ]
+    scanner.get_receipts(["0x2", "0x3"])
+    assert sorted(web3.eth.receipt_requests) == ["0x1", "0x2", "0x3"]
+
+
+def test_iter_ranges_backwards():
+    scanner = LogScanner(MockWeb3([]), chunk_size=4000)
+
+    assert list(scanner.iter_ranges_backwards(10000, 10000)) == [
+        (6001, 10000),
+        (2001, 6000),
+        (1, 2000),
+    ]
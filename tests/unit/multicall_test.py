@@ -0,0 +1,134 @@
+import asyncio
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from multicall import MulticallBatcher
+
+
+def encode_uint(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+class MockCodec:
+    def decode_abi(self, types: list, data: bytes) -> tuple:
+        # every test output is a uint256 packed in a 32 byte word
+        return tuple(
+            int.from_bytes(data[i * 32 : (i + 1) * 32], "big")
+            for i in range(len(types))
+        )
+
+
+class MockAggregateCall:
+    def __init__(self, contract, calls):
+        self.contract = contract
+        self.calls = calls
+
+    def call(self):
+        self.contract.batches.append(self.calls)
+        return [self.contract.results[data] for _, data in self.calls]
+
+
+class MockMulticallFunctions:
+    def __init__(self, contract):
+        self.contract = contract
+
+    def tryAggregate(self, require_success, calls):
+        return MockAggregateCall(self.contract, calls)
+
+
+class MockMulticallContract:
+    def __init__(self):
+        self.functions = MockMulticallFunctions(self)
+        self.batches = []
+        # encoded call data to (success, return data)
+        self.results = {}
+
+
+class MockEth:
+    def __init__(self):
+        self.multicall_contract = MockMulticallContract()
+
+    def contract(self, address, abi):
+        return self.multicall_contract
+
+
+class MockWeb3:
+    def __init__(self):
+        self.eth = MockEth()
+        self.codec = MockCodec()
+
+    def toChecksumAddress(self, address):
+        return address
+
+
+class MockContractFunction:
+    def __init__(self, fn_name: str, outputs: int = 1):
+        self.address = "0x19D97D8fA813EE2f51aD4B4e04EA08bAf4DFfC28"
+        self.fn_name = fn_name
+        self.abi = {"outputs": [{"type": "uint256"}] * outputs}
+
+    def _encode_transaction_data(self):
+        return self.fn_name
+
+
+def create_batcher():
+    web3 = MockWeb3()
+    return MulticallBatcher(web3, batch_window=0.01), web3.eth.multicall_contract
+
+
+@pytest.mark.asyncio
+async def test_calls_sent_in_one_batch():
+    batcher, multicall_contract = create_batcher()
+    multicall_contract.results = {
+        "totalSupply": (True, encode_uint(1000)),
+        "decimals": (True, encode_uint(18)),
+    }
+
+    total_supply, decimals = await asyncio.gather(
+        batcher.call(MockContractFunction("totalSupply")),
+        batcher.call(MockContractFunction("decimals")),
+    )
+
+    assert total_supply == 1000
+    assert decimals == 18
+    assert len(multicall_contract.batches) == 1
+    assert len(multicall_contract.batches[0]) == 2
+
+
+@pytest.mark.asyncio
+async def test_reverted_call_fails_alone():
+    batcher, multicall_contract = create_batcher()
+    multicall_contract.results = {
+        "balance": (False, b""),
+        "decimals": (True, encode_uint(18)),
+    }
+
+    balance, decimals = await asyncio.gather(
+        batcher.call(MockContractFunction("balance")),
+        batcher.call(MockContractFunction("decimals")),
+        return_exceptions=True,
+    )
+
+    assert isinstance(balance, ValueError)
+    assert decimals == 18
+    # a reverted read is not an rpc failure
+    assert batcher.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_multiple_outputs_decoded_as_list():
+    batcher, multicall_contract = create_batcher()
+    multicall_contract.results = {
+        "latestRoundData": (True, b"".join(encode_uint(v) for v in [100, 5000, 1000]))
+    }
+
+    round_data = await batcher.call_many(
+        [MockContractFunction("latestRoundData", outputs=3)]
+    )
+
+    assert round_data == [[100, 5000, 1000]]
@@ -0,0 +1,56 @@
+from decimal import Decimal
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from oracle import ChainlinkOracleReader
+
+# roundId, answer, startedAt, updatedAt, answeredInRound
+test_round = [100, 5000000000000, 1000, 1000, 100]
+
+
+class MockOracle:
+    address = "0xF4030086522a5bEEa4988F8cA5B36dbC97BeE88c"
+
+
+def create_reader():
+    reader = ChainlinkOracleReader(
+        MockOracle(), None, 8, 3600, 0.005, max_poll_seconds=86400
+    )
+    reader.update_round(test_round, now=1000)
+    return reader
+
+
+def test_update_round():
+    reader = create_reader()
+
+    assert reader.round_id == 100
+    assert reader.price == Decimal(50000)
+    assert reader.updated_at == 1000
+
+
+def test_needs_refresh():
+    reader = ChainlinkOracleReader(MockOracle(), None, 8, 3600, 0.005)
+    assert reader.needs_refresh(now=1000) == True
+
+    reader = create_reader()
+    # too soon after the last read
+    assert reader.needs_refresh(reference_price=60000, now=1010) == False
+    # heartbeat round not due and reference price within deviation
+    assert reader.needs_refresh(reference_price=50100, now=1100) == False
+    # reference price moved more than the deviation threshold
+    assert reader.needs_refresh(reference_price=50300, now=1100) == True
+    # heartbeat elapsed
+    assert reader.needs_refresh(now=4600) == True
+
+
+def test_is_stale():
+    reader = create_reader()
+
+    assert reader.get_staleness_seconds(now=1500) == 500
+    assert reader.is_stale(now=4600) == False
+    assert reader.is_stale(now=5300) == True
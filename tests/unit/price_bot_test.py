@@ -0,0 +1,114 @@
+import discord
+import logging
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from price_bot import cache, get_lean_client_options, PriceBot
+from price_snapshot import PriceSnapshotStore
+from price_store import PriceStore
+from token_metadata import TokenMetadataCache
+from update_scheduler import DiscordUpdateScheduler
+
+
+class MockMember:
+    def __init__(self):
+        self.nicks = []
+
+    async def edit(self, nick=None):
+        self.nicks.append(nick)
+
+
+class MockGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.me = MockMember()
+
+
+class MockUser:
+    id = 1
+
+
+class MockBot:
+    def __init__(self):
+        self.logger = logging.getLogger("price-bot")
+        self.scheduler = DiscordUpdateScheduler(min_spacing_seconds=0)
+        self.user = MockUser()
+        self.guilds = [MockGuild(10), MockGuild(11)]
+        self.applied_nicknames = {}
+        self.applied_activity = None
+        self.activities = []
+
+    async def change_presence(self, activity=None):
+        self.activities.append(activity.name)
+
+    async def update_display(self, nickname, activity_string):
+        await PriceBot._update_display(self, nickname, activity_string)
+
+
+def test_get_lean_client_options():
+    options = get_lean_client_options()
+
+    assert options.get("intents").guilds == True
+    assert options.get("intents").members == False
+    assert options.get("intents").presences == False
+    assert options.get("member_cache_flags").joined == False
+    assert options.get("chunk_guilds_at_startup") == False
+    assert options.get("max_messages") == None
+
+    # client accepts the options without needing privileged intents
+    client = discord.Client(**options)
+    assert client._connection._chunk_guilds == False
+
+
+@pytest.mark.asyncio
+async def test_update_display_only_sends_changes():
+    bot = MockBot()
+
+    await bot.update_display("BADGER $10", "mcap=$100M")
+    await bot.update_display("BADGER $10", "mcap=$100M")
+    assert bot.activities == ["mcap=$100M"]
+    assert [guild.me.nicks for guild in bot.guilds] == [["BADGER $10"], ["BADGER $10"]]
+
+    await bot.update_display("BADGER $11", "mcap=$100M")
+    assert bot.activities == ["mcap=$100M"]
+    assert [guild.me.nicks for guild in bot.guilds] == [
+        ["BADGER $10", "BADGER $11"],
+        ["BADGER $10", "BADGER $11"],
+    ]
+
+    await bot.update_display("BADGER $11", "mcap=$110M")
+    assert bot.activities == ["mcap=$100M", "mcap=$110M"]
+    assert len(bot.guilds[0].me.nicks) == 2
+
+
+@pytest.mark.asyncio
+async def test_coingecko_bot_runs_without_rpc_url(monkeypatch, tmp_path):
+    monkeypatch.delenv("ETH_RPC_URLS", raising=False)
+    monkeypatch.delenv("INFURA_URL", raising=False)
+    monkeypatch.delenv("ETH_WS_URL", raising=False)
+    # keep the bot's files out of the working directory
+    monkeypatch.setitem(cache, "price_store", PriceStore(str(tmp_path / "prices.db")))
+    monkeypatch.setitem(
+        cache, "snapshot_store", PriceSnapshotStore(str(tmp_path / "snapshots"))
+    )
+    monkeypatch.setitem(
+        cache, "token_metadata", TokenMetadataCache(str(tmp_path / "metadata.json"))
+    )
+
+    bot = PriceBot(coingecko_token_id="badger-dao", token_display="BADGER")
+    try:
+        assert bot.web3 == None
+        assert bot.multicall == None
+        assert cache.get("web3") == None
+        assert len(bot.get_health().get("circuits")) == 1
+    finally:
+        bot.update_price.cancel()
+        await bot.close()
+        await cache.get("http_client").close()
+        for key in ["scheduler", "http_client", "price_feed"]:
+            cache.pop(key, None)
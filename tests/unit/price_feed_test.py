@@ -0,0 +1,98 @@
+import asyncio
+import os
+import pytest
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from price_feed import PriceFeed
+
+test_prices = {
+    "badger-dao": {"usd": 10.5, "usd_market_cap": 100000000.0, "btc": 0.0002},
+    "badger-sett-badger": {"usd": 12.1, "usd_market_cap": 50000000.0, "btc": 0.00025},
+}
+
+
+class MockHttpClient:
+    def __init__(self):
+        self.calls = []
+
+    async def get_json_many(self, requests):
+        self.calls.append(requests)
+        await asyncio.sleep(0)
+        return [test_prices for _ in requests]
+
+
+class MockBot:
+    def __init__(self, coingecko_token_id):
+        self.coingecko_token_id = coingecko_token_id
+        self.token_data = None
+
+
+@pytest.mark.asyncio
+async def test_refresh_batches_all_subscribers():
+    http_client = MockHttpClient()
+    feed = PriceFeed(http_client)
+    badger_bot = MockBot("badger-dao")
+    bbadger_bot = MockBot("badger-sett-badger")
+    feed.subscribe(badger_bot)
+    feed.subscribe(bbadger_bot)
+
+    assert await feed.get_token_data_async("badger-dao") == {
+        "token_price_usd": 10.5,
+        "token_price_btc": 0.0002,
+        "market_cap": 100000000.0,
+    }
+    badger_sett_data = await feed.get_token_data_async("badger-sett-badger")
+    assert badger_sett_data.get("token_price_usd") == 12.1
+
+    assert len(http_client.calls) == 1
+    assert http_client.calls[0][0][1].get("ids") == "badger-dao,badger-sett-badger"
+    assert bbadger_bot.token_data.get("market_cap") == 50000000.0
+
+
+def test_subscribe_is_idempotent():
+    feed = PriceFeed(MockHttpClient())
+    bot = MockBot("badger-dao")
+    feed.subscribe(bot)
+    feed.subscribe(bot)
+
+    assert feed.get_token_ids() == ["badger-dao"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_async_reads_share_one_refresh():
+    http_client = MockHttpClient()
+    feed = PriceFeed(http_client)
+    feed.subscribe(MockBot("badger-dao"))
+    feed.subscribe(MockBot("badger-sett-badger"))
+
+    results = await asyncio.gather(
+        feed.get_token_data_async("badger-dao"),
+        feed.get_token_data_async("badger-sett-badger"),
+    )
+
+    assert len(http_client.calls) == 1
+    assert results[0].get("token_price_usd") == 10.5
+    assert results[1].get("token_price_usd") == 12.1
+
+
+@pytest.mark.asyncio
+async def test_seeded_snapshot_skips_refresh():
+    http_client = MockHttpClient()
+    feed = PriceFeed(http_client)
+    feed.subscribe(MockBot("badger-dao"))
+    feed.subscribe(MockBot("badger-sett-badger"))
+    seeded_data = {"token_price_usd": 9.0, "token_price_btc": 0.0002, "market_cap": 1.0}
+
+    feed.seed("badger-dao", seeded_data, time.time())
+    assert await feed.get_token_data_async("badger-dao") == seeded_data
+    assert len(http_client.calls) == 0
+
+    # tokens without seeded data are refreshed on first read
+    badger_sett_data = await feed.get_token_data_async("badger-sett-badger")
+    assert badger_sett_data.get("token_price_usd") == 12.1
+    assert len(http_client.calls) == 1
@@ -0,0 +1,84 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from price_history import PriceHistory
+
+HOUR = 60 * 60
+
+
+def test_ring_buffer_keeps_latest_samples():
+    history = PriceHistory(capacity=4, min_spacing_seconds=0)
+    for i in range(10):
+        history.append(i * 60, i)
+
+    timestamps, prices = history.get_window(HOUR, now=600)
+    assert len(history) == 4
+    assert list(prices) == [6, 7, 8, 9]
+    assert list(timestamps) == [360, 420, 480, 540]
+
+
+def test_close_samples_replace_the_previous_one():
+    history = PriceHistory(min_spacing_seconds=40)
+    history.append(0, 1)
+    history.append(10, 2)
+    history.append(45, 3)
+
+    _, prices = history.get_window(HOUR, now=60)
+    assert list(prices) == [2, 3]
+
+
+def test_get_change():
+    history = PriceHistory()
+    for hour in range(25):
+        history.append(hour * HOUR, 100 + hour)
+
+    assert history.get_change(24 * HOUR, now=24 * HOUR) == pytest.approx(24)
+    # history doesn't cover the window yet
+    assert history.get_change(48 * HOUR, now=24 * HOUR) == None
+
+
+def test_get_twap_weights_by_time():
+    history = PriceHistory()
+    history.append(0, 10)
+    history.append(3 * HOUR, 20)
+
+    # 10 for three hours, 20 for one hour
+    assert history.get_twap(4 * HOUR, now=4 * HOUR) == pytest.approx(12.5)
+    assert PriceHistory().get_twap(HOUR) == None
+
+
+def test_get_volatility():
+    history = PriceHistory()
+    for hour, price in enumerate([100, 100, 100, 100]):
+        history.append(hour * HOUR, price)
+    assert history.get_volatility(24 * HOUR, now=4 * HOUR) == 0
+
+    history.append(4 * HOUR, 110)
+    assert history.get_volatility(24 * HOUR, now=5 * HOUR) > 0
+
+
+def test_round_trips_through_dict():
+    history = PriceHistory(capacity=3, min_spacing_seconds=0)
+    for i in range(5):
+        history.append(i, i * 10)
+
+    restored = PriceHistory(min_spacing_seconds=0)
+    restored.load_dict(history.to_dict())
+    assert history.to_dict() == {"timestamps": [2, 3, 4], "prices": [20, 30, 40]}
+    assert restored.to_dict() == history.to_dict()
+
+
+def test_statistics_across_ring_wrap():
+    history = PriceHistory(capacity=4, min_spacing_seconds=0)
+    for hour, price in enumerate([1, 1, 10, 10, 20, 30]):
+        history.append(hour * HOUR, price)
+
+    # ring holds 10, 10, 20, 30 with the oldest sample in the middle of the arrays
+    assert history.get_twap(4 * HOUR, now=6 * HOUR) == pytest.approx(17.5)
+    assert history.get_change(3 * HOUR, now=5 * HOUR) == pytest.approx(200)
+    assert history.get_volatility(24 * HOUR, now=6 * HOUR) > 0
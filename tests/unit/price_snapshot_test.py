@@ -0,0 +1,34 @@
+from decimal import Decimal
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from price_snapshot import PriceSnapshotStore
+
+
+def test_save_and_load(tmp_path):
+    store = PriceSnapshotStore(str(tmp_path / "snapshots"))
+    store.save(
+        "DIGG",
+        {
+            "token_data": {
+                "token_price_usd": Decimal("45000.5"),
+                "token_price_btc": Decimal("1.02"),
+                "market_cap": Decimal("100000000"),
+            },
+            "fetched_at": 1620000000.0,
+        },
+    )
+
+    snapshot = store.load("DIGG")
+    assert snapshot.get("fetched_at") == 1620000000.0
+    assert snapshot.get("token_data").get("token_price_usd") == 45000.5
+    assert not os.path.exists(str(tmp_path / "snapshots" / "DIGG.json.tmp"))
+
+
+def test_load_missing_snapshot(tmp_path):
+    assert PriceSnapshotStore(str(tmp_path)).load("BADGER") == None
@@ -0,0 +1,90 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from price_store import downsample, PriceStore, render_sparkline
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+START = 1620000000
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path / "prices" / "price_store.db"))
+
+
+def test_samples_are_rolled_up(store):
+    for minute in range(10):
+        store.record("BADGER", START + minute * 60, 10 + minute)
+
+    assert len(store.get_series("badger", HOUR, START + 600)) == 10
+    rows = store.connection.execute(
+        "SELECT * FROM prices_5m ORDER BY timestamp"
+    ).fetchall()
+    assert [dict(row) for row in rows] == [
+        {
+            "token": "badger",
+            "timestamp": START,
+            "open": 10,
+            "high": 14,
+            "low": 10,
+            "close": 14,
+            "samples": 5,
+        },
+        {
+            "token": "badger",
+            "timestamp": START + 300,
+            "open": 15,
+            "high": 19,
+            "low": 15,
+            "close": 19,
+            "samples": 5,
+        },
+    ]
+    assert (
+        store.connection.execute("SELECT * FROM prices_1h").fetchone()["samples"] == 10
+    )
+
+
+def test_series_uses_the_finest_tier_covering_the_window(store):
+    for hour in range(10 * 24):
+        store.record("digg", START + hour * HOUR, hour)
+    now = START + 10 * DAY
+
+    # raw samples only cover the last two days
+    assert len(store.get_series("DIGG", DAY, now)) == 24
+    week = store.get_series("digg", 7 * DAY, now)
+    assert len(week) == 7 * 24
+    assert week[-1] == (START + 239 * HOUR, 239)
+    assert store.get_series("bbadger", 7 * DAY, now) == []
+    assert store.get_tokens() == ["digg"]
+
+
+def test_prune_drops_expired_rows(store):
+    store.record("badger", START, 10)
+    store.record("badger", START + 3 * DAY, 12)
+
+    raw = store.connection.execute("SELECT COUNT(*) FROM prices_raw").fetchone()[0]
+    candles = store.connection.execute("SELECT COUNT(*) FROM prices_5m").fetchone()[0]
+    assert raw == 1
+    assert candles == 2
+
+
+def test_store_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "price_store.db")
+    PriceStore(path).record("badger", START, 10)
+
+    assert PriceStore(path).get_series("badger", HOUR, START) == [(START, 10)]
+
+
+def test_sparkline():
+    assert render_sparkline([1, 2, 3, 4, 5, 6, 7, 8]) == "▁▂▃▄▅▆▇█"
+    assert render_sparkline([2, 2]) == "▅▅"
+    assert render_sparkline([]) == ""
+    assert downsample([1, 3, 5, 7], 2) == [2, 6]
+    assert downsample([1, 2], 5) == [1, 2]
@@ -0,0 +1,174 @@
+import asyncio
+import gc
+import os
+import pytest
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    StaleWhileRevalidate,
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+)
+
+
+async def failing_fetch():
+    raise ValueError("upstream down")
+
+
+def test_circuit_opens_after_threshold_and_backs_off():
+    breaker = CircuitBreaker("coingecko", failure_threshold=2, base_backoff_seconds=10)
+
+    breaker.record_failure(now=0)
+    assert breaker.state == CLOSED
+    breaker.record_failure(now=0)
+    assert breaker.state == OPEN
+    assert breaker.allow_request(now=5) == False
+
+    # trial call after the backoff, failing it doubles the backoff
+    assert breaker.allow_request(now=10) == True
+    assert breaker.state == HALF_OPEN
+    breaker.record_failure(now=10)
+    assert breaker.state == OPEN
+    assert breaker.allow_request(now=25) == False
+    assert breaker.allow_request(now=30) == True
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+
+
+def test_half_open_circuit_lets_one_trial_through():
+    breaker = CircuitBreaker("coingecko", failure_threshold=1, base_backoff_seconds=10)
+    breaker.record_failure(now=0)
+
+    assert breaker.allow_request(now=10) == True
+    # callers fail fast while the trial is running
+    assert breaker.allow_request(now=11) == False
+    with pytest.raises(CircuitOpenError):
+        breaker.check(now=11)
+
+    breaker.record_success()
+    assert breaker.allow_request(now=12) == True
+    assert breaker.allow_request(now=12) == True
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_is_released():
+    breaker = CircuitBreaker("rpc", failure_threshold=1, base_backoff_seconds=0)
+    breaker.record_failure()
+
+    async def hanging_fetch():
+        await asyncio.sleep(5)
+
+    trial = asyncio.ensure_future(breaker.call(hanging_fetch))
+    await asyncio.sleep(0.01)
+    assert breaker.allow_request() == False
+
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+    assert breaker.allow_request() == True
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    breaker = CircuitBreaker("rpc", failure_threshold=1)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        raise ValueError("timeout")
+
+    with pytest.raises(ValueError):
+        await breaker.call(fetch)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(fetch)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_serves_stale_value_within_budget():
+    source = StaleWhileRevalidate(
+        failing_fetch, max_age_seconds=10, staleness_budget_seconds=600
+    )
+    source.seed({"token_price_usd": 1}, time.time() - 60)
+
+    assert await source.get() == {"token_price_usd": 1}
+    assert isinstance(source.last_error, ValueError)
+
+
+@pytest.mark.asyncio
+async def test_raises_beyond_budget():
+    source = StaleWhileRevalidate(
+        failing_fetch, max_age_seconds=10, staleness_budget_seconds=600
+    )
+    source.seed({"token_price_usd": 1}, time.time() - 601)
+
+    with pytest.raises(ValueError):
+        await source.get()
+
+
+@pytest.mark.asyncio
+async def test_slow_refresh_continues_in_background():
+    async def slow_fetch():
+        await asyncio.sleep(0.05)
+        return {"token_price_usd": 2}
+
+    source = StaleWhileRevalidate(
+        slow_fetch,
+        max_age_seconds=10,
+        staleness_budget_seconds=600,
+        refresh_wait_seconds=0.01,
+    )
+    source.seed({"token_price_usd": 1}, time.time() - 60)
+
+    assert await source.get() == {"token_price_usd": 1}
+    await asyncio.sleep(0.1)
+    assert await source.get() == {"token_price_usd": 2}
+    assert source.is_fresh() == True
+
+
+@pytest.mark.asyncio
+async def test_wait_beyond_budget_is_bounded():
+    async def hanging_fetch():
+        await asyncio.sleep(5)
+
+    source = StaleWhileRevalidate(
+        hanging_fetch,
+        max_age_seconds=10,
+        staleness_budget_seconds=600,
+        refresh_timeout_seconds=0.05,
+    )
+
+    with pytest.raises(asyncio.TimeoutError):
+        await source.get()
+    # the refresh is left running for the next caller
+    assert source._refresh_task.done() == False
+    source._refresh_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_error_is_retrieved():
+    source = StaleWhileRevalidate(
+        failing_fetch, max_age_seconds=10, staleness_budget_seconds=600
+    )
+    errors = []
+    asyncio.get_event_loop().set_exception_handler(
+        lambda loop, context: errors.append(context)
+    )
+
+    # a refresh nobody awaits, EG one started by a caller that was cancelled
+    source._start_refresh()
+    await asyncio.sleep(0.01)
+    source._refresh_task = None
+    gc.collect()
+
+    assert errors == []
@@ -0,0 +1,104 @@
+import os
+import pytest
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from rpc_pool import get_rpc_urls, RPCEndpoint, RPCProviderPool
+
+
+class MockProvider:
+    def __init__(self, name, delay=0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def make_request(self, method, params):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} down")
+        return {"jsonrpc": "2.0", "id": 1, "result": self.name}
+
+
+def test_get_rpc_urls():
+    assert get_rpc_urls(" https://a.io/v3/key, ,https://b.io ") == [
+        "https://a.io/v3/key",
+        "https://b.io",
+    ]
+
+
+def test_routes_to_fastest_endpoint():
+    slow = MockProvider("slow", delay=0.02)
+    fast = MockProvider("fast")
+    pool = RPCProviderPool(providers=[("slow", slow), ("fast", fast)])
+
+    # every endpoint gets one request before it has a latency sample
+    pool.make_request("eth_blockNumber", [])
+    pool.make_request("eth_blockNumber", [])
+    for _ in range(5):
+        assert pool.make_request("eth_blockNumber", [])["result"] == "fast"
+    assert slow.calls == 1
+
+
+def test_falls_through_failing_endpoint():
+    down = MockProvider("down", fail=True)
+    up = MockProvider("up")
+    pool = RPCProviderPool(providers=[("down", down), ("up", up)])
+
+    assert pool.make_request("eth_call", [])["result"] == "up"
+    assert pool.get_health()[0]["name"] == "up"
+    assert pool.get_health()[1]["errors"] == 1
+
+
+def test_raises_when_every_endpoint_fails():
+    pool = RPCProviderPool(providers=[("down", MockProvider("down", fail=True))])
+
+    with pytest.raises(ConnectionError):
+        pool.make_request("eth_call", [])
+
+
+def test_hedges_slow_read():
+    slow = MockProvider("slow", delay=0.5)
+    fast = MockProvider("fast")
+    pool = RPCProviderPool(
+        providers=[("slow", slow), ("fast", fast)], hedge_after_seconds=0.01
+    )
+
+    started_at = time.perf_counter()
+    assert pool.make_request("eth_call", [])["result"] == "fast"
+    assert time.perf_counter() - started_at < 0.5
+
+
+def test_failing_endpoint_ranks_below_slow_endpoint():
+    healthy = RPCEndpoint("healthy", None, error_latency=10)
+    dead = RPCEndpoint("dead", None, error_latency=10)
+    for _ in range(20):
+        # eth_getLogs calls push the healthy average over a second
+        healthy.record_success(1.3)
+        dead.record_error()
+
+    assert healthy.get_score() == pytest.approx(1.3)
+    assert dead.get_score() > 10 * healthy.get_score()
+
+
+def test_lower_ranked_endpoint_is_probed():
+    down = MockProvider("down", fail=True)
+    up = MockProvider("up")
+    pool = RPCProviderPool(
+        providers=[("down", down), ("up", up)], probe_interval_seconds=0.05
+    )
+    pool.make_request("eth_call", [])
+    pool.make_request("eth_call", [])
+    assert down.calls == 1
+
+    # the endpoint recovered, only a probe sends it requests again
+    down.fail = False
+    time.sleep(0.06)
+    assert pool.make_request("eth_call", [])["result"] == "down"
+    assert down.calls == 2
+    assert pool.get_health()[1]["error_rate"] < 0.2
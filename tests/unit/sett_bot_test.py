@@ -0,0 +1,30 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from sett_bot import get_alert_start_block
+from sett_indexer import INDEX_CONFIRMATION_BLOCKS, MAX_BLOCKS_PER_SYNC
+
+LATEST_BLOCK = 12500000
+
+
+def test_first_sync_is_not_alerted():
+    assert get_alert_start_block(None, LATEST_BLOCK) == None
+
+
+def test_backfill_sync_is_not_alerted():
+    # a sync started from an old index_start_block indexes history up to here
+    checkpoint = LATEST_BLOCK - 5 * MAX_BLOCKS_PER_SYNC
+    to_block = checkpoint + MAX_BLOCKS_PER_SYNC
+
+    assert get_alert_start_block(checkpoint, LATEST_BLOCK, 100) > to_block
+
+
+def test_caught_up_sync_is_alerted():
+    checkpoint = LATEST_BLOCK - INDEX_CONFIRMATION_BLOCKS - 5
+
+    assert get_alert_start_block(checkpoint, LATEST_BLOCK, 100) == checkpoint + 1
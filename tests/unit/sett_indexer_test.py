@@ -0,0 +1,93 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from sett_indexer import DEPOSIT, SettIndexer, WITHDRAWAL
+
+SETT_ADDRESS = "0x19D97D8fA813EE2f51aD4B4e04EA08bAf4DFfC28"
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+ZERO = "0x" + "0" * 64
+ALICE = "0x" + "0" * 24 + "a" * 40
+BOB = "0x" + "0" * 24 + "b" * 40
+
+
+def make_log(block_number, log_index, from_topic, to_topic, value):
+    return {
+        "blockNumber": block_number,
+        "logIndex": log_index,
+        "transactionHash": bytes([block_number, log_index]),
+        "topics": [bytes.fromhex(TRANSFER_TOPIC[2:]), from_topic, to_topic],
+        "data": hex(value * 10 ** 18),
+    }
+
+
+class MockLogScanner:
+    def __init__(self, logs):
+        self.logs = logs
+        self.requests = []
+
+    def get_logs(self, address, topics, from_block, to_block, latest_block):
+        self.requests.append((from_block, to_block))
+        return [
+            log for log in self.logs if from_block <= log["blockNumber"] <= to_block
+        ]
+
+
+@pytest.fixture
+def indexer_path(tmp_path):
+    return str(tmp_path / "index" / "sett_index.db")
+
+
+def test_sync_resumes_from_checkpoint(indexer_path):
+    scanner = MockLogScanner(
+        [
+            make_log(100, 0, ZERO, ALICE, 1000),
+            make_log(105, 1, ALICE, BOB, 10),
+            make_log(120, 0, BOB, ZERO, 5),
+        ]
+    )
+    indexer = SettIndexer(scanner, indexer_path)
+
+    # blocks within the confirmation depth of the head are left for the next sync
+    assert indexer.sync(SETT_ADDRESS, 18, 100, 120) == 2
+    assert indexer.get_checkpoint(SETT_ADDRESS) == 108
+
+    restarted = SettIndexer(scanner, indexer_path)
+    assert restarted.sync(SETT_ADDRESS, 18, 100, 140) == 1
+    assert scanner.requests == [(100, 108), (109, 128)]
+    assert restarted.sync(SETT_ADDRESS, 18, 100, 140) == 0
+
+
+def test_queries(indexer_path):
+    scanner = MockLogScanner(
+        [
+            make_log(100, 0, ZERO, ALICE, 1000),
+            make_log(101, 0, ZERO, BOB, 20),
+            make_log(105, 1, ALICE, BOB, 10),
+            make_log(110, 0, BOB, ZERO, 5),
+        ]
+    )
+    indexer = SettIndexer(scanner, indexer_path)
+    indexer.sync(SETT_ADDRESS, 18, 100, 200)
+
+    deposits = indexer.get_transfers(SETT_ADDRESS, DEPOSIT)
+    assert [transfer.get("block_number") for transfer in deposits] == [101, 100]
+    assert deposits[1].get("to_address") == "0x" + "a" * 40
+    assert deposits[1].get("value") == str(1000 * 10 ** 18)
+    assert deposits[1].get("tx_hash") == "0x6400"
+
+    whales = indexer.get_whale_transfers(SETT_ADDRESS, 100)
+    assert [transfer.get("amount") for transfer in whales] == [1000]
+    assert indexer.get_whale_transfers(SETT_ADDRESS, 100, since_block=101) == []
+
+    assert indexer.get_net_flow(SETT_ADDRESS) == {
+        "deposits": 1020,
+        "withdrawals": 5,
+        "net": 1015,
+    }
+    assert len(indexer.get_address_transfers(SETT_ADDRESS, "0x" + "b" * 40)) == 3
+    assert indexer.get_transfers(SETT_ADDRESS, WITHDRAWAL)[0].get("amount") == 5
@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import hashlib
 import os
 import pytest
 import sys
@@ -8,6 +9,7 @@ sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
 )
 
+from ledger import Ledger, serialize_action
 from sourcecred import SourceCredManager
 
 load_dotenv()
@@ -56,6 +58,217 @@ def test_get_discord_user_identity_id():
     assert sc.get_discord_user_identity_id(test_invalid_discord_id) == None
 
 
+def test_refresh_ledger_fetches_appended_bytes(monkeypatch):
+    class MockResponse:
+        def __init__(self, status_code, content):
+            self.status_code = status_code
+            self.content = content
+            self.headers = {"ETag": '"new"'}
+
+    appended = (
+        b'\n{"action":{"identityId":"N7pyNa2bp8DIA0RQYNnrmw","type":"TOGGLE_ACTIVATION"},'
+        b'"ledgerTimestamp":1,"uuid":"ZueUX45XoDqhwbkCKaql8A","version":"1"}'
+    )
+    requests_sent = []
+
+    def get(url, headers):
+        requests_sent.append(headers)
+        return MockResponse(206, sc.ledger.source_tail + appended)
+
+    monkeypatch.setattr(sc.github.session, "get", get)
+    lines = len(sc.ledger)
+    start = sc.ledger.source_size - len(sc.ledger.source_tail)
+
+    assert sc.refresh_ledger() == 1
+    assert len(sc.ledger) == lines + 1
+    assert requests_sent[0]["Range"] == f"bytes={start}-"
+    assert sc.ledger.source_etag == '"new"'
+
+
+def create_activation_line(i: int) -> bytes:
+    return serialize_action(
+        {
+            "action": {
+                "identityId": "N7pyNa2bp8DIA0RQYNnrmw",
+                "type": "TOGGLE_ACTIVATION",
+            },
+            "ledgerTimestamp": i,
+            "uuid": "ZueUX45XoDqhwbkCKaql8A",
+            "version": "1",
+        }
+    )
+
+
+class MockRangeResponse:
+    def __init__(self, status_code, content, content_range):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"ETag": '"stale"', "Content-Range": content_range}
+
+
+def create_offline_manager(monkeypatch, remote: bytes):
+    """
+    Returns:
+        tuple: (manager loaded from remote without network access, reload calls)
+    """
+    reloads = []
+
+    def get_current_ledger(self, ledger_url):
+        reloads.append(ledger_url)
+        return Ledger.from_chunks([remote])
+
+    monkeypatch.setattr(SourceCredManager, "get_current_ledger", get_current_ledger)
+    manager = SourceCredManager(None, "btcookies/SourceCred", "queue", "table")
+    reloads.clear()
+    return manager, reloads
+
+
+def create_committed_manager(monkeypatch, lines: int):
+    """
+    Manager whose ledger had lines lines before the bot committed one more
+
+    Returns:
+        tuple: (manager, ledger.json before the commit, reload calls)
+    """
+    remote = b"\n".join(create_activation_line(i) for i in range(lines))
+    manager, reloads = create_offline_manager(monkeypatch, remote)
+    committed_line = create_activation_line(lines)
+    content = manager.ledger.to_bytes([committed_line])
+    manager.ledger.append_line(committed_line)
+    manager.ledger.set_source(content)
+    return manager, remote, reloads
+
+
+def test_refresh_ledger_ignores_stale_copy_in_range(monkeypatch):
+    manager, remote, reloads = create_committed_manager(monkeypatch, 2)
+
+    def get(url, headers):
+        # the whole ledger fits in the overlap, the stale copy is served from byte 0
+        return MockRangeResponse(
+            206, remote, f"bytes 0-{len(remote) - 1}/{len(remote)}"
+        )
+
+    monkeypatch.setattr(manager.github.session, "get", get)
+
+    assert manager.refresh_ledger() == 0
+    assert len(manager.ledger) == 3
+    assert reloads == []
+
+
+def test_refresh_ledger_ignores_stale_copy_before_range(monkeypatch):
+    manager, remote, reloads = create_committed_manager(monkeypatch, 20)
+    requests_sent = []
+
+    def get(url, headers):
+        requests_sent.append(headers.get("Range"))
+        if len(requests_sent) == 1:
+            return MockRangeResponse(416, b"", f"bytes */{len(remote)}")
+        start = len(remote) - 1024
+        return MockRangeResponse(
+            206, remote[start:], f"bytes {start}-{len(remote) - 1}/{len(remote)}"
+        )
+
+    monkeypatch.setattr(manager.github.session, "get", get)
+
+    assert manager.refresh_ledger() == 0
+    assert len(manager.ledger) == 21
+    assert requests_sent[1] == f"bytes={len(remote) - 1024}-{len(remote) - 1}"
+    assert reloads == []
+
+
+def test_refresh_ledger_reloads_rewritten_ledger(monkeypatch):
+    manager, remote, reloads = create_committed_manager(monkeypatch, 2)
+    rewritten = create_activation_line(100)
+
+    def get(url, headers):
+        return MockRangeResponse(
+            206, rewritten, f"bytes 0-{len(rewritten) - 1}/{len(rewritten)}"
+        )
+
+    monkeypatch.setattr(manager.github.session, "get", get)
+
+    manager.refresh_ledger()
+    assert len(reloads) == 1
+
+
+class MockContentFile:
+    def __init__(self, sha):
+        self.sha = sha
+
+
+class MockRepo:
+    def __init__(self):
+        self.updates = []
+
+    def update_file(self, path, message, content, sha, branch):
+        self.updates.append((content, sha))
+        return {
+            "commit": MockContentFile("new-commit"),
+            "content": MockContentFile("b"),
+        }
+
+
+def create_master(monkeypatch, manager, master: bytes) -> MockRepo:
+    repo = MockRepo()
+    # same as git hash-object over the raw file
+    master_blob_sha = hashlib.sha1(b"blob %d\0" % len(master) + master).hexdigest()
+    monkeypatch.setattr(manager.github, "get_repo", lambda: repo)
+    monkeypatch.setattr(manager.github, "get_ref_sha", lambda branch: "master-commit")
+    monkeypatch.setattr(
+        manager.github, "get_blob_sha", lambda path, commit_sha: master_blob_sha
+    )
+    return repo
+
+
+def test_update_ledger_refreshes_ledger_behind_master(monkeypatch):
+    local = create_activation_line(0)
+    master = local + b"\n" + create_activation_line(1)
+    manager, _ = create_offline_manager(monkeypatch, local)
+    repo = create_master(monkeypatch, manager, master)
+
+    def refresh_ledger():
+        manager.ledger.feed(master[len(local) :])
+        manager.ledger.finish()
+        return 1
+
+    monkeypatch.setattr(manager, "refresh_ledger", refresh_ledger)
+
+    manager.update_ledger([{"action": {"type": "TOGGLE_ACTIVATION"}}])
+
+    assert len(repo.updates) == 1
+    assert repo.updates[0][0].startswith(master + b"\n")
+
+
+def test_update_ledger_keeps_the_file_bytes(monkeypatch):
+    # sourcecred writes a trailing newline, blank lines and CRLF must survive as well
+    master = create_activation_line(0) + b"\r\n\n" + create_activation_line(1) + b"\n"
+    manager, _ = create_offline_manager(monkeypatch, master)
+    repo = create_master(monkeypatch, manager, master)
+    refreshes = []
+    monkeypatch.setattr(manager, "refresh_ledger", lambda: refreshes.append(1) or 0)
+
+    manager.update_ledger([{"action": {"type": "TOGGLE_ACTIVATION"}}])
+
+    assert refreshes == []
+    assert repo.updates[0][0].startswith(master + b'{"action"')
+
+
+def test_update_ledger_aborts_when_ledger_stays_behind_master(monkeypatch):
+    local = create_activation_line(0)
+    master = local + b"\n" + create_activation_line(1)
+    manager, _ = create_offline_manager(monkeypatch, local)
+    repo = create_master(monkeypatch, manager, master)
+    refreshes = []
+    # raw.githubusercontent.com still serves the old copy
+    monkeypatch.setattr(manager, "refresh_ledger", lambda: refreshes.append(1) or 0)
+
+    with pytest.raises(ValueError):
+        manager.update_ledger([{"action": {"type": "TOGGLE_ACTIVATION"}}])
+    assert refreshes == [1]
+    assert repo.updates == []
+    assert len(manager.ledger) == 1
+
+
 def test_get_clean_uuid():
 
     assert sc._is_uuid_clean("N7pyNa2bp8DIA0RQYNnrmw")
@@ -0,0 +1,83 @@
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from supervisor import BotSupervisor, MAX_RESTART_BACKOFF_SECONDS
+
+
+class MockLoop:
+    def __init__(self):
+        self.now = 1000
+
+    def time(self):
+        return self.now
+
+
+class MockUpdateLoop:
+    def __init__(self):
+        self.running = False
+        self.starts = 0
+
+    def is_running(self):
+        return self.running
+
+    def start(self):
+        self.starts += 1
+
+
+class MockBot:
+    def __init__(self):
+        self.token_display = "BADGER"
+        self.loop = MockLoop()
+        self.update_price = MockUpdateLoop()
+        self.closed = False
+        self.ready = True
+
+    def is_closed(self):
+        return self.closed
+
+    def is_ready(self):
+        return self.ready
+
+
+def create_supervisor(tmp_path):
+    registry_path = tmp_path / "price_bots.json"
+    registry_path.write_text("[]")
+    return BotSupervisor(str(registry_path))
+
+
+def test_running_or_closed_loops_are_not_restarted(tmp_path):
+    supervisor = create_supervisor(tmp_path)
+    bot = MockBot()
+
+    bot.update_price.running = True
+    assert supervisor._restart_update_loop_if_stopped(bot) == False
+    bot.update_price.running = False
+    bot.ready = False
+    assert supervisor._restart_update_loop_if_stopped(bot) == False
+    bot.ready = True
+    bot.closed = True
+    assert supervisor._restart_update_loop_if_stopped(bot) == False
+    assert bot.update_price.starts == 0
+
+
+def test_restarts_back_off(tmp_path):
+    supervisor = create_supervisor(tmp_path)
+    bot = MockBot()
+
+    assert supervisor._restart_update_loop_if_stopped(bot) == True
+    # second crash has to wait out the 60 second backoff
+    bot.loop.now += 30
+    assert supervisor._restart_update_loop_if_stopped(bot) == False
+    bot.loop.now += 30
+    assert supervisor._restart_update_loop_if_stopped(bot) == True
+    assert bot.update_price.starts == 2
+
+    # a loop healthy for long enough starts backing off from scratch
+    bot.loop.now += MAX_RESTART_BACKOFF_SECONDS * 2 + 1
+    assert supervisor._restart_update_loop_if_stopped(bot) == True
+    assert supervisor.loop_restarts.get("BADGER").get("count") == 1
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import pytest
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from token_metadata import TokenMetadataCache
+
+
+class MockContractCall:
+    def __init__(self, contract, value):
+        self.contract = contract
+        self.value = value
+
+    def call(self):
+        self.contract.rpc_calls += 1
+        return self.value
+
+
+class MockContractFunctions:
+    def __init__(self, contract):
+        self.contract = contract
+
+    def decimals(self):
+        return MockContractCall(self.contract, 18)
+
+    def symbol(self):
+        return MockContractCall(self.contract, "bBADGER")
+
+
+class MockContract:
+    def __init__(self):
+        self.address = "0x19D97D8fA813EE2f51aD4B4e04EA08bAf4DFfC28"
+        self.abi = [
+            {"type": "function", "name": "decimals"},
+            {"type": "function", "name": "symbol"},
+            {"type": "event", "name": "Transfer"},
+        ]
+        self.functions = MockContractFunctions(self)
+        self.rpc_calls = 0
+
+
+def test_metadata_read_once(tmp_path):
+    contract = MockContract()
+    metadata_cache = TokenMetadataCache(str(tmp_path / "token_metadata.json"))
+
+    assert metadata_cache.get(contract) == {"decimals": 18, "symbol": "bBADGER"}
+    assert metadata_cache.get(contract) == {"decimals": 18, "symbol": "bBADGER"}
+    assert contract.rpc_calls == 2
+
+
+def test_metadata_loaded_from_file(tmp_path):
+    path = str(tmp_path / "cache" / "token_metadata.json")
+    TokenMetadataCache(path).get(MockContract())
+
+    contract = MockContract()
+    assert TokenMetadataCache(path).get(contract).get("decimals") == 18
+    assert contract.rpc_calls == 0
+
+
+def test_concurrent_saves_write_valid_file(tmp_path):
+    path = str(tmp_path / "token_metadata.json")
+    metadata_cache = TokenMetadataCache(path)
+    contracts = []
+    for i in range(20):
+        contract = MockContract()
+        contract.address = f"0x{i:040x}"
+        contracts.append(contract)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(metadata_cache.get, contracts))
+
+    with open(path) as metadata_file:
+        assert len(json.load(metadata_file)) == 20
+    assert os.path.exists(path + ".tmp") == False
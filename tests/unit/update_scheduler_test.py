@@ -0,0 +1,96 @@
+import asyncio
+import discord
+import os
+import pytest
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+)
+
+from update_scheduler import DiscordUpdateScheduler
+
+
+class MockResponse:
+    def __init__(self, status, headers):
+        self.status = status
+        self.reason = "Too Many Requests"
+        self.headers = headers
+
+
+def rate_limited(headers):
+    async def update():
+        raise discord.HTTPException(MockResponse(429, headers), "rate limited")
+
+    return update
+
+
+async def successful_update():
+    return True
+
+
+async def throttled_update():
+    # discord.py sleeping on a 429 before retrying
+    await asyncio.sleep(5)
+
+
+def test_get_display_delay():
+    scheduler = DiscordUpdateScheduler(spread_seconds=30, max_jitter_seconds=0)
+    bots = ["badger", "bbadger", "digg"]
+    for bot in bots:
+        scheduler.register(bot)
+
+    assert [scheduler.get_display_delay(bot) for bot in bots] == [0, 10, 20]
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_bucket_is_deferred():
+    scheduler = DiscordUpdateScheduler(min_spacing_seconds=0)
+
+    assert await scheduler.run((1, "nick", 10), successful_update) == True
+    assert (
+        await scheduler.run((1, "nick", 10), rate_limited({"Retry-After": "30"}))
+        == False
+    )
+    assert scheduler.is_deferred((1, "nick", 10)) == True
+    assert scheduler.is_deferred((1, "nick", 11)) == False
+    assert await scheduler.run((1, "nick", 10), successful_update) == False
+
+
+@pytest.mark.asyncio
+async def test_global_rate_limit_defers_whole_bot():
+    scheduler = DiscordUpdateScheduler(min_spacing_seconds=0)
+
+    await scheduler.run(
+        (1, "presence"),
+        rate_limited({"Retry-After": "5", "X-RateLimit-Global": "true"}),
+    )
+
+    assert scheduler.is_deferred((1, "nick", 10)) == True
+    assert scheduler.is_deferred((2, "nick", 10)) == False
+
+
+@pytest.mark.asyncio
+async def test_throttled_update_is_deferred():
+    scheduler = DiscordUpdateScheduler(
+        min_spacing_seconds=0, update_timeout_seconds=0.1
+    )
+
+    assert await scheduler.run((1, "nick", 10), throttled_update) == False
+    assert scheduler.is_deferred((1, "nick", 10)) == True
+    assert scheduler.rate_limited_count == 1
+
+
+@pytest.mark.asyncio
+async def test_updates_are_spaced_per_bot():
+    scheduler = DiscordUpdateScheduler(min_spacing_seconds=0.2)
+
+    started_at = time.monotonic()
+    await asyncio.gather(
+        *[scheduler.run((bot_id, "nick", 10), successful_update) for bot_id in range(5)]
+    )
+    assert time.monotonic() - started_at < 0.2
+
+    await scheduler.run((1, "presence"), successful_update)
+    assert time.monotonic() - started_at >= 0.2